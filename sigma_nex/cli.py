@@ -1,16 +1,45 @@
 import getpass
+import importlib
 import os
-import subprocess
 import sys
 
 import click
-import requests
 
 from . import __version__
 from .auth import check_cli_permission, login_cli, logout_cli, validate_cli_session
-from .config import get_config
-from .core.runner import Runner
-from .data_loader import DataLoader
+
+# Heavy dependencies are imported on first use so that `sigma --help`,
+# `login` and `logout` start fast. They remain module attributes
+# (e.g. ``sigma_nex.cli.Runner``), so they can still be patched.
+_LAZY_IMPORTS = {
+    "requests": ("requests", None),
+    "get_config": ("sigma_nex.config", "get_config"),
+    "Runner": ("sigma_nex.core.runner", "Runner"),
+    "DataLoader": ("sigma_nex.data_loader", "DataLoader"),
+}
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    module = importlib.import_module(module_name)
+    value = getattr(module, attr) if attr else module
+    globals()[name] = value
+    return value
+
+
+def _lazy(name):
+    """Resolve a lazily imported dependency, honoring patched attributes."""
+    return getattr(sys.modules[__name__], name)
+
+
+def _get_cfg(ctx):
+    """Load the configuration on first use by a command."""
+    if ctx.obj.get("config") is None:
+        ctx.obj["config"] = _lazy("get_config")()
+    return ctx.obj["config"]
 
 
 def show_ascii_banner():
@@ -71,8 +100,7 @@ def require_auth(permission: str = "query"):
 @click.pass_context
 def main(ctx, secure):
     """CLI di SIGMA-NEX - Agente cognitivo autonomo per sopravvivenza offline."""
-    cfg = get_config()
-    ctx.obj = {"config": cfg, "secure": secure}
+    ctx.obj = {"config": None, "secure": secure}
 
 
 @main.command()
@@ -135,8 +163,135 @@ def logout():
 @click.pass_context
 def start(ctx):
     """Avvia l'agente in REPL interattivo."""
-    cfg, secure = ctx.obj["config"], ctx.obj["secure"]
-    Runner(cfg, secure=secure).interactive()
+    cfg, secure = _get_cfg(ctx), ctx.obj["secure"]
+    _lazy("Runner")(cfg, secure=secure).interactive()
+
+
+@main.command()
+@click.option(
+    "--input",
+    "-i",
+    "input_path",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Domande da elaborare (.jsonl o testo, una per riga)",
+)
+@click.option("--output", "-o", "output_path", required=True, type=click.Path(dir_okay=False), help="Risposte (.jsonl)")
+@click.option("--parallel", "-j", type=int, help="Chiamate Ollama in parallelo (default: capacità configurata)")
+@click.option("--batch-size", default=16, type=int, help="Domande per blocco di traduzione/retrieval")
+@click.option("--no-resume", is_flag=True, help="Sovrascrive l'output invece di riprendere dal checkpoint")
+@click.option("--no-translate", is_flag=True, help="Salta la traduzione IT/EN")
+@require_auth("query")
+@click.pass_context
+def batch(ctx, input_path, output_path, parallel, batch_size, no_resume, no_translate):
+    """Elabora un file di domande e scrive le risposte in JSON Lines."""
+    from .core.batch import BatchProcessor
+
+    cfg, secure = _get_cfg(ctx), ctx.obj["secure"]
+    processor = BatchProcessor(
+        _lazy("Runner")(cfg, secure=secure),
+        parallelism=parallel,
+        batch_size=batch_size,
+        translate=not no_translate,
+    )
+    click.echo(f"Batch {input_path} -> {output_path} ({processor.parallelism} in parallelo)")
+
+    def progress(answered, failed, skipped):
+        click.echo(f"  risposte: {answered}, errori: {failed}, già presenti: {skipped}")
+
+    try:
+        counts = processor.run(input_path, output_path, resume=not no_resume, progress=progress)
+    except KeyboardInterrupt:
+        click.echo("\nBatch interrotto. Rilancia lo stesso comando per riprendere.")
+        sys.exit(130)
+
+    click.echo(
+        f"Completato: {counts['answered']} risposte, {counts['failed']} errori, {counts['skipped']} già presenti"
+    )
+    if counts["failed"]:
+        sys.exit(1)
+
+
+@main.command()
+@click.option(
+    "--path",
+    "-p",
+    "paths",
+    multiple=True,
+    type=click.Path(exists=True),
+    help="Manuale .md/.txt o cartella da indicizzare (oltre a knowledge_paths)",
+)
+@click.option("--full", is_flag=True, help="Ricalcola tutti gli embedding invece di riusare quelli invariati")
+@require_auth("config")
+@click.pass_context
+def ingest(ctx, paths, full):
+    """Indicizza in chunk moduli del framework e manuali (aggiornamento incrementale)."""
+    from collections import Counter
+
+    from .core import retriever
+    from .core.embeddings import configure_embeddings
+    from .core.ingest import configure_ingest
+
+    cfg = _get_cfg(ctx)
+    configure_embeddings(cfg)
+    retriever.configure_index(cfg)
+    configure_ingest(cfg)
+    try:
+        moduli = cfg.framework.get("modules", []) or None
+        stats = retriever.update_index(moduli, reuse=not full, extra_paths=list(paths))
+    except Exception as e:
+        click.echo(f"Errore indicizzazione: {e}", err=True)
+        sys.exit(1)
+
+    sources = Counter(retriever.get_chunk_sources() or [])
+    click.echo(
+        f"Indice aggiornato: {sum(sources.values())} chunk da {len(sources)} sorgenti "
+        f"({stats['added']} nuovi, {stats['reused']} riusati, {stats['removed']} rimossi)"
+    )
+
+
+@main.command("export-onnx")
+@click.option(
+    "--output", "-o", "output_dir", type=click.Path(file_okay=False), help="Cartella ONNX (default: <modello>/onnx)"
+)
+@click.option("--no-quantize", is_flag=True, help="Non scrive la versione int8 del modello")
+@click.option("--check-only", is_flag=True, help="Solo verifica del modello ONNX già esportato")
+@click.option("--threshold", default=0.98, type=float, help="Similarità coseno minima con il modello torch")
+@require_auth("config")
+@click.pass_context
+def export_onnx(ctx, output_dir, no_quantize, check_only, threshold):
+    """Esporta il modello di embedding in ONNX (int8) e lo verifica contro torch."""
+    from .core import embeddings, retriever
+
+    cfg = _get_cfg(ctx)
+    embeddings.configure_embeddings(cfg)
+    if output_dir:
+        embeddings.configure_embeddings({"embedding_onnx_path": output_dir})
+    try:
+        if not check_only:
+            result = embeddings.export_onnx(retriever.MODEL_PATH, quantize=not no_quantize)
+            click.echo(f"Modello esportato in {result['output_dir']}: {', '.join(result['files'])}")
+        reference = None
+        st = retriever._sentence_transformer()
+        if st is not None:
+            embeddings.enforce_offline()
+            reference = st(retriever.MODEL_PATH)
+        report = embeddings.verify_onnx(retriever.MODEL_PATH, reference=reference, threshold=threshold)
+    except Exception as e:
+        click.echo(f"Errore ONNX: {e}", err=True)
+        sys.exit(1)
+
+    click.echo(f"{report['file']}: {report['dimension']} dimensioni, {report['onnx_ms']:.1f} ms/query")
+    if report["min_cosine"] is None:
+        click.echo("sentence-transformers non disponibile: confronto con torch saltato")
+    else:
+        click.echo(
+            f"Coseno con torch: min {report['min_cosine']:.4f}, medio {report['mean_cosine']:.4f} "
+            f"(torch {report['torch_ms']:.1f} ms/query)"
+        )
+    click.echo("Verifica superata" if report["ok"] else "Verifica fallita")
+    if not report["ok"]:
+        sys.exit(1)
 
 
 @main.command("load-framework")
@@ -150,7 +305,7 @@ def start(ctx):
 @require_auth("config")
 def load_framework(path):
     """Carica il file Framework_SIGMA.json."""
-    count = DataLoader().load(path)
+    count = _lazy("DataLoader")().load(path)
     click.echo(f"Caricati {count} moduli dal file {path}.")
 
 
@@ -158,8 +313,8 @@ def load_framework(path):
 @click.pass_context
 def self_check(ctx):
     """Verifica che Ollama CLI e modelli siano disponibili."""
-    cfg = ctx.obj["config"]
-    Runner(cfg).self_check()
+    cfg = _get_cfg(ctx)
+    _lazy("Runner")(cfg).self_check()
 
 
 @main.command("self-heal")
@@ -174,9 +329,9 @@ def self_check(ctx):
 @require_auth("config")
 def self_heal(ctx, file):
     """Analizza e migliora il codice Python specificato."""
-    cfg = ctx.obj["config"]
+    cfg = _get_cfg(ctx)
     secure = ctx.obj["secure"]
-    runner = Runner(cfg, secure=secure)
+    runner = _lazy("Runner")(cfg, secure=secure)
     result = runner.self_heal_file(file)
     click.echo(result)
 
@@ -204,6 +359,68 @@ def server(ctx, host, port):
         click.echo("\nServer fermato.")
 
 
+@main.command()
+@click.option(
+    "--corpus",
+    "-c",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="File di domande (.jsonl, .json o .txt)",
+)
+@click.option("--url", default="http://127.0.0.1:8000", help="URL del server SIGMA-NEX")
+@click.option("--api-key", envvar="SIGMA_API_KEY", help="API key (default: $SIGMA_API_KEY)")
+@click.option("--concurrency", "-n", default=8, type=int, help="Richieste in parallelo")
+@click.option("--rate", type=float, help="Richieste al secondo (open-loop); senza, usa solo la concorrenza")
+@click.option("--requests", "total", type=int, help="Numero totale di richieste (default: una per domanda)")
+@click.option("--timeout", default=120.0, type=float, help="Timeout per richiesta (secondi)")
+@click.option("--json", "as_json", is_flag=True, help="Stampa il risultato in JSON")
+@require_auth("admin")
+def bench(corpus, url, api_key, concurrency, rate, total, timeout, as_json):
+    """Esegue un load test di /ask su un server in esecuzione."""
+    import asyncio
+    import json
+
+    try:
+        import httpx  # noqa: F401
+
+        from .loadtest import format_report, load_corpus, run_load_test
+    except ImportError:
+        click.echo("Errore: httpx non installato. Installa con: pip install httpx", err=True)
+        sys.exit(1)
+
+    try:
+        questions = load_corpus(corpus)
+    except (ValueError, OSError) as e:
+        click.echo(f"Errore corpus: {e}", err=True)
+        sys.exit(1)
+
+    mode = f"{rate} req/s" if rate else f"concorrenza {concurrency}"
+    click.echo(f"Load test su {url} con {len(questions)} domande ({mode})")
+    try:
+        result = asyncio.run(
+            run_load_test(
+                url,
+                questions,
+                api_key=api_key,
+                concurrency=concurrency,
+                rate=rate,
+                total=total,
+                timeout=timeout,
+            )
+        )
+    except KeyboardInterrupt:
+        click.echo("\nLoad test interrotto.")
+        return
+
+    if as_json:
+        click.echo(json.dumps(result.to_dict(), indent=2))
+    else:
+        click.echo(format_report(result))
+
+    if result.succeeded == 0:
+        sys.exit(1)
+
+
 @main.command()
 @require_auth("config")
 def gui():
@@ -227,9 +444,12 @@ def gui():
 @click.option("--force", is_flag=True, help="Forza aggiornamento anche se già aggiornato")
 def update(check_only, force):
     """Aggiorna SIGMA-NEX dal repository GitHub."""
+    import subprocess
+
+    requests = _lazy("requests")
     click.echo(f"Controllo aggiornamenti SIGMA-NEX " f"(versione corrente: {__version__})")
 
-    cfg = get_config()
+    cfg = _lazy("get_config")()
     project_root = cfg.project_root
 
     # 1. Verifica se siamo in un repository git
@@ -6,90 +6,259 @@ Centralized path management and configuration for the SIGMA-NEX project.
 
 import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import yaml
 
+# Default values for common configuration keys, used by SigmaConfig.get()
+DEFAULTS: Dict[str, Any] = {
+    "debug": False,
+    "model_name": "mistral",
+    "temperature": 0.7,
+    "max_history": 100,
+    "max_tokens": 2048,
+    "retrieval_enabled": True,
+}
+
+# Subscriber callback: receives the set of changed top-level keys ("framework"
+# when the framework file changed)
+ConfigSubscriber = Callable[[Set[str]], None]
+
+# Resolved project roots keyed on (cwd, SIGMA_NEX_ROOT, HOME)
+_root_cache: Dict[Tuple[str, Optional[str], Optional[str]], Path] = {}
+
+
+def _resolve_project_root(cwd: Path, env_root: Optional[str]) -> Path:
+    """Walk the candidate locations for a directory containing config.yaml."""
+    # First try to use an environment variable if set
+    if env_root is not None:
+        env_path = Path(env_root)
+        if env_path.exists() and (env_path / "config.yaml").exists():
+            return env_path
+
+    # Try walking up from CWD for a limited number of levels
+    current = cwd
+    for _ in range(10):
+        if (current / "config.yaml").exists():
+            return current
+        if current == current.parent:
+            break
+        current = current.parent
+
+    # Try walking up from the package location
+    current = Path(__file__).parent
+    for _ in range(10):
+        if (current / "config.yaml").exists():
+            return current
+        if current == current.parent:
+            break
+        current = current.parent
+
+    # Check user config directory
+    user_config_dir = Path.home() / ".config" / "sigma-nex"
+    if (user_config_dir / "config.yaml").exists():
+        return user_config_dir
+
+    # Check common installation locations
+    possible_locations = [
+        Path.home() / ".sigma-nex",
+        Path("/opt/sigma-nex"),
+        Path("C:/Program Files/sigma-nex") if os.name == "nt" else None,
+    ]
+
+    for location in possible_locations:
+        if location and location.exists() and (location / "config.yaml").exists():
+            return location
+
+    # Fallback to repository root (relative to this file)
+    return Path(__file__).parent.parent
+
+
+def _file_signature(path: Any) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of ``path``, or None if it cannot be stat'ed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def clear_root_cache() -> None:
+    """Forget resolved project roots (e.g. after creating a config.yaml)."""
+    _root_cache.clear()
+
 
 class SigmaConfig:
-    """Centralized configuration manager for SIGMA-NEX."""
+    """Centralized configuration manager for SIGMA-NEX.
+
+    The YAML file is reloaded when its mtime/size change; the check runs at
+    most once every ``RELOAD_CHECK_INTERVAL`` seconds. ``generation`` is
+    incremented on every (re)load so dependent caches can invalidate, and
+    ``subscribe()`` callbacks are notified of the keys that changed. Reloads
+    triggered by reading ``config`` only record the changed keys; the
+    callbacks run in the ``ConfigWatcher`` thread (``notify=True``), never
+    in the request thread that happened to read the configuration.
+    """
+
+    RELOAD_CHECK_INTERVAL = 1.0
 
     def __init__(self, config_path: Optional[str] = None):
         self.project_root = self._find_project_root()
         self.config_path = Path(config_path) if config_path else (self.project_root / "config.yaml")
         self._config: Optional[Dict[str, Any]] = None
         self._framework: Optional[Dict[str, Any]] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self._framework_signature: Optional[Tuple[int, int]] = None
+        self._framework_checked = False
+        self._subscribers: List[ConfigSubscriber] = []
+        self._pending: Set[str] = set()  # changed keys not yet notified
+        self._reload_lock = threading.Lock()
+        self.generation = 0
 
     def _find_project_root(self) -> Path:
-        """Find the project root directory safely."""
-        # First try to use an environment variable if set
-        if "SIGMA_NEX_ROOT" in os.environ:
-            env_root = Path(os.environ["SIGMA_NEX_ROOT"])
-            if env_root.exists() and (env_root / "config.yaml").exists():
-                return env_root
-
-        # Try walking up from CWD for a limited number of levels
-        current = Path.cwd()
-        for _ in range(10):
-            if (current / "config.yaml").exists():
-                return current
-            if current == current.parent:
-                break
-            current = current.parent
-
-        # Try walking up from the package location
-        current = Path(__file__).parent
-        for _ in range(10):
-            if (current / "config.yaml").exists():
-                return current
-            if current == current.parent:
-                break
-            current = current.parent
-
-        # Check user config directory
-        user_config_dir = Path.home() / ".config" / "sigma-nex"
-        if (user_config_dir / "config.yaml").exists():
-            return user_config_dir
-
-        # Check common installation locations
-        possible_locations = [
-            Path.home() / ".sigma-nex",
-            Path("/opt/sigma-nex"),
-            Path("C:/Program Files/sigma-nex") if os.name == "nt" else None,
-        ]
-
-        for location in possible_locations:
-            if location and location.exists() and (location / "config.yaml").exists():
-                return location
-
-        # Fallback to repository root (relative to this file)
-        fallback = Path(__file__).parent.parent
-        return fallback
+        """Find the project root directory safely (cached per cwd/environment)."""
+        cwd = Path.cwd()
+        key = (str(cwd), os.environ.get("SIGMA_NEX_ROOT"), os.environ.get("HOME"))
+        cached = _root_cache.get(key)
+        # A cached root is reused only while its config.yaml still exists
+        if cached is not None and ((cached / "config.yaml").exists() or cached == Path(__file__).parent.parent):
+            return cached
+
+        root = _resolve_project_root(cwd, key[1])
+        _root_cache[key] = root
+        return root
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        return _file_signature(self.config_path)
+
+    def subscribe(self, callback: ConfigSubscriber) -> None:
+        """Call ``callback(changed_keys)`` after every reload that changes values."""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: ConfigSubscriber) -> None:
+        """Remove a subscriber registered with ``subscribe()``."""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self, changed: Set[str]) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"Warning: configuration subscriber failed: {e}")
+
+    def reload_if_changed(self, force: bool = False, notify: bool = False) -> bool:
+        """
+        Reload the configuration if the file changed on disk.
+
+        Without ``force`` the file is checked at most once every
+        ``RELOAD_CHECK_INTERVAL`` seconds. In-memory ``set()`` values are
+        discarded when the file is reloaded. If the new file cannot be parsed
+        (e.g. a half-written edit) the previous configuration stays active.
+        The changed keys are kept until a call with ``notify`` passes them to
+        the subscribers, including those of earlier reloads without it.
+
+        Returns:
+            True if the configuration was reloaded (or, with ``notify``, if
+            subscribers were notified of an earlier reload)
+        """
+        reloaded = self._reload(force)
+        if not notify:
+            return reloaded
+        with self._reload_lock:
+            changed, self._pending = self._pending, set()
+        if changed:
+            self._notify(changed)
+        return reloaded or bool(changed)
+
+    def _reload(self, force: bool) -> bool:
+        if self._config is None:
+            return False
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + self.RELOAD_CHECK_INTERVAL
+        if self._stat_signature() == self._signature:
+            return False
+
+        with self._reload_lock:
+            old = self._config
+            self._load_config()
+            new = self._config
+        if new is old:
+            return False
+
+        self._framework = None
+        changed = {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+        with self._reload_lock:
+            self._pending |= changed
+        return True
+
+    def reload_framework_if_changed(self) -> bool:
+        """
+        Drop the cached framework if its file changed on disk.
+
+        The first call only records the file signature. Subscribers are
+        notified with ``{"framework"}``; the data is re-read lazily on the
+        next ``framework`` access.
+
+        Returns:
+            True if the framework file changed
+        """
+        signature = _file_signature(self.get_path("framework", "data/Framework_SIGMA.json"))
+        if not self._framework_checked:
+            self._framework_checked = True
+            self._framework_signature = signature
+            return False
+        if signature == self._framework_signature:
+            return False
+
+        self._framework_signature = signature
+        self._framework = None
+        self._notify({"framework"})
+        return True
 
     @property
     def config(self) -> Dict[str, Any]:
         """Get configuration, loading it if necessary."""
         if self._config is None:
             self._load_config()
+        elif time.monotonic() >= self._next_check:
+            self.reload_if_changed()
         assert self._config is not None  # _load_config always sets it
         return self._config
 
     def _load_config(self) -> None:
         """Load configuration from YAML file with graceful fallbacks."""
+        self._signature = self._stat_signature()
+        self._next_check = time.monotonic() + self.RELOAD_CHECK_INTERVAL
+        data: Optional[Dict[str, Any]]
         try:
             if not Path(self.config_path).exists():
                 # Missing config file: fall back to empty config (defaults will apply)
-                self._config = {}
-                return
-
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-                self._config = data if isinstance(data, dict) else {}
+                data = {}
+            else:
+                with open(self.config_path, "r", encoding="utf-8") as f:
+                    loaded = yaml.safe_load(f)
+                data = loaded if isinstance(loaded, dict) else {}
         except Exception:
             # Invalid YAML or other IO issues: fall back to empty config
             print(f"Warning: invalid or unreadable YAML at {self.config_path}")
-            self._config = {}
+            data = None
+
+        if data is None:
+            if self._config is not None:
+                # Reload: keep serving the previous configuration
+                return
+            data = {}
+        # Single reference swap: readers see either the old or the new dict
+        self._config = data
+        self.generation += 1
 
     @property
     def framework(self) -> Dict[str, Any]:
@@ -154,23 +323,15 @@ class SigmaConfig:
             Path(self.config_path).parent.mkdir(parents=True, exist_ok=True)
             with open(self.config_path, "w", encoding="utf-8") as f:
                 yaml.safe_dump(self.config, f, sort_keys=False, allow_unicode=True)
+            # Our own write must not trigger a reload of the in-memory values
+            self._signature = self._stat_signature()
         except Exception as e:
             raise RuntimeError(f"Unable to save configuration: {e}")
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get a configuration value with dotted-key support and sensible defaults."""
-        # Default values for common configuration keys
-        defaults = {
-            "debug": False,
-            "model_name": "mistral",
-            "temperature": 0.7,
-            "max_history": 100,
-            "max_tokens": 2048,
-            "retrieval_enabled": True,
-        }
-
-        if default is None and key in defaults:
-            default = defaults[key]
+        if default is None:
+            default = DEFAULTS.get(key)
 
         cfg = self.config
         # Support dotted key access (e.g., "translation.enabled")
@@ -187,6 +348,54 @@ class SigmaConfig:
         return cfg.get(key, default)
 
 
+class ConfigWatcher:
+    """
+    Background thread that hot-reloads a SigmaConfig.
+
+    Polls ``config.yaml`` and the framework file every ``interval`` seconds
+    (two ``stat`` calls per poll) and lets SigmaConfig notify its
+    subscribers. Polling is used instead of inotify so the same code works
+    on Windows and on network/container mounts.
+    """
+
+    def __init__(self, config: SigmaConfig, interval: float = 2.0):
+        self.config = config
+        self.interval = max(0.1, float(interval))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Run one poll; True if the config or the framework changed."""
+        config_changed = self.config.reload_if_changed(force=True, notify=True)
+        framework_changed = self.config.reload_framework_if_changed()
+        return config_changed or framework_changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Warning: configuration watch failed: {e}")
+
+    def start(self) -> None:
+        """Start polling (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # Make sure the first poll compares against the current files
+        _ = self.config.config
+        self.config.reload_framework_if_changed()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sigma-config-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+
 # Global configuration instance
 _config_instance = None
 
@@ -194,11 +403,18 @@ _config_instance = None
 def get_config(config_path: Optional[str] = None) -> SigmaConfig:
     """Get the global configuration instance.
 
-    If a config_path is provided, (re)initialize the singleton with that path.
+    If a config_path is provided for a different file, (re)initialize the
+    singleton with that path; for the same file, the existing instance is
+    reused and reloaded only if the file changed on disk.
     """
     global _config_instance
-    if _config_instance is None or config_path is not None:
+    if _config_instance is None:
         _config_instance = SigmaConfig(config_path=config_path)
+    elif config_path is not None:
+        if Path(config_path).resolve() == Path(_config_instance.config_path).resolve():
+            _config_instance.reload_if_changed(force=True)
+        else:
+            _config_instance = SigmaConfig(config_path=config_path)
     return _config_instance
 
 
@@ -0,0 +1,180 @@
+"""
+SIGMA-NEX Ollama Backend Pool
+
+Routing, health tracking and failover across several Ollama instances.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+def _has_model(model: str, names: Set[str]) -> bool:
+    """Match a model name against Ollama names, ignoring the ``:latest`` tag."""
+    if model in names or f"{model}:latest" in names:
+        return True
+    base = model.split(":", 1)[0]
+    return ":" not in model and any(name.split(":", 1)[0] == base for name in names)
+
+
+def build_generate_payload(model: str, prompt: str, keep_alive: Any = None) -> Dict[str, Any]:
+    """Build a non-streaming ``/api/generate`` payload.
+
+    ``keep_alive`` (e.g. ``"30m"``, seconds, or ``-1`` for forever) is only
+    sent when configured, leaving Ollama's default otherwise.
+    """
+    payload: Dict[str, Any] = {"model": model, "prompt": prompt, "stream": False}
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    return payload
+
+
+class OllamaBackend:
+    """State of a single Ollama endpoint."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.outstanding = 0
+        self.failures = 0
+        self.loaded_models: Set[str] = set()
+        self.available_models: Set[str] = set()
+        self.last_check = 0.0
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.url}/api/generate"
+
+    def __repr__(self) -> str:
+        return f"OllamaBackend({self.url!r}, healthy={self.healthy}, outstanding={self.outstanding})"
+
+
+class OllamaBackendPool:
+    """Pool of Ollama endpoints with least-outstanding, model-aware routing.
+
+    ``candidates(model)`` returns every backend in failover order: healthy
+    nodes first, preferring those with the model already loaded in memory,
+    then those that have it pulled, then by fewest in-flight requests.
+    Unhealthy nodes stay at the end as a last resort.
+    """
+
+    def __init__(self, urls: Optional[Iterable[str]] = None):
+        urls = [u for u in (urls or []) if u] or [DEFAULT_OLLAMA_URL]
+        # Preserve order, drop duplicates
+        self.backends: List[OllamaBackend] = [OllamaBackend(u) for u in dict.fromkeys(urls)]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "OllamaBackendPool":
+        """Build the pool from ``ollama_urls`` (list) or ``ollama_url`` (str)."""
+        urls = config.get("ollama_urls") if config is not None else None
+        if isinstance(urls, str):
+            urls = [urls]
+        if not isinstance(urls, (list, tuple)) or not urls:
+            single = config.get("ollama_url") if config is not None else None
+            urls = [single] if isinstance(single, str) and single else []
+        return cls(u for u in urls if isinstance(u, str))
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def candidates(self, model: Optional[str] = None) -> List[OllamaBackend]:
+        """Return backends ordered by routing preference for ``model``."""
+        with self._lock:
+            return sorted(self.backends, key=lambda b: self._rank(b, model))
+
+    @staticmethod
+    def _rank(backend: OllamaBackend, model: Optional[str]):
+        if model and _has_model(model, backend.loaded_models):
+            affinity = 0
+        elif model and _has_model(model, backend.available_models):
+            affinity = 1
+        else:
+            affinity = 2
+        return (not backend.healthy, affinity, backend.outstanding)
+
+    @contextmanager
+    def track(self, backend: OllamaBackend) -> Iterator[OllamaBackend]:
+        """Count a request as outstanding on ``backend`` while it runs."""
+        with self._lock:
+            backend.outstanding += 1
+        try:
+            yield backend
+        finally:
+            with self._lock:
+                backend.outstanding -= 1
+
+    def mark_success(self, backend: OllamaBackend, model: Optional[str] = None) -> None:
+        """Record a successful generation (the model is now loaded there)."""
+        with self._lock:
+            backend.healthy = True
+            backend.failures = 0
+            if model:
+                backend.loaded_models.add(model)
+
+    def mark_failure(self, backend: OllamaBackend) -> None:
+        """Record a transport failure; the backend is demoted until the next health check."""
+        with self._lock:
+            backend.failures += 1
+            backend.healthy = False
+
+    def update_health(
+        self,
+        backend: OllamaBackend,
+        healthy: bool,
+        loaded: Optional[Iterable[str]] = None,
+        available: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Apply the result of a health probe."""
+        with self._lock:
+            backend.healthy = healthy
+            backend.last_check = time.time()
+            if healthy:
+                backend.failures = 0
+            if loaded is not None:
+                backend.loaded_models = set(loaded)
+            if available is not None:
+                backend.available_models = set(available)
+
+    @staticmethod
+    def _model_names(data: Any) -> List[str]:
+        models = data.get("models", []) if isinstance(data, dict) else []
+        return [
+            m.get("name") or m.get("model") for m in models if isinstance(m, dict) and (m.get("name") or m.get("model"))
+        ]
+
+    async def check_health_async(self, timeout: float = 2.0) -> None:
+        """Probe every backend with httpx (used by the API server)."""
+        import httpx
+
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            for backend in self.backends:
+                try:
+                    ps = await client.get(f"{backend.url}/api/ps")
+                    tags = await client.get(f"{backend.url}/api/tags")
+                    ok = ps.status_code == 200 and tags.status_code == 200
+                    self.update_health(
+                        backend,
+                        ok,
+                        loaded=self._model_names(ps.json()) if ok else None,
+                        available=self._model_names(tags.json()) if ok else None,
+                    )
+                except Exception:
+                    self.update_health(backend, False)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return a snapshot of every backend's state."""
+        with self._lock:
+            return [
+                {
+                    "url": b.url,
+                    "healthy": b.healthy,
+                    "outstanding": b.outstanding,
+                    "failures": b.failures,
+                    "loaded_models": sorted(b.loaded_models),
+                }
+                for b in self.backends
+            ]
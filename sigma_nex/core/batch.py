@@ -0,0 +1,269 @@
+"""
+SIGMA-NEX Batch Processing
+
+Offline answer generation for a file of questions. Inputs are streamed in
+chunks; each chunk is translated and retrieved in batch, sent to Ollama with
+bounded parallelism and appended to a JSON Lines output that doubles as the
+resume checkpoint.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..utils.validation import ValidationError, sanitize_text_input, validate_prompt
+from .context import build_prompt
+
+# Keys tried, in order, to extract a question from a JSON object
+QUESTION_KEYS = ("question", "domanda", "query", "prompt", "text", "title")
+
+
+def extract_question(item: Any) -> Optional[str]:
+    """Return the question in a corpus item (string or object), if any."""
+    if isinstance(item, str):
+        return item.strip() or None
+    if isinstance(item, dict):
+        for key in QUESTION_KEYS:
+            value = item.get(key)
+            if isinstance(value, str) and value.strip():
+                return value.strip()
+    return None
+
+
+def iter_questions(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Stream ``(id, question)`` pairs from a JSON Lines or text file.
+
+    The id is the object's ``id`` (or ``request_id``) field when present,
+    otherwise the 1-based line number, so reruns map to the same ids.
+    Lines without a usable question are skipped.
+    """
+    is_jsonl = Path(path).suffix == ".jsonl"
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item: Any = line
+            if is_jsonl:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"[WARNING] Riga {line_no} non valida, ignorata")
+                    continue
+            question = extract_question(item)
+            if not question:
+                continue
+            item_id = item.get("id", item.get("request_id")) if isinstance(item, dict) else None
+            yield str(item_id if item_id is not None else line_no), question
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """
+    Return the ids already answered in ``output_path``.
+
+    A trailing partial line (interrupted write) is truncated so that new
+    results can be appended safely. Error records are removed from the
+    file: those questions are retried, so each id keeps a single record.
+    """
+    path = Path(output_path)
+    if not path.exists():
+        return set()
+
+    data = path.read_bytes()
+    if data and not data.endswith(b"\n"):
+        keep = data.rfind(b"\n") + 1
+        with open(path, "r+b") as f:
+            f.truncate(keep)
+        data = data[:keep]
+
+    done = set()
+    kept: List[bytes] = []
+    for line in data.splitlines(keepends=True):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            kept.append(line)
+            continue
+        if isinstance(record, dict) and "answer" not in record and "error" in record:
+            continue
+        if isinstance(record, dict) and "answer" in record:
+            done.add(str(record.get("id")))
+        kept.append(line)
+
+    if len(kept) < len(data.splitlines()):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.writelines(kept)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    return done
+
+
+class BatchProcessor:
+    """Run a question file through the Runner pipeline in chunks.
+
+    Per chunk: IT->EN translation (one batched call), FAISS retrieval (one
+    batched search), Ollama generation (``parallelism`` concurrent calls,
+    capped by the total ``ollama_max_concurrent``) and EN->IT translation.
+    Questions are independent: no conversation history is carried over.
+    """
+
+    def __init__(
+        self,
+        runner: Any,
+        parallelism: Optional[int] = None,
+        batch_size: int = 16,
+        translate: bool = True,
+    ):
+        """
+        Initialize the batch processor.
+
+        Args:
+            runner: Runner providing the model, system prompt and Ollama pool
+            parallelism: Concurrent Ollama calls (default: Ollama capacity)
+            batch_size: Questions per chunk (translation/retrieval batch)
+            translate: Translate IT->EN before and EN->IT after generation
+        """
+        config = getattr(runner, "config", None)
+        capacity = max(1, int(config.get("ollama_max_concurrent", 4) if hasattr(config, "get") else 4))
+
+        self.runner = runner
+        self.parallelism = max(1, min(parallelism or capacity, capacity))
+        self.batch_size = max(1, int(batch_size))
+        self.translate = translate
+
+    def _translate(self, texts: List[str], direction: str) -> List[str]:
+        if not self.translate:
+            return texts
+        from .translate import translate_batch
+
+        service = getattr(self.runner, "translation_service", None)
+        try:
+            if service is not None:
+                # Slices are translated in parallel by the worker processes
+                return service.translate_batch(texts, direction)
+            return translate_batch(texts, direction, batch_size=self.batch_size)
+        except Exception:
+            return texts
+
+    def _retrieve(self, queries: List[str]) -> List[Optional[List[str]]]:
+        if not self.runner.retrieval_enabled:
+            return [None] * len(queries)
+        from .retriever import search_moduli_batch
+
+        return search_moduli_batch(queries, k=3)
+
+    def _generate(self, prompt: Any) -> Tuple[Optional[str], Optional[str], float]:
+        if isinstance(prompt, Exception):
+            return None, f"Prompt validation error: {prompt}", 0.0
+        start = time.perf_counter()
+        try:
+            answer = self.runner._call_model(prompt)
+            elapsed = time.perf_counter() - start
+            self.runner.performance_stats.append(elapsed)
+            return answer, None, elapsed
+        except Exception as e:
+            return None, str(e), time.perf_counter() - start
+
+    def process_chunk(self, items: List[Tuple[str, str]], executor: ThreadPoolExecutor) -> List[Dict[str, Any]]:
+        """Answer one chunk of ``(id, question)`` pairs, preserving order."""
+        records: List[Dict[str, Any]] = []
+        valid: List[Tuple[int, str]] = []
+        for item_id, question in items:
+            record: Dict[str, Any] = {"id": item_id, "question": question}
+            try:
+                valid.append((len(records), sanitize_text_input(question, max_length=5000)))
+            except ValidationError as e:
+                record["error"] = f"Input validation error: {e}"
+            records.append(record)
+
+        if not valid:
+            return records
+
+        questions = [q for _, q in valid]
+        with self.runner._stage("translate_it_en"):
+            questions_en = self._translate(questions, "it-en")
+        with self.runner._stage("prompt"):
+            moduli = self._retrieve(questions_en)
+            prompts: List[Any] = []
+            for question_en, mods in zip(questions_en, moduli):
+                try:
+                    prompt = build_prompt(
+                        self.runner.system_prompt, [], question_en, self.runner.retrieval_enabled, moduli=mods
+                    )
+                    prompts.append(validate_prompt(prompt))
+                except ValidationError as e:
+                    prompts.append(e)
+
+        with self.runner._stage("llm"):
+            generated = list(executor.map(self._generate, prompts))
+
+        answered = [(pos, answer) for (pos, _), (answer, _, _) in zip(valid, generated) if answer is not None]
+        with self.runner._stage("translate_en_it"):
+            answers_it = self._translate([answer for _, answer in answered], "en-it")
+        translated = {pos: answer for (pos, _), answer in zip(answered, answers_it)}
+
+        for (pos, _), (answer, error, elapsed) in zip(valid, generated):
+            record = records[pos]
+            if error is not None:
+                record["error"] = error
+            else:
+                record["answer"] = translated[pos]
+                record["answer_en"] = answer
+            record["processing_time"] = round(elapsed, 3)
+        return records
+
+    def run(
+        self,
+        input_path: str,
+        output_path: str,
+        resume: bool = True,
+        progress: Optional[Callable[[int, int, int], None]] = None,
+    ) -> Dict[str, int]:
+        """
+        Process ``input_path`` into ``output_path`` (JSON Lines).
+
+        With ``resume``, ids already answered in ``output_path`` are skipped
+        and new results are appended; otherwise the output is overwritten.
+        Failed questions are written with an ``error`` field and retried on
+        the next resumed run, which replaces their error record.
+
+        Returns:
+            Counters: ``answered``, ``failed`` and ``skipped``
+        """
+        done = load_checkpoint(output_path) if resume else set()
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        counts = {"answered": 0, "failed": 0, "skipped": 0}
+
+        with (
+            open(output_path, "a" if resume else "w", encoding="utf-8") as out,
+            ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="sigma-batch") as executor,
+        ):
+            chunk: List[Tuple[str, str]] = []
+
+            def flush() -> None:
+                for record in self.process_chunk(chunk, executor):
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    counts["answered" if "answer" in record else "failed"] += 1
+                # Durable checkpoint after every chunk
+                out.flush()
+                os.fsync(out.fileno())
+                chunk.clear()
+                if progress:
+                    progress(counts["answered"], counts["failed"], counts["skipped"])
+
+            for item_id, question in iter_questions(input_path):
+                if item_id in done:
+                    counts["skipped"] += 1
+                    continue
+                chunk.append((item_id, question))
+                if len(chunk) >= self.batch_size:
+                    flush()
+            if chunk:
+                flush()
+
+        return counts
@@ -1,4 +1,9 @@
 # sigma_nex/core/context.py
+from typing import Optional
+
+from ..utils.tracing import traced
+
+
 def optimize_history(history: list, max_length: int = 4000, max_entries: int = 10) -> list:
     """
     Optimize conversation history by reducing length and keeping most relevant parts.
@@ -36,7 +41,14 @@ def optimize_history(history: list, max_length: int = 4000, max_entries: int = 1
     return optimized
 
 
-def build_prompt(system_prompt: str, history: list, query: str, retrieval_enabled: bool = True) -> str:
+@traced("build_prompt")
+def build_prompt(
+    system_prompt: str,
+    history: list,
+    query: str,
+    retrieval_enabled: bool = True,
+    moduli: Optional[list] = None,
+) -> str:
     """
     Costruisce il prompt finale per SIGMA-NEX unendo:
     - il prompt di sistema (interno, non rivelato)
@@ -46,19 +58,25 @@ def build_prompt(system_prompt: str, history: list, query: str, retrieval_enable
 
     Il system_prompt serve solo a modulare il comportamento del modello,
     ma non deve mai essere esposto nella risposta.
+
+    Se ``moduli`` è fornito, riusa i moduli già recuperati dal chiamante
+    invece di eseguire una nuova ricerca FAISS.
     """
     # Optimize history first to prevent context overflow
     optimized_history = optimize_history(history)
 
     knowledge = ""
     if retrieval_enabled:
-        # Recupera moduli rilevanti tramite FAISS (lazy import and safe fallback)
-        try:
-            from sigma_nex.core.retriever import search_moduli
-
-            moduli_rilevanti = search_moduli(query, k=3)
-        except Exception:
-            moduli_rilevanti = []
+        if moduli is not None:
+            moduli_rilevanti = moduli
+        else:
+            # Recupera moduli rilevanti tramite FAISS (lazy import and safe fallback)
+            try:
+                from sigma_nex.core.retriever import search_moduli
+
+                moduli_rilevanti = search_moduli(query, k=3)
+            except Exception:
+                moduli_rilevanti = []
 
         for i, mod in enumerate(moduli_rilevanti):
             if isinstance(mod, str):
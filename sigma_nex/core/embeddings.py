@@ -0,0 +1,317 @@
+"""
+SIGMA-NEX Embedding Backends
+
+The MiniLM sentence encoder used for retrieval and the semantic cache,
+loaded from local files only. The ``torch`` backend runs the
+sentence-transformers model; the ``onnx`` backend runs the same transformer
+exported to ONNX (optionally int8-quantized) with onnxruntime and mean-pools
+the token embeddings in numpy, which encodes short queries faster and keeps
+torch out of the worker's resident memory. ``sigma export-onnx`` writes the
+ONNX model into the ``onnx/`` folder of the local model and checks it
+against the torch model.
+
+In offline mode (the default) the Hugging Face libraries are switched to
+offline mode before a model is loaded and no model is ever downloaded.
+"""
+
+import importlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+BACKENDS = ("auto", "torch", "onnx")
+
+ONNX_FILE = "model.onnx"
+QUANTIZED_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+METADATA_FILE = "sigma_onnx.json"
+
+# Environment variables that stop transformers / huggingface_hub from calling the Hub
+OFFLINE_ENV = ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE", "HF_DATASETS_OFFLINE")
+
+# Short survival questions used to compare the backends
+SAMPLE_TEXTS = (
+    "Come disinfetto una ferita senza alcol?",
+    "Come si purifica l'acqua piovana?",
+    "Segni di ipotermia e primo soccorso",
+    "How do I start a fire with wet wood?",
+    "fuoco :: Raccogli esca secca e accendi il fuoco al riparo dal vento.",
+)
+
+# Embedding backend settings (embedding_* keys, see configure_embeddings)
+_settings: Dict[str, Any] = {
+    "backend": "auto",  # "auto": ONNX if exported and onnxruntime is installed, else torch
+    "onnx_path": None,  # ONNX model folder (None: <model>/onnx)
+    "quantized": True,  # prefer model.int8.onnx when present
+    "offline": True,  # never download models
+}
+
+
+def configure_embeddings(config: Any) -> None:
+    """Apply ``embedding_*`` settings (unset or invalid keys keep the defaults)."""
+    if config is None or not hasattr(config, "get"):
+        return
+    backend = config.get("embedding_backend")
+    if backend in BACKENDS:
+        _settings["backend"] = backend
+    onnx_path = config.get("embedding_onnx_path")
+    if isinstance(onnx_path, str) and onnx_path:
+        _settings["onnx_path"] = os.path.expanduser(onnx_path)
+    for key in ("quantized", "offline"):
+        value = config.get(f"embedding_{key}")
+        if isinstance(value, bool):
+            _settings[key] = value
+
+
+def get_backend() -> str:
+    """Configured backend: ``auto``, ``torch`` or ``onnx``."""
+    return _settings["backend"]
+
+
+def offline() -> bool:
+    """True if models must only be loaded from local files."""
+    return _settings["offline"]
+
+
+def enforce_offline() -> None:
+    """Put the Hugging Face libraries in offline mode (no-op when downloads are allowed)."""
+    if _settings["offline"]:
+        for name in OFFLINE_ENV:
+            os.environ[name] = "1"
+
+
+def onnx_dir(model_path: str) -> str:
+    """Folder holding the ONNX export of the model at ``model_path``."""
+    return _settings["onnx_path"] or os.path.join(model_path, "onnx")
+
+
+def _import(name: str) -> Any:
+    """Import an optional dependency, with an install hint if it is missing."""
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        package = {"onnxruntime.quantization": "onnxruntime"}.get(name, name.split(".")[0])
+        raise ImportError(f"{name} is required for the ONNX embedding backend: pip install {package}") from e
+
+
+def _load_session(path: str, threads: int) -> Any:
+    ort = _import("onnxruntime")
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def _load_tokenizer(path: str, max_length: int) -> Any:
+    tokenizer = _import("tokenizers").Tokenizer.from_file(path)
+    tokenizer.enable_truncation(max_length=max_length)
+    pad_token = (tokenizer.padding or {}).get("pad_token", "[PAD]")
+    tokenizer.enable_padding(pad_id=tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+    return tokenizer
+
+
+class OnnxEncoder:
+    """Sentence encoder running an exported transformer with onnxruntime.
+
+    ``encode`` takes the arguments of ``SentenceTransformer.encode`` that
+    the retriever and the semantic cache use. onnxruntime and tokenizer
+    thread pools do not survive ``fork``, so a forked worker opens its own
+    session on first use.
+    """
+
+    semantic = True
+
+    def __init__(self, directory: str, quantized: Optional[bool] = None, threads: Optional[int] = None):
+        quantized = _settings["quantized"] if quantized is None else quantized
+        self.directory = directory
+        self.file = (
+            QUANTIZED_FILE if quantized and os.path.exists(os.path.join(directory, QUANTIZED_FILE)) else ONNX_FILE
+        )
+        self.path = os.path.join(directory, self.file)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"ONNX embedding model not found: {self.path} (run 'sigma export-onnx')")
+        try:
+            with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = {}
+        self.max_length = int(metadata.get("max_length", 128))
+        self.threads = threads or 1
+        self._pid = -1
+        self._load()
+
+    def _load(self) -> None:
+        self._session = _load_session(self.path, self.threads)
+        self._tokenizer = _load_tokenizer(os.path.join(self.directory, TOKENIZER_FILE), self.max_length)
+        self._inputs = {i.name for i in self._session.get_inputs()}
+        self._pid = os.getpid()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.encode(["dimensione"]).shape[1])
+
+    def encode(
+        self,
+        sentences: Any,
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs: Any,
+    ) -> np.ndarray:
+        """Mean-pooled embeddings of ``sentences`` (one row per text, float32)."""
+        if self._pid != os.getpid():
+            self._load()
+        single = isinstance(sentences, str)
+        texts: List[str] = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        batch_size = max(1, batch_size)
+        batches = [self._encode_batch(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)]
+        embeddings = np.concatenate(batches) if len(batches) > 1 else batches[0]
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(list(texts))
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self._session.run(None, feeds)[0]
+        # Mean over the real tokens (sentence-transformers Pooling, mode "mean")
+        weights = mask[:, :, None].astype(np.float32)
+        summed = (hidden * weights).sum(axis=1)
+        return (summed / np.maximum(weights.sum(axis=1), 1e-9)).astype(np.float32)
+
+
+def load_onnx(model_path: str, threads: Optional[int] = None) -> OnnxEncoder:
+    """ONNX encoder for the model exported from ``model_path``."""
+    return OnnxEncoder(onnx_dir(model_path), threads=threads)
+
+
+def export_onnx(
+    model_path: str, output_dir: Optional[str] = None, quantize: bool = True, opset: int = 14
+) -> Dict[str, Any]:
+    """
+    Export the transformer of the sentence-transformers model at
+    ``model_path`` to ONNX, with its tokenizer, and write an int8 copy
+    (dynamic quantization) when ``quantize`` is set.
+
+    Needs torch, transformers and (for ``quantize``) onnxruntime; the model
+    is read from local files only.
+
+    Returns:
+        Output folder, written files and embedding dimension
+    """
+    torch = _import("torch")
+    transformers = _import("transformers")
+    enforce_offline()
+    output_dir = output_dir or onnx_dir(model_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = transformers.AutoTokenizer.from_pretrained(model_path, local_files_only=True)
+    model = transformers.AutoModel.from_pretrained(model_path, local_files_only=True).eval()
+    max_length = min(int(getattr(tokenizer, "model_max_length", 512) or 512), 512)
+    try:
+        with open(os.path.join(model_path, "sentence_bert_config.json"), encoding="utf-8") as f:
+            max_length = int(json.load(f).get("max_seq_length", max_length))
+    except (OSError, ValueError):
+        pass
+
+    sample = tokenizer(list(SAMPLE_TEXTS[:2]), padding=True, return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    axes = {n: {0: "batch", 1: "sequence"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    path = os.path.join(output_dir, ONNX_FILE)
+    with torch.inference_mode():
+        dimension = int(model(**sample).last_hidden_state.shape[-1])
+        torch.onnx.export(
+            model,
+            tuple(sample[n] for n in names),
+            path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(output_dir)
+    if not os.path.exists(os.path.join(output_dir, TOKENIZER_FILE)):
+        raise RuntimeError(f"{model_path} has no fast tokenizer ({TOKENIZER_FILE}); cannot run without transformers")
+
+    files = [ONNX_FILE]
+    if quantize:
+        quantization = _import("onnxruntime.quantization")
+        quantization.quantize_dynamic(
+            path, os.path.join(output_dir, QUANTIZED_FILE), weight_type=quantization.QuantType.QInt8
+        )
+        files.append(QUANTIZED_FILE)
+
+    with open(os.path.join(output_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "source": os.path.basename(os.path.normpath(model_path)),
+                "max_length": max_length,
+                "dimension": dimension,
+            },
+            f,
+            indent=2,
+        )
+    return {"output_dir": output_dir, "files": files, "dimension": dimension}
+
+
+def _timed(encoder: Any, texts: Sequence[str], repeat: int) -> float:
+    """Mean milliseconds to encode one text, after a warm-up pass."""
+    encoder.encode(list(texts))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            encoder.encode([text])
+    return (time.perf_counter() - start) * 1000 / (repeat * len(texts))
+
+
+def verify_onnx(
+    model_path: str,
+    reference: Any = None,
+    quantized: Optional[bool] = None,
+    threshold: float = 0.98,
+    texts: Sequence[str] = SAMPLE_TEXTS,
+    repeat: int = 3,
+) -> Dict[str, Any]:
+    """
+    Check the ONNX export of ``model_path``: it must load, return finite
+    vectors and, when a ``reference`` torch encoder is given, match it with
+    cosine similarity of at least ``threshold`` on every text.
+
+    Returns:
+        ``ok``, the ONNX file used, the dimension, min/mean cosine against
+        the reference (None without one) and the per-query encode times
+    """
+    encoder = OnnxEncoder(onnx_dir(model_path), quantized=quantized)
+    vectors = np.asarray(encoder.encode(list(texts)), dtype=np.float32)
+    report: Dict[str, Any] = {
+        "file": encoder.path,
+        "dimension": int(vectors.shape[1]),
+        "min_cosine": None,
+        "mean_cosine": None,
+        "onnx_ms": _timed(encoder, texts, repeat),
+        "torch_ms": None,
+    }
+    ok = bool(np.isfinite(vectors).all())
+    if reference is not None:
+        expected = np.asarray(reference.encode(list(texts), convert_to_numpy=True), dtype=np.float32)
+        if expected.shape != vectors.shape:
+            ok = False
+        else:
+            norms = np.linalg.norm(expected, axis=1) * np.linalg.norm(vectors, axis=1)
+            cosine = (expected * vectors).sum(axis=1) / np.maximum(norms, 1e-12)
+            report["min_cosine"] = float(cosine.min())
+            report["mean_cosine"] = float(cosine.mean())
+            ok = ok and report["min_cosine"] >= threshold
+        report["torch_ms"] = _timed(reference, texts, repeat)
+    report["ok"] = ok
+    return report
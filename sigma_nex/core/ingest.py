@@ -0,0 +1,241 @@
+"""
+SIGMA-NEX Knowledge Ingestion
+
+Splits the framework modules (description, ``comandi`` steps, ``fallback``)
+and additional Markdown/text manuals into overlapping chunks for the FAISS
+index. Every chunk is stored as ``"<source> :: <text>"``, the format
+``build_prompt`` already renders as a named module block, so a prompt only
+carries the steps relevant to the question.
+
+PDF manuals are ingested through their extracted text (e.g. ``pdftotext``
+output saved as ``.txt``).
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DOCUMENT_SUFFIXES = (".md", ".markdown", ".txt")
+
+# Chunking settings (chunk_* / knowledge_paths keys, see configure_ingest)
+_settings: Dict[str, Any] = {
+    "enabled": True,  # False: one "nome :: descrizione" entry per module
+    "chunk_size": 400,  # characters (MiniLM reads ~128 tokens)
+    "overlap": 100,  # characters repeated from the previous chunk
+    "paths": [],  # extra manuals: files or directories
+    "batch_size": 64,  # texts per encode call
+}
+
+# Integer config keys: (setting, smallest accepted value)
+_INT_KEYS = {
+    "chunk_size": ("chunk_size", 1),
+    "chunk_overlap": ("overlap", 0),
+    "ingest_batch_size": ("batch_size", 1),
+}
+
+# A document section is split once its buffer exceeds this many chunks
+_SECTION_BUFFER_CHUNKS = 16
+
+# Sentence ends and numbered steps ("1. ", "2) ") start a new unit
+_UNIT_BOUNDARY = re.compile(r"(?<=[^\d\s][.!?;])\s+|\s+(?=\d{1,2}[.)]\s)")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+
+
+def configure_ingest(config: Any) -> None:
+    """Apply chunking settings (unset or invalid keys keep the defaults)."""
+    if config is None or not hasattr(config, "get"):
+        return
+    enabled = config.get("retrieval_chunking")
+    if isinstance(enabled, bool):
+        _settings["enabled"] = enabled
+    for key, (setting, minimum) in _INT_KEYS.items():
+        value = config.get(key)
+        if isinstance(value, int) and not isinstance(value, bool) and value >= minimum:
+            _settings[setting] = value
+    paths = config.get("knowledge_paths")
+    if isinstance(paths, (list, tuple)):
+        _settings["paths"] = [str(p) for p in paths if isinstance(p, (str, Path))]
+    _settings["overlap"] = min(_settings["overlap"], _settings["chunk_size"] // 2)
+
+
+def _units(text: str, size: int) -> List[str]:
+    """Sentences/steps of ``text``; longer than ``size`` ones are cut at words."""
+    units: List[str] = []
+    for unit in _UNIT_BOUNDARY.split(text):
+        unit = " ".join(unit.split())
+        while len(unit) > size:
+            cut = unit.rfind(" ", 0, size)
+            cut = cut if cut > 0 else size
+            units.append(unit[:cut])
+            unit = unit[cut:].lstrip()
+        if unit:
+            units.append(unit)
+    return units
+
+
+def split_text(text: str, size: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+    """
+    Split ``text`` into chunks of at most ``size`` characters.
+
+    Chunks end on sentence/step boundaries; the last units of a chunk (up to
+    ``overlap`` characters) are repeated at the start of the next one.
+    """
+    size = size or _settings["chunk_size"]
+    overlap = _settings["overlap"] if overlap is None else overlap
+    return _pack(_units(text, size), size, overlap)
+
+
+def _pack(units: Sequence[str], size: int, overlap: int) -> List[str]:
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+    for unit in units:
+        if current and length + 1 + len(unit) > size:
+            chunks.append(" ".join(current))
+            # Carry the tail of the chunk over as context
+            tail: List[str] = []
+            tail_length = 0
+            for previous in reversed(current):
+                if tail_length + len(previous) + 1 > overlap:
+                    break
+                tail.insert(0, previous)
+                tail_length += len(previous) + 1
+            if tail_length + len(unit) > size:
+                tail, tail_length = [], 0
+            current, length = tail, max(tail_length - 1, 0)
+        current.append(unit)
+        length += len(unit) + (1 if len(current) > 1 else 0)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def chunk_entry(source: str, text: str) -> str:
+    """Indexed text of a chunk."""
+    return f"{source} :: {text}"
+
+
+def module_chunks(mod: dict) -> Iterator[Tuple[str, str]]:
+    """
+    Yield ``(source, entry)`` for a framework module.
+
+    The first entry is ``nome :: descrizione`` (the whole module, as indexed
+    before chunking), then the ``comandi`` steps and the ``fallback`` in
+    overlapping chunks.
+    """
+    name = str(mod["nome"])
+    yield name, chunk_entry(name, mod["descrizione"])
+    if not _settings["enabled"]:
+        return
+
+    size, overlap = _settings["chunk_size"], _settings["overlap"]
+    steps = mod.get("comandi") or []
+    if isinstance(steps, str):
+        steps = [steps]
+    units = [u for step in steps for u in _units(str(step), size)]
+    for chunk in _pack(units, size, overlap):
+        yield name, chunk_entry(name, chunk)
+
+    fallback = mod.get("fallback")
+    if isinstance(fallback, str) and fallback.strip():
+        for chunk in split_text(fallback, size, overlap):
+            yield name, chunk_entry(name, f"Fallback: {chunk}")
+
+
+def document_chunks(path: Path) -> Iterator[Tuple[str, str]]:
+    """
+    Yield ``(source, entry)`` for a Markdown or text manual.
+
+    The file is read line by line; each chunk is labelled with the file name
+    and its Markdown section (``manuale > Sezione``). Long sections are split
+    while reading, so memory stays bounded by the section buffer.
+    """
+    size, overlap = _settings["chunk_size"], _settings["overlap"]
+    source = path.stem
+    headings: List[str] = []
+    buffer: List[str] = []
+    buffered = 0
+
+    def label() -> str:
+        return " > ".join([source, *headings[-2:]])
+
+    def flush(final: bool) -> Iterator[Tuple[str, str]]:
+        nonlocal buffer, buffered
+        chunks = split_text(" ".join(buffer), size, overlap) if buffer else []
+        if not final and len(chunks) > 1:
+            # Keep the last (possibly partial) chunk to join the next lines
+            buffer, buffered = [chunks[-1]], len(chunks[-1])
+            chunks = chunks[:-1]
+        else:
+            buffer, buffered = [], 0
+        for chunk in chunks:
+            yield label(), chunk_entry(label(), chunk)
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            heading = _HEADING.match(line)
+            if heading:
+                yield from flush(final=True)
+                level = len(heading.group(1))
+                headings = headings[: level - 1] + [heading.group(2)]
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            buffer.append(line)
+            buffered += len(line) + 1
+            if buffered > size * _SECTION_BUFFER_CHUNKS:
+                yield from flush(final=False)
+    yield from flush(final=True)
+
+
+def iter_document_paths(paths: Iterable[str], root: Optional[str] = None) -> Iterator[Path]:
+    """Manual files under ``paths`` (files or directories, relative to ``root``), in a stable order."""
+    for raw in paths:
+        path = Path(raw).expanduser()
+        if root is not None and not path.is_absolute():
+            path = Path(root) / path
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in DOCUMENT_SUFFIXES)
+        elif path.is_file():
+            yield path
+        else:
+            print(f"[WARNING] Percorso della knowledge base non trovato: {path}")
+
+
+def iter_chunks(
+    moduli: Iterable[dict], paths: Optional[Iterable[str]] = None, root: Optional[str] = None
+) -> Iterator[Tuple[str, str]]:
+    """Yield ``(source, entry)`` for the modules and the manuals (default: ``knowledge_paths``)."""
+    for mod in moduli:
+        yield from module_chunks(mod)
+    for path in iter_document_paths(_settings["paths"] if paths is None else paths, root):
+        try:
+            yield from document_chunks(path)
+        except OSError as e:
+            print(f"[WARNING] Impossibile leggere {path}: {e}")
+
+
+def encode_batches(model: Any, texts: Sequence[str], batch_size: Optional[int] = None):
+    """
+    Encode ``texts`` ``batch_size`` at a time into one float32 matrix.
+
+    The matrix is allocated after the first batch, so peak memory is the
+    result plus one batch of model activations. A single batch is passed
+    to the model unchanged.
+    """
+    batch_size = max(1, batch_size or _settings["batch_size"])
+    if len(texts) <= batch_size:
+        return model.encode(list(texts), convert_to_numpy=True)
+
+    import numpy as np
+
+    matrix = None
+    for start in range(0, len(texts), batch_size):
+        batch = np.asarray(
+            model.encode(list(texts[start : start + batch_size]), convert_to_numpy=True), dtype="float32"
+        )
+        if matrix is None:
+            matrix = np.empty((len(texts), batch.shape[1]), dtype="float32")
+        matrix[start : start + len(batch)] = batch
+    return matrix
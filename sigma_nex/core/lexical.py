@@ -0,0 +1,179 @@
+"""
+SIGMA-NEX Lexical Index
+
+BM25 inverted index over the indexed chunks, built next to the FAISS index.
+MiniLM embeddings find paraphrases but can miss exact terms (drug names such
+as "povidone" or "clorexidina"); ``search_moduli`` fuses the BM25 and vector
+rankings with reciprocal-rank fusion, and ranks with BM25 alone when no
+embedding model is available.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Lexical search settings (retrieval_hybrid / bm25_* keys, see configure_lexical)
+_settings: Dict[str, Any] = {
+    "enabled": True,  # False: vector search only
+    "k1": 1.2,  # term frequency saturation
+    "b": 0.75,  # document length normalization
+    "rrf_k": 60,  # reciprocal-rank fusion constant
+    "candidates": 20,  # hits taken from each ranking before fusion
+}
+
+# Articles, prepositions and other words that carry no meaning for retrieval
+STOPWORDS = frozenset("""
+    il lo la le gli un una uno di da in con su per tra fra del dello della dei degli delle al allo alla ai agli
+    alle dal dallo dalla dai dagli dalle nel nello nella nei negli nelle sul sullo sulla sui sugli sulle col coi
+    ed che chi cui non come dove quando se ma anche piu sono essere ha hanno ho era questo questa questi queste
+    quello quella quelli quelle suo sua suoi sue loro mio mia tuo tua ci si ne vi mi ti
+    the and of to for with on is are
+    """.split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def configure_lexical(config: Any) -> None:
+    """Apply lexical search settings (unset or invalid keys keep the defaults)."""
+    if config is None or not hasattr(config, "get"):
+        return
+    enabled = config.get("retrieval_hybrid")
+    if isinstance(enabled, bool):
+        _settings["enabled"] = enabled
+    for key, setting in (("bm25_k1", "k1"), ("bm25_b", "b")):
+        value = config.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0:
+            _settings[setting] = float(min(value, 1.0) if setting == "b" else value)
+    for key, setting in (("retrieval_rrf_k", "rrf_k"), ("retrieval_candidates", "candidates")):
+        value = config.get(key)
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            _settings[setting] = value
+
+
+def _stem(token: str) -> str:
+    # Italian singular/plural and gender endings: "ferita"/"ferite" -> "ferit"
+    return token[:-1] if len(token) > 4 and token[-1] in "aeio" else token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, accent-free, lightly stemmed terms of ``text`` without stopwords."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [_stem(t) for t in _TOKEN.findall(text) if len(t) > 1 and t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts, addressed by the FAISS ids.
+
+    Postings are stored term by term in flat arrays (``offsets`` delimits
+    the ids and term frequencies of each term), so the index loads from one
+    ``.npz`` file without per-document Python objects.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_lengths: np.ndarray,
+    ):
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "BM25Index":
+        """Index ``texts`` (the i-th text gets id i)."""
+        postings: Dict[str, List[List[int]]] = {}
+        lengths: List[int] = []
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                ids, counts = postings.setdefault(term, [[], []])
+                ids.append(doc)
+                counts.append(tf)
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings[term][0])
+        doc_ids = np.fromiter((d for t in terms for d in postings[t][0]), dtype="int32", count=int(offsets[-1]))
+        tfs = np.fromiter((c for t in terms for c in postings[t][1]), dtype="float32", count=int(offsets[-1]))
+        return cls(terms, offsets, doc_ids, tfs, np.asarray(lengths, dtype="float32"))
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def save(self, path: str) -> None:
+        """Write the index to ``path`` (numpy ``.npz``, no pickled objects)."""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.asarray(list(self.terms), dtype=str),
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                tfs=self.tfs,
+                doc_lengths=self.doc_lengths,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Read an index written by ``save``."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["terms"].tolist(), data["offsets"], data["doc_ids"], data["tfs"], data["doc_lengths"])
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for ``query``."""
+        scores = np.zeros(len(self), dtype="float32")
+        if not len(self):
+            return scores
+        k1, b = _settings["k1"], _settings["b"]
+        norm = k1 * (1.0 - b + b * self.doc_lengths / max(self.avg_length, 1e-9))
+        for term in set(tokenize(query)):
+            i = self.terms.get(term)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            ids, tf = self.doc_ids[start:end], self.tfs[start:end]
+            idf = math.log(1.0 + (len(self) - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (k1 + 1.0) / (tf + norm[ids])
+        return scores
+
+    def search_scored(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """``(id, score)`` of the best ``k`` documents containing at least one query term."""
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        # Highest score first, lower id first on ties
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        return [(int(i), float(scores[i])) for i in hits]
+
+    def search(self, query: str, k: int) -> List[int]:
+        """Ids of the best ``k`` documents containing at least one query term."""
+        return [i for i, _ in self.search_scored(query, k)]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[int]], k: int) -> List[Tuple[int, float]]:
+    """
+    Merge rankings of ids: each id scores ``sum(1 / (rrf_k + rank))``.
+
+    Returns the best ``k`` ``(id, score)`` pairs. Ties keep the order in
+    which the ids were first seen, so an empty lexical ranking leaves the
+    vector ranking unchanged.
+    """
+    rrf_k = _settings["rrf_k"]
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
@@ -0,0 +1,110 @@
+"""
+SIGMA-NEX Mapping Store
+
+Compact binary file holding the indexed texts (the FAISS id -> text
+mapping). Layout, little-endian::
+
+    magic    8 bytes  b"SGMAP1\\n\\0"
+    count    uint64
+    offsets  uint64[count + 1]   byte offsets into the blob
+    blob     UTF-8 texts, concatenated
+
+The file is memory-mapped: opening it reads nothing but the header, and a
+lookup by id decodes only the requested text. Pre-fork workers share the
+mapped pages with the master.
+"""
+
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from typing import Any, Iterable, List, Union
+
+MAGIC = b"SGMAP1\n\0"
+_HEADER = struct.Struct("<8sQ")
+_OFFSET = struct.Struct("<Q")
+_SPAN = struct.Struct("<QQ")
+
+
+def write_mapping(path: str, texts: Iterable[str]) -> int:
+    """
+    Write ``texts`` to ``path`` in the store format.
+
+    Returns:
+        Number of texts written
+    """
+    encoded: List[bytes] = [str(text).encode("utf-8") for text in texts]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(encoded)))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.writelines(encoded)
+    return len(encoded)
+
+
+class MappingStore(Sequence):
+    """Read-only, memory-mapped sequence of the texts in a store file.
+
+    Behaves like the list it replaces (``len``, indexing, slicing,
+    iteration, ``==`` with a list). Index rebuilds write a new file instead
+    of replacing a mapped one (Windows refuses to); the mapping is released
+    with the last reference to the store, or by ``close()``.
+    """
+
+    def __init__(self, path: str):
+        """
+        Map ``path``.
+
+        Raises:
+            ValueError: If the file is not a mapping store
+        """
+        self.path = path
+        # os.open: the mapping does not depend on builtins.open
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            self._mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise ValueError(f"Mapping store troncato: {path}")
+        magic, self._count = _HEADER.unpack_from(self._mm, 0)
+        self._blob = _HEADER.size + _OFFSET.size * (self._count + 1)
+        if magic != MAGIC or len(self._mm) < self._blob:
+            self._mm.close()
+            raise ValueError(f"Formato mapping non valido: {path}")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _text(self, i: int) -> str:
+        start, end = _SPAN.unpack_from(self._mm, _HEADER.size + _OFFSET.size * i)
+        return str(self._mm[self._blob + start : self._blob + end], "utf-8")
+
+    def __getitem__(self, i: Union[int, slice]) -> Any:
+        if isinstance(i, slice):
+            return [self._text(j) for j in range(*i.indices(self._count))]
+        i = int(i)
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("mapping index out of range")
+        return self._text(i)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._text(i)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (MappingStore, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MappingStore({self.path!r}, {self._count} texts)"
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self._mm.close()
@@ -1,8 +1,21 @@
 # sigma_nex/core/retriever.py
+import contextlib
+import hashlib
+import itertools
 import json
+import math
 import os
+import re
+import threading
 import time
-from typing import List
+from typing import Any, Dict, List, Optional
+
+from ..utils import cpu_profile
+from ..utils.metrics import stage_timer
+from ..utils.rwlock import ReadWriteLock
+from ..utils.tracing import traced
+from . import embeddings, ingest
+from .mapping_store import MappingStore, write_mapping
 
 # Lazy/optional imports to avoid heavy dependencies during import time
 try:  # faiss is optional in CI; tests may mock it
@@ -10,15 +23,21 @@ try:  # faiss is optional in CI; tests may mock it
 except Exception:  # pragma: no cover
     faiss = None  # type: ignore
 
-try:  # sentence-transformers is large; allow absence in tests
-    from sentence_transformers import SentenceTransformer  # type: ignore
-except Exception:  # pragma: no cover
-    SentenceTransformer = None  # type: ignore
+try:  # POSIX file locks (msvcrt on Windows)
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+# sentence-transformers imports torch; it is imported on first use so that
+# the ONNX embedding backend runs without torch in memory (None: not installed)
+_NOT_IMPORTED: Any = object()
+SentenceTransformer: Any = _NOT_IMPORTED
 
 # Percorsi file
 DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "Framework_SIGMA.json")
 INDEX_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "moduli.index")
 MAPPING_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "moduli.mapping.json")
+SOURCES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "moduli.sources.json")
 MODEL_PATH = os.path.join(
     os.path.dirname(__file__),
     "..",
@@ -33,92 +52,324 @@ MODEL_PATH = os.path.join(
 _model = None
 # Backward-compat global used by tests to patch
 model = None
-# FAISS index cache
-_cached_index = None
-_cached_texts = None
-_index_cache_time = 0.0
-INDEX_CACHE_TTL = 3600  # 1 hour cache
+# Seconds between checks of the index files for changes made by other processes
+REFRESH_INTERVAL = 5.0
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+INDEX_METRICS = ("l2", "cosine")
+
+# Index type and search parameters (index_* settings, see configure_index)
+_index_settings: Dict[str, Any] = {
+    "type": "flat",
+    "metric": "l2",  # "cosine": inner product on normalized vectors
+    "nlist": 0,  # IVF lists (0: 4 * sqrt(n))
+    "nprobe": 8,  # IVF lists visited per query
+    "pq_m": 16,  # PQ sub-quantizers (lowered to a divisor of the dimension)
+    "pq_bits": 8,
+    "hnsw_m": 32,
+    "ef_construction": 40,
+    "ef_search": 64,
+}
+
+# Result filtering (retrieval_max_distance / retrieval_dynamic_* keys, see configure_search)
+_relevance_settings: Dict[str, Any] = {
+    "max_distance": None,  # drop vector hits farther than this (None: no cutoff)
+    "dynamic_k": False,  # return fewer than k results when the best hits stand out
+    "dynamic_ratio": 2.0,  # keep hits within ratio x the best distance (1/ratio x the best BM25 score)
+}
+
+
+class _StubEncoder:
+    """Stand-in embedding model returning zero vectors (no semantic signal)."""
+
+    # search_moduli ranks with BM25 alone when the model is not semantic
+    semantic = False
+
+    def encode(self, texts, convert_to_numpy=True):
+        import numpy as _np  # local import to avoid hard dependency
+
+        # Return deterministic zero embeddings with small dim
+        return _np.zeros((len(texts), 8), dtype=_np.float32)
+
+
+def _stub_model():
+    print("[WARNING] Using stub embeddings model - semantic search disabled")
+    print("[INFO] Install sentence-transformers for full functionality:")
+    print("       pip install sentence-transformers")
+    return _StubEncoder()
+
+
+def _sentence_transformer() -> Any:
+    """The ``SentenceTransformer`` class, imported on first call (None if unavailable)."""
+    global SentenceTransformer
+    if SentenceTransformer is _NOT_IMPORTED:
+        try:  # sentence-transformers is large; allow absence in tests
+            from sentence_transformers import SentenceTransformer as _cls  # type: ignore
+        except Exception:
+            _cls = None
+        SentenceTransformer = _cls
+    return SentenceTransformer
 
 
 def _get_model():
-    """Return a sentence transformer model, loading it lazily.
-
-    Falls back to a lightweight stub that returns zero vectors if the real
-    dependency or local files are unavailable. This keeps unit tests decoupled
-    from heavyweight downloads.
+    """Return the embedding model, loading it lazily from local files.
+
+    Uses the ONNX export of the model when the ``embedding_backend`` allows
+    it (see ``embeddings``), else the sentence-transformers model. Only with
+    ``embedding_offline: false`` may the default model be downloaded. Falls
+    back to a lightweight stub that returns zero vectors if the real
+    dependency or local files are unavailable. This keeps unit tests
+    decoupled from heavyweight downloads.
     """
     global _model
     if _model is not None:
         return _model
 
-    if SentenceTransformer is None:
-
-        class _Stub:
-            def encode(self, texts, convert_to_numpy=True):
-                import numpy as _np  # local import to avoid hard dependency
-
-                # Return deterministic zero embeddings with small dim
-                arr = _np.zeros((len(texts), 8), dtype=_np.float32)
-                return arr
+    embeddings.enforce_offline()
+    backend = embeddings.get_backend()
+    if backend != "torch":
+        try:
+            _model = embeddings.load_onnx(MODEL_PATH, threads=cpu_profile.resolve_threads("embedding")[0])
+            print(f"[INFO] Loaded ONNX embedding model ({_model.file})")
+            return _model
+        except Exception as e:
+            if backend == "onnx":
+                print(f"[WARNING] ONNX embedding model unavailable: {e}")
 
-        _model = _Stub()
-        print("[WARNING] Using stub embeddings model - semantic search disabled")
-        print("[INFO] Install sentence-transformers for full functionality:")
-        print("       pip install sentence-transformers")
+    if _sentence_transformer() is None:
+        _model = _stub_model()
         return _model
 
+    cpu_profile.apply_threads("embedding")
     try:
-        _model = SentenceTransformer(MODEL_PATH)
+        _model = cpu_profile.maybe_compile(SentenceTransformer(MODEL_PATH))
         print("[INFO] Loaded local embedding model from cache")
         return _model
     except Exception:
-        try:
-            _model = SentenceTransformer("all-MiniLM-L6-v2")
-            print("[INFO] Loaded default embedding model: all-MiniLM-L6-v2")
-            return _model
-        except Exception:
-            # Fallback to stub if local model not present
-            class _Stub:
-                def encode(self, texts, convert_to_numpy=True):
-                    import numpy as _np
-
-                    return _np.zeros((len(texts), 8), dtype=_np.float32)
-
-            _model = _Stub()
-            print("[WARNING] Using stub embeddings model - semantic search disabled")
-            print("[INFO] Install sentence-transformers for full functionality:")
-            print("       pip install sentence-transformers")
-            return _model
+        if embeddings.offline():
+            print(f"[WARNING] No local embedding model in {MODEL_PATH} (offline mode, no download)")
+        else:
+            try:
+                _model = cpu_profile.maybe_compile(SentenceTransformer("all-MiniLM-L6-v2"))
+                print("[INFO] Loaded default embedding model: all-MiniLM-L6-v2")
+                return _model
+            except Exception:
+                pass
+        # Fallback to stub if local model not present
+        _model = _stub_model()
+        return _model
 
 
 class Retriever:
-    """Retriever class for semantic search using FAISS."""
+    """FAISS index, indexed texts and BM25 index, shared between threads.
+
+    Queries read an immutable snapshot under the shared side of a
+    read-write lock; a new snapshot is swapped in under the exclusive side.
+    Every ``refresh_interval`` seconds a query checks the manifest and the
+    index files and, if another process published new ones, one background
+    thread loads them while queries keep using the current snapshot. Only the first
+    load, when there is nothing to serve yet, blocks the caller.
+    """
 
-    def __init__(self, index_path: str, model_name: str):
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        model_name: Optional[str] = None,
+        refresh_interval: Optional[float] = None,
+    ):
         """
         Initialize the retriever.
 
         Args:
-            index_path: Path to the FAISS index file
+            index_path: Path to the FAISS index file (None: ``INDEX_PATH``);
+                the mapping and BM25 files are read next to it
             model_name: Name of the sentence transformer model
+            refresh_interval: Seconds between file checks (None: ``REFRESH_INTERVAL``)
         """
         self.index_path = index_path
         self.model_name = model_name
+        self.refresh_interval = refresh_interval
+        self._lock = ReadWriteLock()
+        self._reload_lock = threading.Lock()  # one loader at a time
+        self._snapshot: Optional[tuple] = None  # (index, texts, lexical, file signature)
+        self._checked = 0.0
+
+    @property
+    def model(self):
         # Use global model if present (tests may patch it); otherwise lazy load
-        self.model = model if model is not None else _get_model()
-
-    def search(self, query: str, k: int = 3):
+        return model if model is not None else _get_model()
+
+    def _paths(self):
+        """Index file and legacy JSON mapping path of this retriever."""
+        if self.index_path is None:
+            return INDEX_PATH, MAPPING_PATH
+        return self.index_path, os.path.splitext(self.index_path)[0] + ".mapping.json"
+
+    def _signature(self) -> tuple:
+        """mtime and size of the manifest, index, mapping and BM25 files (None if missing)."""
+        index_path, mapping_path = self._paths()
+        manifest = _read_manifest(index_path)
+        files = (
+            manifest_path(index_path),
+            _manifest_file(index_path, manifest, "index"),
+            mapping_store_path(mapping_path, manifest),
+            mapping_path,
+            lexical_index_path(index_path, manifest),
+        )
+        signature = []
+        for path in files:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _read(self) -> tuple:
+        """Load the index files into a new snapshot."""
+        if faiss is None:
+            raise RuntimeError("FAISS non disponibile")
+        index_path, mapping_path = self._paths()
+        signature = self._signature()
+        # One manifest read: every file comes from the same generation
+        manifest = _read_manifest(index_path)
+        index = faiss.read_index(_manifest_file(index_path, manifest, "index"))
+        _tune_index(index)
+        texts = _load_mapping(mapping_path, manifest)
+        ntotal = getattr(index, "ntotal", None)
+        if isinstance(ntotal, int) and ntotal != len(texts):
+            # Caught between the writes of the index and of its mapping
+            raise RuntimeError(f"Indice ({ntotal}) e mappatura ({len(texts)}) non allineati")
+        return index, texts, _load_lexical(index_path, manifest), signature
+
+    def _publish(self, snapshot: tuple) -> None:
+        with self._lock.write():
+            self._snapshot = snapshot
+        self._checked = time.monotonic()
+
+    def load(self) -> None:
+        """Load the index files now, replacing the current snapshot."""
+        with self._reload_lock:
+            self._publish(self._read())
+        print("[INFO] FAISS index cached for improved performance")
+
+    def _refresh(self) -> None:
+        try:
+            snapshot = self._read()
+            self._publish(snapshot)
+            print("[INFO] Indice FAISS ricaricato dopo una modifica dei file")
+        except Exception as e:
+            # Keep serving the current snapshot; retried at the next check
+            print(f"[WARNING] Ricaricamento indice FAISS fallito: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def _maybe_refresh(self, current: tuple) -> None:
+        """Start a background reload if the files changed since ``current`` was loaded."""
+        interval = REFRESH_INTERVAL if self.refresh_interval is None else self.refresh_interval
+        now = time.monotonic()
+        if now - self._checked < interval:
+            return
+        self._checked = now
+        if self._signature() == current[3] or not self._reload_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh, name="sigma-index-refresh", daemon=True).start()
+
+    def snapshot(self) -> tuple:
+        """Current ``(index, texts, lexical)``, loading the files on first use."""
+        with self._lock.read():
+            current = self._snapshot
+        if current is None:
+            with self._reload_lock:
+                with self._lock.read():
+                    current = self._snapshot
+                if current is None:
+                    current = self._read()
+                    self._publish(current)
+                    print("[INFO] FAISS index cached for improved performance")
+        else:
+            self._maybe_refresh(current)
+        return current[:3]
+
+    def _after_fork(self) -> None:
+        # A refresh thread of the parent does not exist in the child: fresh locks
+        self._lock = ReadWriteLock()
+        self._reload_lock = threading.Lock()
+
+    def replace(self, index, texts, lexical=None) -> None:
+        """Serve a new index (already written to disk by the caller)."""
+        self._publish((index, texts, lexical, self._signature()))
+
+    def _search(
+        self,
+        queries: List[str],
+        k: int,
+        max_distance: Optional[float] = None,
+        dynamic: Optional[bool] = None,
+        query_vectors=None,
+    ) -> List[List[Dict[str, Any]]]:
+        index, texts, lexical = self.snapshot()
+        if not texts:
+            print("[ERRORE FAISS] Mappatura moduli vuota o malformata.")
+            return [[] for _ in queries]
+        rows = _rank(
+            index, texts, lexical, queries, k, max_distance=max_distance, dynamic=dynamic, query_vectors=query_vectors
+        )
+        return [[{"text": texts[hit["id"]], **hit} for hit in row] for row in rows]
+
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        with_scores: bool = False,
+        max_distance: Optional[float] = None,
+        dynamic: Optional[bool] = None,
+        query_vector=None,
+    ):
         """
         Search for relevant documents.
 
         Args:
             query: Search query
-            k: Number of results to return
+            k: Maximum number of results to return
+            with_scores: Return result dicts (``text``, ``score``, ``distance``, ...)
+                instead of texts
+            max_distance: Drop vector hits farther than this (None: configured cutoff)
+            dynamic: Return fewer than k results when the best hits stand out
+                (None: configured ``retrieval_dynamic_k``)
+            query_vector: Embedding of ``query`` already computed by the caller
+                (None: encoded here)
 
         Returns:
             List of relevant documents
         """
-        return search_moduli(query, k)
+        try:
+            hits = self._search([query], k, max_distance=max_distance, dynamic=dynamic, query_vectors=query_vector)[0]
+        except Exception as e:
+            print(f"[ERRORE FAISS] Ricerca fallita: {e}")
+            return []
+        return hits if with_scores else [hit["text"] for hit in hits]
+
+    def search_batch(self, queries: List[str], k: int = 3) -> List[List[str]]:
+        """``search`` for many queries with one encode and one FAISS search."""
+        if not queries:
+            return []
+        try:
+            return [[hit["text"] for hit in row] for row in self._search(list(queries), k)]
+        except Exception as e:
+            print(f"[ERRORE FAISS] Ricerca batch fallita: {e}")
+            return [[] for _ in queries]
+
+
+# Index served by search_moduli and updated by update_index
+_default = Retriever()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_default._after_fork)
+
+
+def get_retriever() -> Retriever:
+    """The process-wide retriever over ``INDEX_PATH``."""
+    return _default
 
 
 def get_moduli() -> List[dict]:
@@ -134,6 +385,354 @@ def get_moduli() -> List[dict]:
         return []
 
 
+def _chunks(moduli: List[dict], extra_paths: Optional[List[str]] = None):
+    """Chunk (sorgente, testo) di moduli e manuali (``knowledge_paths`` relativi alla root del progetto)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(DATA_PATH)))
+    paths = [*ingest._settings["paths"], *(os.path.abspath(p) for p in extra_paths or [])]
+    return list(ingest.iter_chunks(moduli, paths, root=root))
+
+
+def _sources_data(chunks) -> dict:
+    """Mappatura compatta chunk -> modulo/documento: nomi unici più un id per chunk."""
+    ids: Dict[str, int] = {}
+    chunk_ids = [ids.setdefault(source, len(ids)) for source, _ in chunks]
+    return {"sources": list(ids), "ids": chunk_ids}
+
+
+def get_chunk_sources() -> Optional[List[str]]:
+    """Modulo/documento di ogni voce della mappatura, None se non disponibile."""
+    try:
+        with open(_manifest_file(SOURCES_PATH, _read_manifest(), "sources"), encoding="utf-8") as f:
+            data = json.load(f)
+        return [data["sources"][i] for i in data["ids"]]
+    except Exception:
+        return None
+
+
+def configure_index(config: Any) -> None:
+    """Apply ``index_*`` settings (unset or invalid keys keep the defaults)."""
+    if config is None or not hasattr(config, "get"):
+        return
+    index_type = config.get("index_type")
+    if index_type in INDEX_TYPES:
+        _index_settings["type"] = index_type
+    metric = config.get("index_metric")
+    if metric in INDEX_METRICS:
+        _index_settings["metric"] = metric
+    for key in ("nlist", "nprobe", "pq_m", "pq_bits", "hnsw_m", "ef_construction", "ef_search"):
+        value = config.get(f"index_{key}")
+        if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            _index_settings[key] = value
+    configure_search(config)
+
+
+def configure_search(config: Any) -> None:
+    """Apply query-time settings: hybrid search and result filtering (no index rebuild needed)."""
+    if config is None or not hasattr(config, "get"):
+        return
+    from .lexical import configure_lexical
+
+    configure_lexical(config)
+    max_distance = config.get("retrieval_max_distance")
+    if isinstance(max_distance, (int, float)) and not isinstance(max_distance, bool) and max_distance > 0:
+        _relevance_settings["max_distance"] = float(max_distance)
+    dynamic = config.get("retrieval_dynamic_k")
+    if isinstance(dynamic, bool):
+        _relevance_settings["dynamic_k"] = dynamic
+    ratio = config.get("retrieval_dynamic_ratio")
+    if isinstance(ratio, (int, float)) and not isinstance(ratio, bool) and ratio >= 1:
+        _relevance_settings["dynamic_ratio"] = float(ratio)
+    interval = config.get("retrieval_refresh_interval")
+    if isinstance(interval, (int, float)) and not isinstance(interval, bool) and interval >= 0:
+        _default.refresh_interval = float(interval)
+
+
+def _make_index(embeddings):
+    """
+    Crea l'indice FAISS configurato (``index_type``/``index_metric``) e vi
+    aggiunge gli embedding, addestrandolo prima se IVF.
+
+    Con troppi pochi vettori per addestrare IVF/PQ ripiega su un tipo più
+    semplice (ivf_pq -> ivf_flat -> flat).
+    """
+    index_type = _index_settings["type"]
+    cosine = _index_settings["metric"] == "cosine"
+    if index_type == "flat" and not cosine:
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index.add(embeddings)
+        return index
+
+    import numpy as np
+
+    vectors = np.array(embeddings, dtype="float32", order="C")
+    if cosine:
+        faiss.normalize_L2(vectors)
+    n, dim = vectors.shape
+    metric = faiss.METRIC_INNER_PRODUCT if cosine else faiss.METRIC_L2
+
+    # k-means wants ~39 training points per centroid
+    nlist = min(_index_settings["nlist"] or int(4 * math.sqrt(n)), n // 39)
+    if index_type == "ivf_pq" and n < 2 ** _index_settings["pq_bits"]:
+        index_type = "ivf_flat"
+    if index_type.startswith("ivf") and nlist < 2:
+        index_type = "flat"
+    if index_type != _index_settings["type"]:
+        print(f"[INFO] {n} vettori non bastano per '{_index_settings['type']}', uso '{index_type}'")
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim) if cosine else faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, _index_settings["hnsw_m"], metric)
+        index.hnsw.efConstruction = _index_settings["ef_construction"]
+    else:
+        quantizer = faiss.IndexFlatIP(dim) if cosine else faiss.IndexFlatL2(dim)
+        if index_type == "ivf_pq":
+            m = max(d for d in range(1, min(_index_settings["pq_m"], dim) + 1) if dim % d == 0)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, _index_settings["pq_bits"], metric)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        index.train(vectors)
+
+    index.add(vectors)
+    if index_type == "ivf_flat":
+        # reconstruct() (used by update_index) needs the id -> list map
+        index.make_direct_map()
+    _tune_index(index)
+    return index
+
+
+def _tune_index(index) -> None:
+    """Imposta i parametri di ricerca (nprobe, efSearch) su un indice caricato."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = _index_settings["nprobe"]
+    except Exception:
+        pass  # not an IVF index
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = max(_index_settings["ef_search"], 1)
+
+
+def _query_vectors(index, vectors):
+    """Normalizza le query per gli indici a prodotto scalare (coseno)."""
+    if getattr(index, "metric_type", None) != faiss.METRIC_INNER_PRODUCT:
+        return vectors
+    import numpy as np
+
+    vectors = np.array(vectors, dtype="float32", order="C")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _reusable_vectors(index) -> bool:
+    """
+    True se i vettori di ``index`` possono entrare nel nuovo indice.
+
+    reconstruct() deve restituire i vettori originali (non quantizzati PQ) e
+    la metrica deve essere quella configurata: un indice coseno conserva i
+    vettori normalizzati, che in un indice L2 si mescolerebbero con encode
+    non normalizzati.
+    """
+    cosine = _index_settings["metric"] == "cosine"
+    expected = faiss.METRIC_INNER_PRODUCT if cosine else faiss.METRIC_L2
+    return "PQ" not in type(index).__name__ and getattr(index, "metric_type", None) == expected
+
+
+def _write_sources(chunks, path: Optional[str] = None) -> None:
+    with open(path or SOURCES_PATH, "w", encoding="utf-8") as f:
+        json.dump(_sources_data(chunks), f, ensure_ascii=False, separators=(",", ":"))
+
+
+def manifest_path(index_path: Optional[str] = None) -> str:
+    """Manifest naming the current generation of the index files (``moduli.manifest.json``)."""
+    return os.path.splitext(index_path or INDEX_PATH)[0] + ".manifest.json"
+
+
+def _read_manifest(index_path: Optional[str] = None) -> Dict[str, str]:
+    """File names in the manifest, empty if there is none (files with the fixed names)."""
+    try:
+        with open(manifest_path(index_path), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _manifest_file(path: str, manifest: Optional[Dict[str, str]], key: str) -> str:
+    """The generation of ``path`` named in the manifest under ``key``, else ``path`` itself."""
+    name = manifest.get(key) if manifest else None
+    return os.path.join(os.path.dirname(path), name) if name else path
+
+
+_generations = itertools.count()
+
+
+def _generation() -> str:
+    """Unique tag for the files of one rebuild (never reused, by any process)."""
+    return f"{time.time_ns():x}-{os.getpid()}-{next(_generations)}"
+
+
+def _generation_name(path: str, generation: str) -> str:
+    """``moduli.index`` -> ``moduli.<generation>.index``."""
+    root, ext = os.path.splitext(os.path.basename(path))
+    return f"{root}.{generation}{ext}"
+
+
+# Files of a generation (moduli.<generation>.index, moduli.mapping.<generation>.bin, ...), by creation time
+_GENERATION_FILE = re.compile(r"\.([0-9a-f]+)-\d+-\d+\.(index|bin|npz|json)$")
+
+
+def _generation_time(name: str) -> Optional[int]:
+    match = _GENERATION_FILE.search(name)
+    return int(match.group(1), 16) if match else None
+
+
+def _publish_manifest(files: Dict[str, str]) -> None:
+    """
+    Point the manifest at ``files`` (names in the ``INDEX_PATH`` directory).
+
+    The manifest is replaced atomically. Files of the generations before the
+    previous one are removed; a file still mapped by another process cannot
+    be removed on Windows and is retried at the next publish.
+    """
+    path = manifest_path()
+    previous = _read_manifest()
+    tmp = f"{path}.{_generation()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(files, f)
+    os.replace(tmp, path)
+
+    # Older than every file still referenced, so never a generation being written
+    kept = [_generation_time(name) for name in (*files.values(), *previous.values())]
+    oldest = min((t for t in kept if t is not None), default=None)
+    directory = os.path.dirname(path)
+    prefix = os.path.splitext(os.path.basename(INDEX_PATH))[0] + "."
+    for name in os.listdir(directory):
+        created = _generation_time(name)
+        if name.startswith(prefix) and created is not None and oldest is not None and created < oldest:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+@contextlib.contextmanager
+def _index_lock():
+    """Exclusive lock on ``moduli.lock``: one rebuild at a time across processes and threads."""
+    with open(os.path.splitext(INDEX_PATH)[0] + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:  # Windows
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after 10 seconds
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _digest(texts: List[str]) -> str:
+    """Hash of the indexed texts and of the index settings (same digest, same index)."""
+    digest = hashlib.sha256(json.dumps(_index_settings, sort_keys=True).encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def mapping_store_path(mapping_path: Optional[str] = None, manifest: Optional[Dict[str, str]] = None) -> str:
+    """Binary mapping store: the generation in ``manifest``, else ``moduli.mapping.bin``."""
+    return _manifest_file(os.path.splitext(mapping_path or MAPPING_PATH)[0] + ".bin", manifest, "mapping")
+
+
+def _write_mapping(texts: List[str], generation: Optional[str] = None) -> Dict[str, str]:
+    """
+    Salva la mappatura in un nuovo file binario e rimuove quella JSON obsoleta.
+
+    Ogni ricostruzione scrive un file nuovo invece di sostituire quello in
+    uso: altri worker e lo snapshot corrente lo tengono mappato in memoria
+    (su Windows un file mappato non può essere sostituito).
+
+    Returns:
+        Voce del manifest con il nome del file scritto
+    """
+    store = mapping_store_path()
+    name = _generation_name(store, generation or _generation())
+    write_mapping(os.path.join(os.path.dirname(store), name), texts)
+    if os.path.exists(MAPPING_PATH):
+        os.remove(MAPPING_PATH)
+    return {"mapping": name}
+
+
+def _load_mapping(mapping_path: Optional[str] = None, manifest: Optional[Dict[str, str]] = None):
+    """Testi indicizzati: store binario mappato in memoria, o JSON legacy."""
+    store = mapping_store_path(mapping_path, manifest)
+    if os.path.exists(store):
+        return MappingStore(store)
+    with open(mapping_path or MAPPING_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def lexical_index_path(index_path: Optional[str] = None, manifest: Optional[Dict[str, str]] = None) -> str:
+    """BM25 index: the generation in ``manifest``, else ``moduli.bm25.npz`` next to the FAISS index."""
+    return _manifest_file(os.path.splitext(index_path or INDEX_PATH)[0] + ".bm25.npz", manifest, "bm25")
+
+
+def _write_lexical(texts: List[str], generation: str):
+    """Costruisce e salva l'indice BM25 dei testi indicizzati (indice, voce del manifest)."""
+    from .lexical import BM25Index
+
+    lexical = BM25Index.build(texts)
+    path = lexical_index_path()
+    name = _generation_name(path, generation)
+    lexical.save(os.path.join(os.path.dirname(path), name))
+    return lexical, {"bm25": name}
+
+
+def _load_lexical(index_path: Optional[str] = None, manifest: Optional[Dict[str, str]] = None):
+    """Indice BM25 salvato, None se assente o illeggibile (solo ricerca vettoriale)."""
+    try:
+        from .lexical import BM25Index
+
+        return BM25Index.load(lexical_index_path(index_path, manifest))
+    except Exception:
+        return None
+
+
+def _write_index_files(index, texts: List[str], chunks=None, digest: Optional[str] = None):
+    """
+    Scrive indice, mappature e BM25 in file nuovi e li pubblica insieme.
+
+    I file di una ricostruzione hanno nomi unici (generazione) e diventano
+    visibili con un'unica sostituzione del manifest: un lettore carica tutti
+    i file vecchi o tutti i nuovi, mai un indice con la mappatura di un altro.
+    Va chiamata con ``_index_lock`` acquisito.
+    """
+    generation = _generation()
+    directory = os.path.dirname(INDEX_PATH)
+    files = {"index": _generation_name(INDEX_PATH, generation)}
+    faiss.write_index(index, os.path.join(directory, files["index"]))
+    files.update(_write_mapping(texts, generation))
+    lexical, entry = _write_lexical(texts, generation)
+    files.update(entry)
+    if chunks is not None:
+        files["sources"] = _generation_name(SOURCES_PATH, generation)
+        _write_sources(chunks, os.path.join(os.path.dirname(SOURCES_PATH), files["sources"]))
+    if digest is not None:
+        files["digest"] = digest
+    _publish_manifest(files)
+    return lexical
+
+
 def build_index():
     """
     Costruisce l'indice vettoriale FAISS a partire dai moduli presenti nel JSON
@@ -144,11 +743,12 @@ def build_index():
         print("[ERRORE] Nessun modulo disponibile nel framework.")
         return
 
-    texts = [f"{mod['nome']} :: {mod['descrizione']}" for mod in moduli]
+    chunks = _chunks(moduli)
+    texts = [text for _, text in chunks]
     # Prefer patched global model if available
     mdl = model if model is not None else _get_model()
     try:
-        embeddings = mdl.encode(texts, convert_to_numpy=True)
+        embeddings = ingest.encode_batches(mdl, texts)
     except Exception as e:
         print(f"[ERRORE] Impossibile generare embedding: {e}")
         return
@@ -157,53 +757,237 @@ def build_index():
         print("[ERRORE] FAISS non disponibile.")
         return
 
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
-    faiss.write_index(index, INDEX_PATH)
-
-    with open(MAPPING_PATH, "w", encoding="utf-8") as f:
-        json.dump(texts, f, ensure_ascii=False, indent=2)
+    index = _make_index(embeddings)
+    with _index_lock():
+        _write_index_files(index, texts, chunks, _digest(texts))
 
-    print(f"[INFO] Indice FAISS costruito con {len(moduli)} moduli.")
+    print(f"[INFO] Indice FAISS ({_index_settings['type']}) costruito con {len(moduli)} moduli ({len(texts)} chunk).")
 
 
-def search_moduli(query: str, k: int = 3):
+def update_index(
+    moduli: Optional[List[dict]] = None, reuse: bool = True, extra_paths: Optional[List[str]] = None
+) -> Dict[str, int]:
     """
-    Esegue una ricerca semantica tra i moduli usando FAISS e restituisce
-    le descrizioni più rilevanti dalla mappatura testuale.
-    Utilizza cache per migliorare le performance.
+    Aggiorna l'indice FAISS dopo una modifica del framework senza
+    ricalcolare tutti gli embedding.
+
+    I vettori dei moduli invariati vengono ricostruiti dall'indice corrente,
+    solo i moduli nuovi o modificati passano dal modello. Il nuovo indice
+    sostituisce quello in cache in un solo passaggio e viene salvato su disco.
+
+    Un solo processo alla volta ricostruisce l'indice (lock su file). Se i
+    file pubblicati hanno già gli stessi testi e impostazioni, ad esempio
+    perché un altro worker pre-fork ha ricaricato lo stesso framework, non
+    viene ricalcolato nulla e l'indice viene solo riletto.
+
+    Args:
+        moduli: Moduli del framework (default: riletti da DATA_PATH)
+        reuse: Riusa i vettori dell'indice corrente (False: ricalcola tutto)
+        extra_paths: Manuali da indicizzare oltre a ``knowledge_paths``
+
+    Returns:
+        Conteggi ``added``, ``removed`` e ``reused``
     """
-    global _cached_index, _cached_texts, _index_cache_time
+    if faiss is None:
+        raise RuntimeError("FAISS non disponibile")
+
+    moduli = get_moduli() if moduli is None else moduli
+    chunks = _chunks(moduli, extra_paths)
+    texts = [text for _, text in chunks]
+    if not texts:
+        print("[ERRORE] Nessun modulo disponibile nel framework.")
+        return {"added": 0, "removed": 0, "reused": 0}
+
+    digest = _digest(texts)
+    with _index_lock():
+        if reuse and _read_manifest().get("digest") == digest:
+            _default.load()
+            print("[INFO] Indice FAISS già aggiornato (stessi testi e impostazioni)")
+            return {"added": 0, "removed": 0, "reused": len(set(texts))}
+        return _rebuild(chunks, texts, digest, reuse)
+
+
+def _rebuild(chunks, texts: List[str], digest: str, reuse: bool) -> Dict[str, int]:
+    """Corpo di ``update_index``, con ``_index_lock`` acquisito."""
+    import numpy as np
 
     try:
-        if faiss is None:
-            raise RuntimeError("FAISS non disponibile")
+        old_index, old_texts, _ = _default.snapshot()
+    except Exception:
+        old_index, old_texts = None, []
+
+    wanted = set(texts)
+    vectors: Dict[str, "np.ndarray"] = {}
+    if old_index is not None and reuse and _reusable_vectors(old_index):
+        try:
+            for i, text in enumerate(old_texts):
+                if text in wanted and text not in vectors:
+                    vectors[text] = old_index.reconstruct(i)
+        except Exception:
+            # Index without reconstruct() support: re-encode everything
+            vectors = {}
 
-        current_time = time.time()
+    new_texts = list(dict.fromkeys(t for t in texts if t not in vectors))
+    mdl = model if model is not None else _get_model()
+    if new_texts:
+        encoded = np.asarray(ingest.encode_batches(mdl, new_texts), dtype="float32")
+        if vectors and encoded.shape[1] != len(next(iter(vectors.values()))):
+            # Embedding model changed: nothing can be reused
+            return _rebuild(chunks, texts, digest, reuse=False)
+        vectors.update(zip(new_texts, encoded))
+
+    matrix = np.stack([vectors[t] for t in texts]).astype("float32")
+    index = _make_index(matrix)
+    lexical = _write_index_files(index, texts, chunks, digest)
+    _default.replace(index, texts, lexical)
+
+    stats = {
+        "added": len(new_texts),
+        "removed": len(set(old_texts) - wanted),
+        "reused": len(set(texts)) - len(new_texts),
+    }
+    print(f"[INFO] Indice FAISS aggiornato: {stats['added']} chunk nuovi, {stats['removed']} rimossi")
+    return stats
+
+
+def _lexical_for(lexical, texts):
+    """``lexical`` if it indexes ``texts`` and hybrid search is on, else None."""
+    from .lexical import _settings as lexical_settings
+
+    if not lexical_settings["enabled"] or lexical is None or len(lexical) != len(texts):
+        return None
+    return lexical
+
+
+def _cut_vector(hits, max_distance: Optional[float], ratio: Optional[float]):
+    """Vector ``(id, distance)`` hits within the cutoff and, with a ratio, close to the best one."""
+    if max_distance is not None:
+        hits = [hit for hit in hits if hit[1] <= max_distance]
+    if ratio and hits:
+        best = hits[0][1]
+        limit = best * ratio if best > 0 else best
+        hits = [hit for hit in hits if hit[1] <= limit]
+    return hits
+
+
+def _cut_lexical(hits, ratio: Optional[float]):
+    """BM25 ``(id, score)`` hits scoring at least 1/ratio of the best one."""
+    if ratio and hits:
+        hits = [hit for hit in hits if hit[1] >= hits[0][1] / ratio]
+    return hits
+
+
+def _result(i: int, distance: Optional[float] = None, bm25: Optional[float] = None, score: float = 0.0):
+    return {"id": i, "score": score, "distance": distance, "bm25": bm25}
+
+
+def _rank(
+    index,
+    texts,
+    lexical,
+    queries: List[str],
+    k: int,
+    max_distance: Optional[float] = None,
+    dynamic: Optional[bool] = None,
+    query_vectors=None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Best (at most ``k``) results for each query, as ``_result`` dicts.
+
+    Vector hits farther than ``max_distance`` are dropped; with ``dynamic``
+    only the hits close to the best one are kept, so a clear match returns
+    fewer than ``k`` results. With the BM25 index the filtered vector and
+    lexical rankings are merged with reciprocal-rank fusion; without an
+    embedding model (stub) BM25 ranks alone. None uses the configured values;
+    ``query_vectors`` (from ``encode_queries``) skips the encode.
+    """
+    from .lexical import _settings as lexical_settings
+    from .lexical import reciprocal_rank_fusion
 
-        # Check if cache is valid
-        if _cached_index is None or _cached_texts is None or current_time - _index_cache_time > INDEX_CACHE_TTL:
+    max_distance = _relevance_settings["max_distance"] if max_distance is None else max_distance
+    dynamic = _relevance_settings["dynamic_k"] if dynamic is None else dynamic
+    ratio = _relevance_settings["dynamic_ratio"] if dynamic else None
 
-            # Load and cache index and texts
-            _cached_index = faiss.read_index(INDEX_PATH)
+    lexical = _lexical_for(lexical, texts)
+    # Prefer patched global model if available
+    mdl = model if model is not None else _get_model()
+    if lexical is not None and not getattr(mdl, "semantic", True):
+        # Zero vectors from the stub would rank at random
+        with stage_timer("bm25_search"):
+            rows = [_cut_lexical(lexical.search_scored(query, k), ratio) for query in queries]
+        return [[_result(i, bm25=score, score=score) for i, score in row] for row in rows]
+
+    depth = max(k, lexical_settings["candidates"]) if lexical is not None else k
+    query_vecs = encode_queries(queries) if query_vectors is None else query_vectors
+    with stage_timer("faiss_search"):
+        distances, indices = index.search(_query_vectors(index, query_vecs), depth)
+    # Inner-product indexes return cosine similarities: report 1 - cos
+    inner = getattr(index, "metric_type", None) == faiss.METRIC_INNER_PRODUCT
+
+    results = []
+    for query, row_distances, row_ids in zip(queries, distances, indices):
+        # Approximate indexes return -1 when fewer than k results are found
+        vector = [
+            (int(i), 1.0 - float(d) if inner else float(d))
+            for d, i in zip(row_distances, row_ids)
+            if 0 <= i < len(texts)
+        ]
+        vector = _cut_vector(vector, max_distance, ratio)
+        if lexical is None:
+            results.append([_result(i, distance=d, score=1.0 / (1.0 + max(d, 0.0))) for i, d in vector[:k]])
+            continue
+        with stage_timer("bm25_search"):
+            found = _cut_lexical(lexical.search_scored(query, depth), ratio)
+        vector_distance, bm25 = dict(vector), dict(found)
+        fused = reciprocal_rank_fusion([[i for i, _ in vector], [i for i, _ in found]], k)
+        results.append([_result(i, vector_distance.get(i), bm25.get(i), score) for i, score in fused])
+    return results
+
+
+def encode_queries(queries: List[str]):
+    """Embedding delle domande con il modello corrente (una riga per domanda)."""
+    # Prefer patched global model if available
+    mdl = model if model is not None else _get_model()
+    with stage_timer("retrieval_encode"), cpu_profile.inference_context():
+        return mdl.encode(list(queries), convert_to_numpy=True)
 
-            with open(MAPPING_PATH, encoding="utf-8") as f:
-                _cached_texts = json.load(f)
 
-            _index_cache_time = current_time
-            print("[INFO] FAISS index cached for improved performance")
+@traced("search_moduli")
+def search_moduli(query: str, k: int = 3, query_vector=None):
+    """
+    Esegue una ricerca ibrida (semantica FAISS + lessicale BM25) tra i moduli
+    e restituisce le descrizioni più rilevanti dalla mappatura testuale.
+    L'indice resta in memoria e viene ricaricato quando i file cambiano.
+    ``query_vector`` (da ``encode_queries``) evita di ricalcolare l'embedding.
+    """
+    return _default.search(query, k, query_vector=query_vector)
 
-        if not _cached_texts:
-            print("[ERRORE FAISS] Mappatura moduli vuota o malformata.")
-            return []
 
-        # Prefer patched global model if available
-        mdl = model if model is not None else _get_model()
-        query_vec = mdl.encode([query], convert_to_numpy=True)
-        _D, indices = _cached_index.search(query_vec, k)
+@traced("search_moduli_scored")
+def search_moduli_scored(
+    query: str, k: int = 3, max_distance: Optional[float] = None, dynamic: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Come ``search_moduli`` ma restituisce i risultati con i punteggi.
+
+    Ogni risultato è un dict con ``text``, ``id`` (posizione nell'indice),
+    ``score`` (punteggio di ranking, più alto è meglio: fusione RRF, BM25 o
+    ``1 / (1 + distance)``), ``distance`` (distanza FAISS: L2 al quadrato o
+    ``1 - coseno``; None se trovato solo da BM25) e ``bm25``.
+
+    Args:
+        query: Domanda
+        k: Numero massimo di risultati
+        max_distance: Distanza massima dei risultati vettoriali (None: ``retrieval_max_distance``)
+        dynamic: Riduce k quando i primi risultati sono nettamente migliori (None: ``retrieval_dynamic_k``)
+    """
+    return _default.search(query, k, with_scores=True, max_distance=max_distance, dynamic=dynamic)
 
-        return [_cached_texts[i] for i in indices[0]]
 
-    except Exception as e:
-        print(f"[ERRORE FAISS] Ricerca fallita: {e}")
-        return []
+@traced("search_moduli_batch")
+def search_moduli_batch(queries: List[str], k: int = 3) -> List[List[str]]:
+    """
+    Come ``search_moduli`` ma per più domande: un solo encode e una sola
+    ricerca FAISS sull'intera matrice di query.
+    """
+    return _default.search_batch(queries, k)
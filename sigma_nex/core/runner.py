@@ -13,20 +13,26 @@ import tempfile
 import threading
 import time
 from collections import deque
-from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
 
 import click
 import requests
 from click import echo
 
+from ..utils import cpu_profile, tracing
+from ..utils.metrics import OLLAMA_ERRORS, StreamingStats, stage_timer
 from ..utils.validation import (
     ValidationError,
     sanitize_text_input,
     validate_file_path,
     validate_prompt,
 )
+from .backends import OllamaBackendPool, build_generate_payload
 from .context import build_prompt
+from .embeddings import configure_embeddings
 from .translate import translate_en_to_it, translate_it_to_en
+from .translation_service import get_translation_service
 
 
 class UnauthorizedException(Exception):
@@ -96,8 +102,30 @@ class Runner:
         # Temporary file cleanup registry
         self.temp_files: list[str] = []
 
-        # Performance metrics
-        self.performance_stats: list[float] = []
+        # Ollama endpoints (failover and least-outstanding routing)
+        self.backends = OllamaBackendPool.from_config(config)
+        self.keep_alive = config.get("ollama_keep_alive")
+
+        # Worker-process translation (translation_workers > 0), else in-process
+        self.translation_service = get_translation_service(config)
+
+        # Performance metrics (fixed memory, independent of query count)
+        self.performance_stats = StreamingStats()
+        self.stage_stats: Dict[str, StreamingStats] = {}
+
+        # Opt-in span tracing (tracing_* settings)
+        tracing.configure_from_config(config)
+        # Torch thread pools and inference mode (cpu_* settings)
+        cpu_profile.configure_from_config(config)
+        # Embedding backend and offline model loading (embedding_* settings)
+        configure_embeddings(config)
+        # FAISS index type, search parameters and chunking (index_*/chunk_* settings)
+        if self.retrieval_enabled:
+            from .ingest import configure_ingest
+            from .retriever import configure_index
+
+            configure_index(config)
+            configure_ingest(config)
 
     def interactive(self) -> None:
         """Start interactive REPL mode."""
@@ -156,23 +184,46 @@ class Runner:
         finally:
             self._cleanup()
 
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        """Record the duration of a pipeline stage in ``stage_stats``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.stage_stats.get(name)
+            if stats is None:
+                stats = self.stage_stats[name] = StreamingStats()
+            stats.append(time.perf_counter() - start)
+
+    def _translate(self, text: str, direction: str) -> str:
+        """Translate via the worker pool if configured, else in-process."""
+        if self.translation_service is not None:
+            return self.translation_service.translate(text, direction)
+        return translate_it_to_en(text) if direction == "it-en" else translate_en_to_it(text)
+
+    @tracing.traced("runner.process_query")
     def _process_query(self, query: str) -> str:
         """Process a single query with translation pipeline."""
         # Translation pipeline (best-effort)
-        try:
-            query_en = translate_it_to_en(query)
-        except Exception:
-            query_en = query
-        prompt = build_prompt(self.system_prompt, list(self.history), query_en, self.retrieval_enabled)
+        with self._stage("translate_it_en"):
+            try:
+                query_en = self._translate(query, "it-en")
+            except Exception:
+                query_en = query
+        with self._stage("prompt"):
+            prompt = build_prompt(self.system_prompt, list(self.history), query_en, self.retrieval_enabled)
 
-        # Validate prompt before sending
-        prompt = validate_prompt(prompt)
+            # Validate prompt before sending
+            prompt = validate_prompt(prompt)
 
-        response_en = self._call_model(prompt)
-        try:
-            response = translate_en_to_it(response_en)
-        except Exception:
-            response = response_en
+        with self._stage("llm"):
+            response_en = self._call_model(prompt)
+        with self._stage("translate_en_it"):
+            try:
+                response = self._translate(response_en, "en-it")
+            except Exception:
+                response = response_en
 
         # Store in history with memory management
         self.history.append(f"User (IT): {query}")
@@ -273,17 +324,33 @@ class Runner:
         """
         # Prefer HTTP API (test suite mocks requests.post)
         try:
-            payload = {"model": self.model, "prompt": prompt, "stream": False}
-            resp = requests.post("http://localhost:11434/api/generate", json=payload, timeout=120)
-            if resp.status_code == 200:
-                data = resp.json()
-                return data.get("response", data.get("message", ""))
-            # Non-200: raise with status and body snippet
-            try:
-                body = resp.text
-            except Exception:
-                body = ""
-            raise RuntimeError(f"Ollama HTTP {resp.status_code}: {body[:200]}")
+            payload = build_generate_payload(self.model, prompt, self.keep_alive)
+            last_error = "No Ollama backend available"
+            # Fail over across the configured backends in routing order
+            for backend in self.backends.candidates(self.model):
+                try:
+                    with self.backends.track(backend), stage_timer("llm"):
+                        resp = requests.post(backend.generate_url, json=payload, timeout=120)
+                except Exception as e:
+                    self.backends.mark_failure(backend)
+                    OLLAMA_ERRORS.inc(backend=backend.url, kind="transport")
+                    last_error = str(e)
+                    continue
+
+                if resp.status_code == 200:
+                    self.backends.mark_success(backend, self.model)
+                    data = resp.json()
+                    return data.get("response", data.get("message", ""))
+                # Non-200: remember status and body snippet, try next backend
+                try:
+                    body = resp.text
+                except Exception:
+                    body = ""
+                if resp.status_code >= 500:
+                    self.backends.mark_failure(backend)
+                OLLAMA_ERRORS.inc(backend=backend.url, kind=f"http_{resp.status_code}")
+                last_error = f"Ollama HTTP {resp.status_code}: {body[:200]}"
+            raise RuntimeError(last_error)
         except Exception as e:
             # Surface the error; do not fallback to CLI so tests can assert on message
             raise RuntimeError(str(e))
@@ -318,20 +385,28 @@ SIGMA-NEX Commands:
 
     def _show_stats(self) -> None:
         """Show performance statistics."""
-        total_queries = len(self.performance_stats)
-        total_time = sum(self.performance_stats)
-        avg_time = total_time / total_queries if total_queries else 0
+        stats = self.get_performance_stats()
 
         echo(
             f"""
 SIGMA-NEX Statistics:
-  Requests processed: {total_queries}
-  Total processing time: {total_time:.2f}s
-  Average response time: {avg_time:.2f}s
+  Requests processed: {stats["total_queries"]}
+  Total processing time: {stats["total_response_time"]:.2f}s
+  Average response time: {stats["average_response_time"]:.2f}s
+  Latency p50/p95/p99: {stats["p50"]:.2f}s / {stats["p95"]:.2f}s / {stats["p99"]:.2f}s
+  Latency min/max: {stats["min"]:.2f}s / {stats["max"]:.2f}s
+  Throughput: {stats["throughput"]:.2f} queries/s
   History entries: {len(self.history)}
   Max history limit: {self.max_history * 2}
         """
         )
+        if stats["stages"]:
+            echo("  Stage timings (p50 / p95 / p99):")
+            for name, stage in stats["stages"].items():
+                echo(
+                    f"    {name:<16} {stage['p50']:.3f}s / {stage['p95']:.3f}s / {stage['p99']:.3f}s "
+                    f"({stage['count']} runs)"
+                )
 
     def _clear_history(self) -> None:
         """Clear conversation history."""
@@ -454,15 +529,22 @@ SIGMA-NEX Statistics:
 
     def get_performance_stats(self) -> Dict[str, Any]:
         """Get performance statistics."""
-        total_queries = len(self.performance_stats)
-        total_time = sum(self.performance_stats)
+        stats = self.performance_stats
+        total_time = stats.total
 
         return {
-            "total_queries": total_queries,
+            "total_queries": stats.count,
             "total_response_time": total_time,
-            "average_response_time": ((total_time / total_queries) if total_queries else 0),
+            "average_response_time": stats.mean,
             # Keys some tests might expect
             "total_time": total_time,
+            "min": stats.min or 0.0,
+            "max": stats.max or 0.0,
+            "p50": stats.percentile(50),
+            "p95": stats.percentile(95),
+            "p99": stats.percentile(99),
+            "throughput": stats.throughput,
+            "stages": {name: stage.summary() for name, stage in self.stage_stats.items()},
         }
 
     def _validate_auth_token(self, auth_token: Optional[str]) -> bool:
@@ -0,0 +1,162 @@
+"""
+SIGMA-NEX Semantic Response Cache
+
+Near-duplicate answer cache built on the retriever embedding model and FAISS.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Optional heavy imports, mirrored from the retriever
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None  # type: ignore
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+
+class SemanticCache:
+    """Cache answers by question embedding, matched on cosine similarity.
+
+    Question embeddings are L2-normalized and stored in a dedicated FAISS
+    inner-product index, separate from the modules index. A cached answer is
+    returned only when the similarity reaches ``threshold`` and the set of
+    retrieved modules is the same as when the answer was produced, so that a
+    framework change never serves stale guidance.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 1000,
+        ttl: float = 3600,
+        candidates: int = 5,
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a hit (0.0-1.0)
+            max_entries: Maximum number of cached answers (LRU eviction)
+            ttl: Entry lifetime in seconds (0 disables expiry)
+            candidates: Number of nearest neighbours inspected per lookup
+        """
+        self.threshold = threshold
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.candidates = max(1, int(candidates))
+
+        self._lock = threading.Lock()
+        self._index: Any = None
+        self._dim: Optional[int] = None
+        self._next_id = 0
+        # id -> (modules key, response, timestamp), ordered by recency
+        self._entries: "OrderedDict[int, Tuple[Tuple[str, ...], str, float]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def available(self) -> bool:
+        """True when FAISS and numpy can back the cache."""
+        return faiss is not None and np is not None
+
+    def normalize(self, vectors: Optional[Any]) -> Optional[Any]:
+        """Cache key from a question embedding (``retriever.encode_queries`` row), None if unusable."""
+        if not self.available or vectors is None:
+            return None
+        vec = np.asarray(vectors, dtype=np.float32).reshape(1, -1)
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0:
+            return None
+        return np.ascontiguousarray(vec / norm)
+
+    @staticmethod
+    def _modules_key(moduli: Optional[List[str]]) -> Tuple[str, ...]:
+        return tuple(sorted(moduli or []))
+
+    def _expired(self, timestamp: float, now: float) -> bool:
+        return bool(self.ttl) and now - timestamp > self.ttl
+
+    def _remove(self, entry_id: int) -> None:
+        self._entries.pop(entry_id, None)
+        if self._index is not None:
+            self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def lookup(self, vector: Optional[Any], moduli: Optional[List[str]] = None) -> Optional[str]:
+        """Return a cached answer for a near-duplicate question, if any."""
+        if vector is None:
+            return None
+
+        key = self._modules_key(moduli)
+        now = time.time()
+
+        with self._lock:
+            if self._index is None or not self._entries or vector.shape[1] != self._dim:
+                self.misses += 1
+                return None
+
+            k = min(self.candidates, len(self._entries))
+            scores, ids = self._index.search(vector, k)
+
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break  # results are sorted by decreasing similarity
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                entry_key, response, timestamp = entry
+                if self._expired(timestamp, now):
+                    self._remove(int(entry_id))
+                    continue
+                if entry_key != key:
+                    continue
+                self._entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return response
+
+            self.misses += 1
+            return None
+
+    def store(self, vector: Optional[Any], moduli: Optional[List[str]], response: str) -> None:
+        """Cache the answer produced for an embedded question."""
+        if vector is None or not response:
+            return
+
+        with self._lock:
+            if self._index is None or vector.shape[1] != self._dim:
+                self._dim = int(vector.shape[1])
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(self._dim))
+                self._entries.clear()
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (self._modules_key(moduli), response, time.time())
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+            self._dim = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
@@ -8,7 +8,11 @@ import importlib
 import re
 import threading
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils import cpu_profile
+from ..utils.metrics import stage_timer
+from ..utils.tracing import traced
 
 # Lazy imports to improve startup time
 MarianMTModel = None
@@ -18,9 +22,11 @@ _transformers_available = None
 # Expose get_config at module scope so tests can patch
 try:
     # Local import to avoid heavy dependencies at import time
+    from .. import config as _config_module
     from ..config import get_config as get_config  # type: ignore[no-redef]
 except Exception:
     # In testing scenarios this will be patched
+    _config_module = None  # type: ignore
     get_config = None  # type: ignore
 
 
@@ -56,21 +62,51 @@ def _get_model_paths():
 # Thread-safe model cache
 _lock = threading.Lock()
 _models: Dict[str, Tuple] = {}
+# Path each cached model was loaded from
+_model_sources: Dict[str, Any] = {}
 
+# Resolved model paths per direction, tagged with the config they came from
+_path_cache_enabled = True
+_resolved_paths: Dict[str, Tuple[Tuple[int, int], Any]] = {}
 
-def _load_model(direction: str) -> Optional[Tuple]:
-    """Load translation model with thread safety and error handling.
 
-    Note: Always check the on-disk path before returning a cached model to
-    make tests deterministic when paths are patched.
+def set_path_cache(enabled: bool) -> None:
+    """Enable/disable caching of resolved model paths (and clear it).
+
+    With the cache disabled every translation re-resolves and re-checks the
+    model path on disk. Tests that patch ``_get_model_paths`` or
+    ``get_config`` disable it so every call sees the patched values.
     """
-    if not _check_transformers():
-        return None
+    global _path_cache_enabled
+    _path_cache_enabled = enabled
+    _resolved_paths.clear()
+
+
+def _config_key() -> Tuple[int, int]:
+    """Identify the active configuration: instance and reload generation.
+
+    Reads the loaded instance directly instead of calling ``get_config`` so
+    a cache hit costs two attribute lookups.
+    """
+    cfg = getattr(_config_module, "_config_instance", None)
+    return id(cfg), getattr(cfg, "generation", 0)
+
+
+def _resolve_model_path(direction: str) -> Optional[Any]:
+    """Return the existing model path for ``direction``, or None.
+
+    Found paths are cached until the configuration is reloaded; missing ones
+    are re-checked on every call so models installed later are picked up.
+    """
+    use_cache = _path_cache_enabled
+    if use_cache:
+        key = _config_key()
+        cached = _resolved_paths.get(direction)
+        if cached is not None and cached[0] == key:
+            return cached[1]
 
-    # Always validate model path first (before cache) so patched paths are honored
     try:
-        paths = _get_model_paths()
-        model_path = paths.get(direction)
+        model_path = _get_model_paths().get(direction)
     except Exception:
         model_path = None
 
@@ -78,15 +114,38 @@ def _load_model(direction: str) -> Optional[Tuple]:
         print(f"[WARNING] Translation model not found at {model_path}")
         return None
 
+    if use_cache:
+        _resolved_paths[direction] = (key, model_path)
+    return model_path
+
+
+@traced("translate.load_model")
+def _load_model(direction: str) -> Optional[Tuple]:
+    """Load translation model with thread safety and error handling.
+
+    The model path is resolved before consulting the model cache, so a
+    config reload that moves the models triggers a reload from the new path.
+    """
+    if not _check_transformers():
+        return None
+
+    model_path = _resolve_model_path(direction)
+    if model_path is None:
+        return None
+
     with _lock:
+        if direction in _models and _model_sources.get(direction, model_path) != model_path:
+            del _models[direction]
         if direction not in _models:
             try:
                 print(f"Loading translation model: {direction}")
                 assert MarianTokenizer is not None, "MarianTokenizer not available"
                 assert MarianMTModel is not None, "MarianMTModel not available"
+                cpu_profile.apply_threads("translation")
                 tokenizer = MarianTokenizer.from_pretrained(str(model_path))
-                model = MarianMTModel.from_pretrained(str(model_path))
+                model = cpu_profile.maybe_compile(MarianMTModel.from_pretrained(str(model_path)))
                 _models[direction] = (tokenizer, model)
+                _model_sources[direction] = model_path
                 print(f"[SUCCESS] Translation model loaded: {direction}")
             except Exception as e:
                 print(f"[ERROR] Loading translation model {direction}: {e}")
@@ -95,6 +154,7 @@ def _load_model(direction: str) -> Optional[Tuple]:
     return _models.get(direction)
 
 
+@traced("translate.chunk_translate")
 def _chunk_translate(text: str, tokenizer, model, max_tokens: int = 500) -> str:
     """
     Split text into chunks and translate each chunk separately.
@@ -139,7 +199,8 @@ def _chunk_translate(text: str, tokenizer, model, max_tokens: int = 500) -> str:
     for chunk in chunks:
         try:
             batch = tokenizer([chunk], return_tensors="pt", padding=True)
-            gen = model.generate(**batch)
+            with cpu_profile.inference_context():
+                gen = model.generate(**batch)
             result = tokenizer.batch_decode(gen, skip_special_tokens=True)[0]
             translated_chunks.append(result)
         except Exception as e:
@@ -162,13 +223,15 @@ def translate_it_to_en(text: str) -> str:
     tokenizer, model = model_data
 
     try:
-        # Check if text is short enough for direct translation
-        if len(tokenizer(text)["input_ids"]) < 500:
-            batch = tokenizer([text], return_tensors="pt", padding=True)
-            gen = model.generate(**batch)
-            return tokenizer.batch_decode(gen, skip_special_tokens=True)[0]
-        else:
-            return _chunk_translate(text, tokenizer, model, 500)
+        with stage_timer("translate_it_en"):
+            # Check if text is short enough for direct translation
+            if len(tokenizer(text)["input_ids"]) < 500:
+                batch = tokenizer([text], return_tensors="pt", padding=True)
+                with cpu_profile.inference_context():
+                    gen = model.generate(**batch)
+                return tokenizer.batch_decode(gen, skip_special_tokens=True)[0]
+            else:
+                return _chunk_translate(text, tokenizer, model, 500)
     except Exception as e:
         print(f"[ERROR] Translation error (IT->EN): {e}")
         return text
@@ -187,17 +250,72 @@ def translate_en_to_it(text: str) -> str:
     tokenizer, model = model_data
 
     try:
-        if len(tokenizer(text)["input_ids"]) < 500:
-            batch = tokenizer([text], return_tensors="pt", padding=True)
-            gen = model.generate(**batch)
-            return tokenizer.batch_decode(gen, skip_special_tokens=True)[0]
-        else:
-            return _chunk_translate(text, tokenizer, model, 500)
+        with stage_timer("translate_en_it"):
+            if len(tokenizer(text)["input_ids"]) < 500:
+                batch = tokenizer([text], return_tensors="pt", padding=True)
+                with cpu_profile.inference_context():
+                    gen = model.generate(**batch)
+                return tokenizer.batch_decode(gen, skip_special_tokens=True)[0]
+            else:
+                return _chunk_translate(text, tokenizer, model, 500)
     except Exception as e:
         print(f"[ERROR] Translation error (EN->IT): {e}")
         return text
 
 
+def translate_batch(texts: List[str], direction: str = "it-en", batch_size: int = 16) -> List[str]:
+    """Translate many texts with one ``generate`` call per batch.
+
+    Short texts are padded together into batches of ``batch_size``; texts
+    over the 500-token limit go through ``_chunk_translate``. Any text that
+    cannot be translated is returned unchanged, like the single-text helpers.
+
+    Args:
+        texts: Texts to translate
+        direction: "it-en" or "en-it"
+        batch_size: Maximum texts per generate call
+
+    Returns:
+        Translations in the same order as ``texts``
+    """
+    results = list(texts)
+    pending = [i for i, text in enumerate(texts) if text and text.strip()]
+    if not pending:
+        return results
+
+    model_data = _load_model(direction)
+    if not model_data:
+        print(f"[WARNING] Translation {direction} unavailable")
+        return results
+
+    tokenizer, model = model_data
+    stage = "translate_it_en" if direction == "it-en" else "translate_en_it"
+
+    short = []
+    with stage_timer(stage):
+        for i in pending:
+            try:
+                if len(tokenizer(texts[i])["input_ids"]) < 500:
+                    short.append(i)
+                else:
+                    results[i] = _chunk_translate(texts[i], tokenizer, model, 500)
+            except Exception as e:
+                print(f"[ERROR] Translation error ({direction}): {e}")
+
+        for start in range(0, len(short), max(1, batch_size)):
+            group = short[start : start + max(1, batch_size)]
+            try:
+                batch = tokenizer([texts[i] for i in group], return_tensors="pt", padding=True)
+                with cpu_profile.inference_context():
+                    gen = model.generate(**batch)
+                for i, translated in zip(group, tokenizer.batch_decode(gen, skip_special_tokens=True)):
+                    results[i] = translated
+            except Exception as e:
+                print(f"[ERROR] Batch translation error ({direction}): {e}")
+
+    return results
+
+
 def is_translation_available() -> bool:
     """Check if translation functionality is available."""
     return _check_transformers()
@@ -0,0 +1,245 @@
+"""
+SIGMA-NEX Translation Service
+
+Runs Marian translation in a pool of worker processes so that translations
+use several cores in parallel instead of contending for the GIL. Each worker
+loads its own models once and pins its torch thread count; requests are
+queued by the process pool. With ``translation_workers: 0`` (default) the
+service is disabled and callers translate in-process.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ("it-en", "en-it")
+
+
+def _init_worker(torch_threads: int, preload: bool) -> None:
+    """Process initializer: pin thread pools, then load the models."""
+    if torch_threads > 0:
+        from ..utils import cpu_profile
+
+        # Must be set before torch/MKL create their thread pools
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(torch_threads)
+        cpu_profile.configure_cpu_profile(components={"translation": torch_threads})
+        cpu_profile.apply_threads("translation")
+
+    if preload:
+        from .translate import preload_models
+
+        preload_models()
+
+
+def _worker_translate(texts: List[str], direction: str, batch_size: int) -> List[str]:
+    """Translate in a worker process (models are cached per process)."""
+    from .translate import translate_batch
+
+    return translate_batch(texts, direction, batch_size=batch_size)
+
+
+def _translate_in_process(text: str, direction: str) -> str:
+    from .translate import translate_en_to_it, translate_it_to_en
+
+    return translate_it_to_en(text) if direction == "it-en" else translate_en_to_it(text)
+
+
+class TranslationService:
+    """Pool of translation worker processes.
+
+    The pool starts lazily on first use (or with ``start()``). Failed or
+    crashed workers never break a query: the text is returned untranslated,
+    like the in-process helpers do, and a broken pool is recreated on the
+    next call.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        torch_threads: int = 1,
+        batch_size: int = 16,
+        preload: bool = True,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            workers: Number of worker processes
+            torch_threads: torch/OpenMP threads per worker (0: library default)
+            batch_size: Texts per generate call inside a worker
+            preload: Load both models when a worker starts
+            executor: Executor to use instead of a process pool (tests)
+        """
+        self.workers = max(1, int(workers))
+        self.torch_threads = max(0, int(torch_threads))
+        self.batch_size = max(1, int(batch_size))
+        self.preload = preload
+        self._executor: Optional[Executor] = executor
+        self._external_executor = executor is not None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already initialized torch is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads, self.preload),
+                )
+                logger.info(f"Translation service started with {self.workers} workers")
+            return self._executor
+
+    def start(self) -> None:
+        """Start the worker processes and wait until their models are loaded."""
+        executor = self._get_executor()
+        # One trivial job per worker forces every initializer to run now
+        futures = [executor.submit(_worker_translate, [], "it-en", 1) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and not self._external_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, texts: List[str], direction: str) -> "Future[List[str]]":
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown translation direction: {direction}")
+        with self._lock:
+            self.pending += 1
+        try:
+            return self._get_executor().submit(_worker_translate, list(texts), direction, self.batch_size)
+        except Exception:
+            self._record(ok=False)
+            raise
+
+    def _record(self, ok: bool) -> None:
+        with self._lock:
+            self.pending -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def _failed(self, error: Exception) -> None:
+        self._record(ok=False)
+        if isinstance(error, BrokenProcessPool):
+            logger.error("Translation worker crashed, restarting the pool")
+            self.shutdown()
+        else:
+            logger.error(f"Translation worker error: {error}")
+
+    def _result(self, future: "Future[List[str]]", texts: List[str]) -> List[str]:
+        try:
+            result = future.result()
+        except Exception as e:
+            self._failed(e)
+            return list(texts)
+        self._record(ok=True)
+        return result
+
+    def translate(self, text: str, direction: str) -> str:
+        """Translate one text, blocking until a worker returns it."""
+        if not text or not text.strip():
+            return text
+        return self._result(self._submit([text], direction), [text])[0]
+
+    def translate_batch(self, texts: List[str], direction: str) -> List[str]:
+        """Translate many texts, spreading ``batch_size`` slices over all workers."""
+        slices = [texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        futures = [self._submit(part, direction) for part in slices]
+        results: List[str] = []
+        for part, future in zip(slices, futures):
+            results.extend(self._result(future, part))
+        return results
+
+    async def translate_async(self, text: str, direction: str) -> str:
+        """Translate one text without blocking the event loop."""
+        if not text or not text.strip():
+            return text
+        future = self._submit([text], direction)
+        try:
+            result = await asyncio.wrap_future(future)
+        except Exception as e:
+            self._failed(e)
+            return text
+        self._record(ok=True)
+        return result[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker count and request counters."""
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+# Process-wide service shared by the API server and Runners
+_service: Optional[TranslationService] = None
+_service_lock = threading.Lock()
+
+
+def get_translation_service(config: Optional[Dict[str, Any]] = None) -> Optional[TranslationService]:
+    """
+    Return the shared service, creating it from ``config`` if needed.
+
+    Returns None when ``translation_workers`` is 0 or unset (in-process
+    translation).
+    """
+    global _service
+    if _service is not None or config is None:
+        return _service
+    try:
+        workers = int(config.get("translation_workers", 0) or 0)
+    except (TypeError, ValueError):
+        workers = 0
+    if workers <= 0:
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = TranslationService(
+                workers=workers,
+                torch_threads=config.get("translation_torch_threads", 1),
+                batch_size=config.get("translation_batch_size", 16),
+            )
+    return _service
+
+
+def shutdown_translation_service() -> None:
+    """Stop and forget the shared service."""
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        service.shutdown()
+
+
+async def translate_async(text: str, direction: str, service: Optional[TranslationService] = None) -> str:
+    """
+    Translate without blocking the event loop.
+
+    Uses the worker pool when available, otherwise the in-process model on a
+    thread of the default executor.
+    """
+    service = service or _service
+    if service is not None:
+        return await service.translate_async(text, direction)
+    return await asyncio.get_running_loop().run_in_executor(None, _translate_in_process, text, direction)
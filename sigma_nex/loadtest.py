@@ -0,0 +1,185 @@
+"""
+SIGMA-NEX Load Test
+
+Replay a question corpus against a running server's ``/ask`` endpoint with
+asyncio, either closed-loop (fixed concurrency) or open-loop (target rate),
+and summarize latency percentiles, error breakdown and throughput.
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .core.batch import extract_question
+from .utils.metrics import StreamingStats
+
+# Status codes reported individually; anything else is grouped as http_<code>
+TRACKED_STATUSES = (401, 429, 503, 504)
+
+
+def load_corpus(path: str, limit: Optional[int] = None) -> List[str]:
+    """
+    Load questions from a corpus file.
+
+    Supports JSON Lines (one string or object per line), JSON (a list of
+    strings/objects, or an object with a ``questions``/``faq`` list) and plain
+    text (one question per line). Objects are read with ``extract_question``.
+
+    Raises:
+        ValueError: If the file contains no usable question.
+    """
+    file_path = Path(path)
+    content = file_path.read_text(encoding="utf-8")
+
+    items: Iterable[Any]
+    if file_path.suffix == ".jsonl":
+        items = (json.loads(line) for line in content.splitlines() if line.strip())
+    elif file_path.suffix == ".json":
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("questions") or data.get("faq") or data.get("items") or []
+        items = data if isinstance(data, list) else []
+    else:
+        items = content.splitlines()
+
+    questions = [q for q in (extract_question(item) for item in items) if q]
+    if not questions:
+        raise ValueError(f"No questions found in corpus {path}")
+    return questions[:limit] if limit else questions
+
+
+class LoadTestResult:
+    """Aggregated outcome of a load test run."""
+
+    def __init__(self) -> None:
+        self.latencies = StreamingStats()
+        self.outcomes: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def record(self, outcome: str, latency: Optional[float] = None) -> None:
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if latency is not None and outcome == "ok":
+            self.latencies.append(latency)
+
+    @property
+    def total(self) -> int:
+        return sum(self.outcomes.values())
+
+    @property
+    def succeeded(self) -> int:
+        return self.outcomes.get("ok", 0)
+
+    @property
+    def throughput(self) -> float:
+        """Successful requests per second over the whole run."""
+        return self.succeeded / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.total,
+            "succeeded": self.succeeded,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "latency": self.latencies.summary(),
+            "outcomes": dict(sorted(self.outcomes.items())),
+        }
+
+
+def classify_status(status_code: int) -> str:
+    """Map an HTTP status to an outcome label."""
+    if status_code == 200:
+        return "ok"
+    return f"http_{status_code}"
+
+
+async def _send(client: Any, url: str, question: str, headers: Dict[str, str], result: LoadTestResult) -> None:
+    import httpx
+
+    start = time.perf_counter()
+    try:
+        response = await client.post(url, json={"question": question}, headers=headers)
+        result.record(classify_status(response.status_code), time.perf_counter() - start)
+    except httpx.TimeoutException:
+        result.record("timeout")
+    except httpx.HTTPError:
+        result.record("connection_error")
+
+
+async def run_load_test(
+    base_url: str,
+    questions: List[str],
+    api_key: Optional[str] = None,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    total: Optional[int] = None,
+    timeout: float = 120.0,
+    transport: Any = None,
+) -> LoadTestResult:
+    """
+    Send ``total`` requests (default: one per question, cycling the corpus).
+
+    Without ``rate`` the test is closed-loop: ``concurrency`` workers each
+    send their next request as soon as the previous one completes. With
+    ``rate`` (requests/second) requests start on a fixed schedule regardless
+    of response times, capped at ``concurrency`` in flight, which exposes
+    queueing and overload behaviour (503) that closed-loop hides.
+    """
+    import httpx
+
+    if not questions:
+        raise ValueError("Empty question corpus")
+    total = total or len(questions)
+    concurrency = max(1, concurrency)
+    url = base_url.rstrip("/") + "/ask"
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    result = LoadTestResult()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, transport=transport) as client:
+        start = time.perf_counter()
+
+        if rate:
+            in_flight = asyncio.Semaphore(concurrency)
+
+            async def scheduled(i: int) -> None:
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                async with in_flight:
+                    await _send(client, url, questions[i % len(questions)], headers, result)
+
+            await asyncio.gather(*(scheduled(i) for i in range(total)))
+        else:
+            indices = iter(range(total))
+
+            async def worker() -> None:
+                for i in indices:
+                    await _send(client, url, questions[i % len(questions)], headers, result)
+
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+
+        result.elapsed = time.perf_counter() - start
+
+    return result
+
+
+def format_report(result: LoadTestResult) -> str:
+    """Render a human-readable summary."""
+    latency = result.latencies.summary()
+    lines = [
+        "SIGMA-NEX Load Test:",
+        f"  Requests: {result.total} ({result.succeeded} ok) in {result.elapsed:.2f}s",
+        f"  Throughput: {result.throughput:.2f} req/s",
+        f"  Latency p50/p95/p99: {latency['p50'] * 1000:.0f}ms / {latency['p95'] * 1000:.0f}ms / {latency['p99'] * 1000:.0f}ms",
+        f"  Latency min/mean/max: {latency['min'] * 1000:.0f}ms / {latency['mean'] * 1000:.0f}ms / {latency['max'] * 1000:.0f}ms",
+        "  Errors:",
+    ]
+    for status in TRACKED_STATUSES:
+        lines.append(f"    {status}: {result.outcomes.get(f'http_{status}', 0)}")
+    tracked = {"ok"} | {f"http_{s}" for s in TRACKED_STATUSES}
+    for outcome, count in sorted(result.outcomes.items()):
+        if outcome not in tracked:
+            lines.append(f"    {outcome}: {count}")
+    return "\n".join(lines)
@@ -0,0 +1,196 @@
+"""
+SIGMA-NEX Pre-fork Server
+
+Runs the API server in several worker processes forked from a master that
+has already loaded the embedding model, the FAISS index and the Marian
+models. The workers share those pages copy-on-write instead of each loading
+its own copy (uvicorn's ``workers`` option starts fresh interpreters with
+``spawn``). Requires ``os.fork`` (Linux/macOS).
+"""
+
+import gc
+import logging
+import os
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def fork_available() -> bool:
+    """True if the platform can fork worker processes."""
+    return hasattr(os, "fork")
+
+
+def preload_models(config: Any) -> List[str]:
+    """
+    Load the models shared by the workers into this process.
+
+    Nothing is run through the models here: the first inference happens in
+    the workers, after the fork. Failures are logged and leave the model to
+    be loaded lazily by each worker.
+
+    Returns:
+        Names of the components loaded
+    """
+    loaded: List[str] = []
+    if config.get("retrieval_enabled", True) or config.get("semantic_cache_enabled", False):
+        try:
+            from .core import retriever
+
+            retriever._get_model()
+            loaded.append("embedding")
+            if config.get("retrieval_enabled", True):
+                retriever.get_retriever().snapshot()
+                loaded.append("faiss_index")
+        except Exception as e:
+            logger.warning(f"Could not preload retrieval models: {e}")
+
+    try:
+        from .core.translate import is_translation_available
+        from .core.translate import preload_models as preload_translation
+
+        if is_translation_available():
+            preload_translation()
+            loaded.append("translation")
+    except Exception as e:
+        logger.warning(f"Could not preload translation models: {e}")
+    return loaded
+
+
+class PreforkSupervisor:
+    """Master process that preloads models and forks uvicorn workers.
+
+    The listening socket is bound once in the master and inherited by every
+    worker. Workers that exit unexpectedly are replaced; SIGINT/SIGTERM stop
+    them gracefully.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: int = 2,
+        preload: Optional[Callable[[], Any]] = None,
+        shutdown_timeout: float = 30.0,
+        **kwargs: Any,
+    ):
+        """
+        Initialize the supervisor.
+
+        Args:
+            app: ASGI application served by the workers
+            host: Host to bind to
+            port: Port to bind to
+            workers: Number of worker processes
+            preload: Called in the master before forking (loads shared models)
+            shutdown_timeout: Seconds to wait for workers before killing them
+            **kwargs: Extra ``uvicorn.Config`` options
+        """
+        if not fork_available():
+            raise RuntimeError("Pre-fork workers require os.fork (not available on this platform)")
+        self.config = uvicorn.Config(app, host=host, port=port, **kwargs)
+        self.workers = max(1, int(workers))
+        self.preload = preload
+        self.shutdown_timeout = shutdown_timeout
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.restarts = 0
+        self._should_exit = False
+
+    def _handle_exit(self, signum: int, frame: Any) -> None:
+        self._should_exit = True
+
+    def _spawn(self, sockets: List[Any]) -> int:
+        pid = os.fork()
+        if pid == 0:  # worker
+            code = 0
+            try:
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    signal.signal(sig, signal.SIG_DFL)
+                uvicorn.Server(self.config).run(sockets=sockets)
+            except BaseException:
+                logger.exception("Worker process failed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def _reap(self) -> List[int]:
+        """Collect exited workers without blocking."""
+        exited = []
+        while self.children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                break
+            if pid == 0:
+                break
+            if pid in self.children:
+                started = self.children.pop(pid)
+                exited.append(pid)
+                if not self._should_exit and time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    # Crash loop (e.g. startup error): do not fork as fast as possible
+                    time.sleep(MIN_WORKER_LIFETIME)
+        return exited
+
+    def _stop_workers(self) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            logger.warning(f"Worker {pid} did not stop in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.children.pop(pid, None)
+
+    def run(self) -> None:
+        """Preload, fork the workers and supervise them until SIGINT/SIGTERM."""
+        sock = self.config.bind_socket()
+        if self.preload is not None:
+            start = time.perf_counter()
+            loaded = self.preload()
+            logger.info(f"Preloaded {loaded or 'nothing'} in {time.perf_counter() - start:.1f}s")
+
+        # Move everything loaded so far out of the GC's reach: collections in the
+        # workers would otherwise write to (and un-share) every object header
+        gc.collect()
+        gc.freeze()
+
+        previous = {sig: signal.signal(sig, self._handle_exit) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            for _ in range(self.workers):
+                self._spawn([sock])
+            logger.info(f"Started {self.workers} workers on {self.config.host}:{self.config.port}")
+
+            while not self._should_exit:
+                for pid in self._reap():
+                    if not self._should_exit:
+                        logger.warning(f"Worker {pid} exited, starting a new one")
+                        self.restarts += 1
+                        self._spawn([sock])
+                time.sleep(0.2)
+        finally:
+            self._stop_workers()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            sock.close()
+            gc.unfreeze()
+        logger.info("All workers stopped")
@@ -20,22 +20,30 @@ Optimized F    class HTTPException(Exception):
 """
 
 import asyncio
+import contextlib
+import contextvars
 import datetime
+import functools
+import hashlib
+import heapq
+import itertools
 import json
 import logging
+import os
 import socket
 import sys
 import time
 from asyncio import Queue
 from collections import defaultdict
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
 
 try:
     import requests
     import uvicorn
     from fastapi import Depends, FastAPI, HTTPException, Request
     from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import PlainTextResponse
     from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
     from pydantic import BaseModel, Field
 
@@ -55,8 +63,17 @@ except ImportError:
 
 
 # Import SIGMA-NEX components
-from .config import get_config, load_config  # re-export per compat test
+from .config import ConfigWatcher, get_config, load_config  # re-export per compat test
+from .core.backends import OllamaBackendPool, build_generate_payload
 from .core.context import build_prompt
+from .utils import tracing
+from .utils.metrics import (
+    OLLAMA_ERRORS,
+    REGISTRY,
+    process_memory,
+    render_family,
+    stage_timer,
+)
 from .utils.validation import (
     ValidationError,
     sanitize_log_data,
@@ -93,6 +110,7 @@ class SigmaResponse(BaseModel):
     response: str
     processing_time: Optional[float] = None
     model_used: Optional[str] = None
+    cached: bool = False
 
 
 class HealthResponse(BaseModel):
@@ -112,6 +130,11 @@ class RateLimiter:
         self.window_seconds = window_seconds
         self.requests: Dict[str, List[float]] = defaultdict(list)
 
+    def configure(self, max_requests: int, window_seconds: int) -> None:
+        """Change the limits, keeping the request history of each client."""
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+
     def is_allowed(self, client_id: str) -> bool:
         """Check if client is within rate limits."""
         now = time.time()
@@ -127,6 +150,119 @@ class RateLimiter:
         return True
 
 
+class OverloadedError(Exception):
+    """Raised when a request cannot be admitted to the model backend."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server overloaded")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency with a priority wait queue in front of Ollama.
+
+    At most ``max_concurrent`` model calls run at once; up to ``max_queue``
+    callers wait for a slot, lower priority values first (FIFO within a lane).
+    Callers beyond the queue bound, or waiting longer than ``queue_timeout``,
+    are rejected with :class:`OverloadedError`.
+    """
+
+    PRIORITY_MEDICAL = 0
+    PRIORITY_NORMAL = 1
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_queue: int = 32,
+        queue_timeout: float = 30.0,
+        retry_after: int = 5,
+    ):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.active = 0
+        self.queued = 0
+        self._waiters: List[Any] = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+
+        # Queue metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> None:
+        """Wait for a free slot; raise OverloadedError if the queue is full."""
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(self.retry_after)
+
+        fut: "asyncio.Future[None]" = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self.queued += 1
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(fut, timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if fut.done() and not fut.cancelled():
+                # A slot was handed over concurrently: pass it on
+                self.release()
+            else:
+                fut.cancel()
+                self.queued -= 1
+            if isinstance(exc, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise OverloadedError(self.retry_after)
+            raise
+
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self.queue_time_total += waited
+        self.queue_time_max = max(self.queue_time_max, waited)
+
+    def release(self) -> None:
+        """Free a slot, handing it to the highest-priority waiter if any."""
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self.queued -= 1
+                fut.set_result(None)
+                return
+        self.active = max(0, self.active - 1)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL) -> AsyncIterator[None]:
+        """Async context manager around acquire()/release()."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current queue state and queue-time metrics."""
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "queue_time_avg": (self.queue_time_total / self.admitted) if self.admitted else 0.0,
+            "queue_time_max": self.queue_time_max,
+        }
+
+
 class AuthManager:
     """Simple API key authentication manager."""
 
@@ -158,6 +294,12 @@ class AuthManager:
         """Remove API key."""
         self.api_keys.discard(api_key)
 
+    def set_keys(self, api_keys: List[str]) -> None:
+        """Replace all API keys at once (hot reload)."""
+        if not api_keys:
+            raise ValueError("API keys must be provided for security. Set api_keys in config.")
+        self.api_keys = set(api_keys)
+
 
 class SigmaServer:
     """
@@ -177,23 +319,13 @@ class SigmaServer:
         else:
             # Scenario normale: usa SigmaConfig
             cfg = get_config()
-            # Merge config with defaults per test compatibility
-            base_config = cfg.config.copy()
-            defaults = {
-                "max_tokens": 2048,
-                "model": cfg.get("model_name") or cfg.get("model", "mistral"),  # test aspetta 'model'
-                "model_name": cfg.get("model_name") or cfg.get("model", "mistral"),
-                "debug": False,
-                "temperature": 0.7,
-                "max_history": 100,
-                "retrieval_enabled": True,
-            }
-            defaults.update(base_config)  # user config ha precedenza
-            self.config = defaults  # dict per test compatibility
+            self.config = self._merged_config(cfg)  # dict per test compatibility
             self._cfg = cfg  # keep reference se serve
 
         self.system_prompt = self.config.get("system_prompt", "")
         self.model_name = self.config.get("model_name", "mistral")
+        self.medical_model = self.config.get("medical_model", "medllama2")
+        self.keep_alive = self.config.get("ollama_keep_alive")
 
         # Initialize runner with same config dict se disponibile
         if RUNNER_AVAILABLE:
@@ -214,6 +346,10 @@ class SigmaServer:
         self.start_time = datetime.datetime.utcnow()
         self.requests_processed = 0
 
+        # In-flight generations keyed by request (single-flight deduplication)
+        self._inflight: Dict[str, "asyncio.Future[str]"] = {}
+        self.coalesced_requests = 0
+
         # Initialize security systems - default to enabled for security
         auth_enabled = self.config.get("auth_enabled", True)
         api_keys = self.config.get("api_keys")
@@ -235,6 +371,15 @@ class SigmaServer:
             window_seconds=self.config.get("rate_limit_window", 60),
         )
         self.security_bearer = HTTPBearer(auto_error=False) if FASTAPI_AVAILABLE else None
+        self.backends = OllamaBackendPool.from_config(self.config)
+        self._health_task: Optional[asyncio.Task[None]] = None
+        self._keep_alive_task: Optional[asyncio.Task[None]] = None
+        self.admission = AdmissionController(
+            max_concurrent=self.config.get("ollama_max_concurrent", 4),
+            max_queue=self.config.get("ollama_max_queue", 32),
+            queue_timeout=self.config.get("ollama_queue_timeout", 30.0),
+            retry_after=self.config.get("ollama_retry_after", 5),
+        )
 
         # Initialize FastAPI app
         self.app = FastAPI(
@@ -254,14 +399,125 @@ class SigmaServer:
         )
 
         # Initialize components
+        self._init_config_watch()
         self._init_logging()
         self._init_blocklist()
         self._init_translation()
         self._init_medical_keywords()
+        self._init_semantic_cache()
+        self._init_tracing()
 
         # Setup routes
         self._setup_routes()
 
+    @staticmethod
+    def _merged_config(cfg: Any) -> Dict[str, Any]:
+        """Merge a SigmaConfig with the server defaults (user config wins)."""
+        defaults = {
+            "max_tokens": 2048,
+            "model": cfg.get("model_name") or cfg.get("model", "mistral"),  # test aspetta 'model'
+            "model_name": cfg.get("model_name") or cfg.get("model", "mistral"),
+            "debug": False,
+            "temperature": 0.7,
+            "max_history": 100,
+            "retrieval_enabled": True,
+        }
+        defaults.update(cfg.config.copy())
+        return defaults
+
+    def _init_config_watch(self) -> None:
+        """Hot-reload config.yaml and the framework when ``config_watch_enabled`` is set."""
+        self._config_watcher: Optional[ConfigWatcher] = None
+        if self._cfg is None or not self.config.get("config_watch_enabled", False):
+            return
+        self._config_watcher = ConfigWatcher(self._cfg, interval=self.config.get("config_watch_interval", 2.0))
+
+    def _on_config_change(self, changed: Set[str]) -> None:
+        """SigmaConfig subscriber: apply reloaded settings without a restart.
+
+        Runs in the ``ConfigWatcher`` thread only: reloads caused by reading
+        the configuration in a request do not notify. Each component gets a
+        single attribute swap, so in-flight requests finish with the values
+        they started with. Settings read only at startup (Ollama pool,
+        admission limits, logging) still require a restart.
+        """
+        if "framework" in changed:
+            self._update_retrieval_index()
+        changed = changed - {"framework"}
+        if not changed or self._cfg is None:
+            return
+
+        config = self._merged_config(self._cfg)
+        if config.get("auth_enabled", True) and not config.get("api_keys"):
+            logger.error("Config reload ignored api_keys: auth is enabled but no keys are configured")
+            config["api_keys"] = self.config.get("api_keys")
+
+        self.config = config
+        self.system_prompt = config.get("system_prompt", "")
+        self.model_name = config.get("model_name", "mistral")
+        self.medical_model = config.get("medical_model", "medllama2")
+        self.keep_alive = config.get("ollama_keep_alive")
+
+        runner = self.runner
+        runner.config = config
+        runner.model = runner.model_name = self.model_name
+        runner.system_prompt = self.system_prompt
+        runner.keep_alive = self.keep_alive
+
+        self.rate_limiter.configure(
+            max_requests=config.get("rate_limit_requests", 60),
+            window_seconds=config.get("rate_limit_window", 60),
+        )
+        if not config.get("auth_enabled", True):
+            self.auth_manager = None
+        elif self.auth_manager is None:
+            self.auth_manager = AuthManager(config["api_keys"])
+        else:
+            self.auth_manager.set_keys(config["api_keys"])
+
+        # Cached answers were produced by the previous model/prompt
+        if self.semantic_cache is not None and changed & {"model_name", "model", "system_prompt"}:
+            self.semantic_cache.clear()
+
+        # New index type or chunking: rebuild the index (unchanged vectors are reused)
+        index_keys = {"retrieval_chunking", "chunk_size", "chunk_overlap", "knowledge_paths"}
+        if config.get("retrieval_enabled", True) and any(k.startswith("index_") or k in index_keys for k in changed):
+            from .core.ingest import configure_ingest
+            from .core.retriever import configure_index
+
+            configure_index(config)
+            configure_ingest(config)
+            self._update_retrieval_index()
+        elif changed & {
+            "retrieval_hybrid",
+            "bm25_k1",
+            "bm25_b",
+            "retrieval_rrf_k",
+            "retrieval_candidates",
+            "retrieval_max_distance",
+            "retrieval_dynamic_k",
+            "retrieval_dynamic_ratio",
+            "retrieval_refresh_interval",
+        }:
+            # Query-time settings: no rebuild needed
+            from .core.retriever import configure_search
+
+            configure_search(config)
+
+        logger.info(f"Configuration reloaded: {', '.join(sorted(changed))}")
+
+    def _update_retrieval_index(self) -> None:
+        """Re-index the reloaded framework, re-encoding only changed modules."""
+        if self._cfg is None or not self.config.get("retrieval_enabled", True):
+            return
+        try:
+            from .core.retriever import update_index
+
+            stats = update_index(self._cfg.framework.get("modules", []))
+            logger.info(f"Framework reloaded: {stats}")
+        except Exception as e:
+            logger.warning(f"Framework reload failed, keeping current index: {e}")
+
     def _init_logging(self) -> None:
         """Initialize async logging system with queue."""
         if self._cfg:
@@ -312,11 +568,15 @@ class SigmaServer:
     def _init_translation(self) -> None:
         """Initialize translation system."""
         self.translation_enabled = False
+        self.translation_service = None
         try:
             from .core.translate import is_translation_available
+            from .core.translation_service import get_translation_service
 
             self.translation_enabled = is_translation_available()
             if self.translation_enabled:
+                # Worker processes keep Marian generation off the event loop
+                self.translation_service = get_translation_service(self.config)
                 logger.info("Translation system initialized")
             else:
                 logger.warning("Translation system unavailable")
@@ -362,6 +622,40 @@ class SigmaServer:
             "medicamento",
         ]
 
+    def _init_semantic_cache(self) -> None:
+        """Initialize the near-duplicate response cache (opt-in)."""
+        self.semantic_cache = None
+        if not self.config.get("semantic_cache_enabled", False):
+            return
+        try:
+            from .core.semantic_cache import SemanticCache
+
+            cache = SemanticCache(
+                threshold=self.config.get("semantic_cache_threshold", 0.92),
+                max_entries=self.config.get("semantic_cache_size", 1000),
+                ttl=self.config.get("semantic_cache_ttl", 3600),
+            )
+            if cache.available:
+                self.semantic_cache = cache
+                logger.info("Semantic response cache enabled")
+            else:
+                logger.warning("Semantic cache unavailable (FAISS/numpy missing)")
+        except ImportError:
+            logger.warning("Semantic cache module not available")
+
+    def _init_tracing(self) -> None:
+        """Trace each API request when ``tracing_enabled`` is set (opt-in)."""
+        tracing.configure_from_config(self.config, default_dir=self.log_path.parent / "traces")
+        if not tracing.is_enabled():
+            return
+
+        @self.app.middleware("http")
+        async def trace_requests(request: Request, call_next):
+            with tracing.trace(f"{request.method} {request.url.path}"):
+                return await call_next(request)
+
+        logger.info("Request tracing enabled")
+
     async def _is_blocked(self, user_id: Optional[int], chat_id: Optional[int]) -> bool:
         """Check if user or chat is blocked."""
         blocklist = await self._get_blocklist()
@@ -395,14 +689,15 @@ class SigmaServer:
     async def _log_request(self, data: Dict[str, Any]) -> None:
         """Log request data asynchronously via queue."""
         try:
-            sanitized_data = sanitize_log_data(data)
-            log_entry = json.dumps(sanitized_data, ensure_ascii=False)
+            with stage_timer("logging"):
+                sanitized_data = sanitize_log_data(data)
+                log_entry = json.dumps(sanitized_data, ensure_ascii=False)
 
-            # Add to queue for async processing
-            try:
-                self.log_queue.put_nowait(log_entry)
-            except asyncio.QueueFull:
-                logger.warning("Log queue full, dropping log entry")
+                # Add to queue for async processing
+                try:
+                    self.log_queue.put_nowait(log_entry)
+                except asyncio.QueueFull:
+                    logger.warning("Log queue full, dropping log entry")
 
         except Exception as e:
             logger.error(f"Logging error: {e}")
@@ -426,6 +721,52 @@ class SigmaServer:
             except Exception as e:
                 logger.error(f"Log worker error: {e}")
 
+    def _warm_models(self) -> List[str]:
+        """Models kept resident in Ollama: the main model and, if used, the medical one."""
+        models = [self.model_name]
+        if self.config.get("medical_enhancement_enabled", True) and self.medical_model not in models:
+            models.append(self.medical_model)
+        return models
+
+    async def _warm_up(self, backend: Any, model: str) -> bool:
+        """Load ``model`` on one backend with an empty prompt."""
+        payload = build_generate_payload(model, "", self.keep_alive)
+        try:
+            response = await self._post_generate(backend.generate_url, payload)
+            if response.status_code == 200:
+                self.backends.mark_success(backend, model)
+                return True
+            logger.warning(f"Warm-up of {model} on {backend.url} failed: HTTP {response.status_code}")
+        except Exception as e:
+            logger.warning(f"Warm-up of {model} on {backend.url} failed: {e}")
+        return False
+
+    async def _warm_up_models(self) -> None:
+        """Load every warm model on every backend concurrently."""
+        pairs = [(backend, model) for model in self._warm_models() for backend in self.backends.backends]
+        results = await asyncio.gather(*[self._warm_up(backend, model) for backend, model in pairs])
+        warmed = sum(1 for ok in results if ok)
+        logger.info(f"Model warm-up: {warmed}/{len(pairs)} model loads succeeded")
+
+    async def _keep_alive_worker(self, interval: float) -> None:
+        """Periodically re-send empty prompts so Ollama does not unload the models."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._warm_up_models()
+            except Exception as e:
+                logger.error(f"Keep-alive error: {e}")
+
+    async def _backend_health_worker(self) -> None:
+        """Background worker probing Ollama backends for health and loaded models."""
+        interval = self.config.get("ollama_health_interval", 30)
+        while True:
+            try:
+                await self.backends.check_health_async()
+            except Exception as e:
+                logger.error(f"Backend health check error: {e}")
+            await asyncio.sleep(interval)
+
     def _write_log_sync(self, log_entry: str) -> None:
         """Synchronous log writing."""
         with open(self.log_path, "a", encoding="utf-8") as f:
@@ -458,36 +799,78 @@ class SigmaServer:
 
         return True
 
-    async def _call_ollama(self, payload: Dict[str, Any]) -> str:
-        """Call Ollama API asynchronously using httpx or fallback to requests."""
+    @tracing.traced("server.call_ollama")
+    async def _call_ollama(
+        self,
+        payload: Dict[str, Any],
+        priority: int = AdmissionController.PRIORITY_NORMAL,
+        stage: str = "llm",
+    ) -> str:
+        """Call Ollama through admission control; 503 with Retry-After when overloaded."""
         try:
-            if HTTPX_AVAILABLE:
-                # Use httpx for true async HTTP calls
-                async with httpx.AsyncClient(timeout=120.0) as client:
-                    response = await client.post("http://localhost:11434/api/generate", json=payload)
-
-                    if response.status_code != 200:
-                        raise HTTPException(
-                            status_code=503,
-                            detail=f"Ollama service error: {response.status_code}",
-                        )
-
-                    data = response.json()
-            else:
-                # Fallback to requests in thread pool
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: requests.post("http://localhost:11434/api/generate", json=payload, timeout=120),  # type: ignore[arg-type,return-value]
-                )
+            with stage_timer("queue"):
+                await self.admission.acquire(priority)
+        except OverloadedError as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Server overloaded. Try again later.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+        try:
+            with stage_timer(stage):
+                return await self._request_ollama(payload)
+        finally:
+            self.admission.release()
+
+    async def _post_generate(self, url: str, payload: Dict[str, Any]) -> Any:
+        """POST a generate payload to one backend using httpx or fallback to requests."""
+        if HTTPX_AVAILABLE:
+            # Use httpx for true async HTTP calls
+            async with httpx.AsyncClient(timeout=120.0) as client:
+                return await client.post(url, json=payload)
+
+        # Fallback to requests in thread pool
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: requests.post(url, json=payload, timeout=120),  # type: ignore[arg-type,return-value]
+        )
+
+    async def _request_ollama(self, payload: Dict[str, Any]) -> str:
+        """Call Ollama API asynchronously, failing over across the backend pool."""
+        try:
+            model = payload.get("model")
+            data = None
+            last_error: Exception = RuntimeError("No Ollama backend available")
+
+            for backend in self.backends.candidates(model):
+                try:
+                    with self.backends.track(backend):
+                        response = await self._post_generate(backend.generate_url, payload)
+                except Exception as e:
+                    self.backends.mark_failure(backend)
+                    OLLAMA_ERRORS.inc(backend=backend.url, kind="transport")
+                    logger.warning(f"Ollama backend {backend.url} failed: {e}")
+                    last_error = e
+                    continue
 
                 if response.status_code != 200:
-                    raise HTTPException(
+                    if response.status_code >= 500:
+                        self.backends.mark_failure(backend)
+                    OLLAMA_ERRORS.inc(backend=backend.url, kind=f"http_{response.status_code}")
+                    last_error = HTTPException(
                         status_code=503,
                         detail=f"Ollama service error: {response.status_code}",
                     )
+                    continue
 
+                self.backends.mark_success(backend, model)
                 data = response.json()
+                break
+
+            if data is None:
+                raise last_error
 
             result = data.get("response", data.get("message", "No response from model"))
 
@@ -508,12 +891,186 @@ class SigmaServer:
     async def _call_medical_model(self, prompt: str) -> Optional[str]:
         """Call medical model if available."""
         try:
-            payload = {"model": "medllama2", "prompt": prompt, "stream": False}
-            return await self._call_ollama(payload)
+            payload = build_generate_payload(self.medical_model, prompt, self.keep_alive)
+            return await self._call_ollama(payload, priority=AdmissionController.PRIORITY_MEDICAL, stage="medical")
         except Exception as e:
             logger.warning(f"Medical model unavailable: {e}")
             return None
 
+    def _request_key(self, question: str, history: List[str]) -> str:
+        """Build the deduplication key for a request (model, question, history)."""
+        raw = json.dumps([self.model_name, question, list(history)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[str]]) -> str:
+        """Run ``factory`` once per key; concurrent callers await the same task.
+
+        The shared task is shielded so that a disconnecting client does not
+        cancel the generation for the other waiters.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+
+            def _release(done: "asyncio.Future[str]") -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            task.add_done_callback(_release)
+        else:
+            self.coalesced_requests += 1
+        return await asyncio.shield(task)
+
+    def _semantic_lookup(self, question: str) -> tuple:
+        """
+        Retrieve the modules for ``question`` and look it up in the semantic
+        cache, embedding the question once for both (blocking).
+
+        Returns:
+            ``(moduli, cache_vector, cached_response)``
+        """
+        from .core import retriever
+
+        try:
+            vector = retriever.encode_queries([question])
+        except Exception as e:
+            logger.warning(f"Question embedding failed: {e}")
+            vector = None
+        moduli = retriever.search_moduli(question, k=3, query_vector=vector)
+        cache_vector = self.semantic_cache.normalize(vector)
+        return moduli, cache_vector, self.semantic_cache.lookup(cache_vector, moduli)
+
+    async def _generate_response(self, question: str, history: List[str], moduli: Optional[List[str]]) -> str:
+        """Run the model pipeline for a question (standard + medical enhancement)."""
+        # Build prompt
+        prompt = build_prompt(self.system_prompt, history, question, moduli=moduli)
+
+        # Medical queries take the priority lane in the admission queue
+        is_medical = self._is_medical_query(question)
+        priority = AdmissionController.PRIORITY_MEDICAL if is_medical else AdmissionController.PRIORITY_NORMAL
+
+        # Standard model call
+        payload = build_generate_payload(self.model_name, prompt, self.keep_alive)
+
+        response = await self._call_ollama(payload, priority=priority)
+
+        # Medical enhancement if applicable and enabled
+        medical_enhancement_enabled = self.config.get("medical_enhancement_enabled", True)
+
+        if medical_enhancement_enabled and is_medical:
+            medical_disclaimer = (
+                "\n\nDISCLAIMER MEDICO:\n"
+                "Le informazioni fornite sono solo a scopo educativo e informativo. "
+                "Non sostituiscono il parere medico professionale. "
+                "Per emergenze mediche contattare il 118 o recarsi al pronto soccorso."
+            )
+
+            medical_prompt = (
+                f"Medical question (Italian): {question}\n"
+                f"Provide detailed, practical advice with references to "
+                f"real disinfectants and medications used in Europe/Italy. "
+                f"Respond in English."
+            )
+            medical_response = await self._call_medical_model(medical_prompt)
+
+            if medical_response and self.translation_enabled:
+                try:
+                    from .core.translation_service import translate_async
+
+                    medical_it = await translate_async(medical_response, "en-it", self.translation_service)
+                    response += f"\n\n[MEDICAL ENHANCEMENT:]\n{medical_it}"
+                    response += medical_disclaimer
+                except Exception as e:
+                    logger.error(f"Translation error: {e}")
+            elif medical_response:
+                response += f"\n\n[MEDICAL ENHANCEMENT:]\n{medical_response}"
+                response += medical_disclaimer
+
+        return response
+
+    def render_metrics(self) -> str:
+        """Render process-wide pipeline metrics plus this server's queues and caches."""
+        admission = self.admission.stats()
+        parts = [
+            REGISTRY.render(),
+            render_family(
+                "sigma_requests_processed_total",
+                "counter",
+                "Successfully answered /ask requests",
+                [({}, self.requests_processed)],
+            ),
+            render_family(
+                "sigma_queue_depth",
+                "gauge",
+                "Current depth of internal queues",
+                [
+                    ({"queue": "admission"}, admission["queued"]),
+                    ({"queue": "log"}, self.log_queue.qsize()),
+                ],
+            ),
+            render_family(
+                "sigma_ollama_active_requests",
+                "gauge",
+                "Model calls currently holding an admission slot",
+                [({}, admission["active"])],
+            ),
+            render_family(
+                "sigma_admission_rejected_total",
+                "counter",
+                "Requests rejected by admission control",
+                [({"reason": "queue_full"}, admission["rejected"]), ({"reason": "timeout"}, admission["timeouts"])],
+            ),
+            render_family(
+                "sigma_admission_queue_seconds_max",
+                "gauge",
+                "Longest time a request waited for an admission slot",
+                [({}, admission["queue_time_max"])],
+            ),
+            render_family(
+                "sigma_coalesced_requests_total",
+                "counter",
+                "Requests served by joining an identical in-flight generation",
+                [({}, self.coalesced_requests)],
+            ),
+            render_family(
+                "sigma_backend_outstanding_requests",
+                "gauge",
+                "In-flight requests per Ollama backend",
+                [({"backend": b["url"]}, b["outstanding"]) for b in self.backends.stats()],
+            ),
+            render_family(
+                "sigma_backend_healthy",
+                "gauge",
+                "Ollama backend health (1 = healthy)",
+                [({"backend": b["url"]}, 1 if b["healthy"] else 0) for b in self.backends.stats()],
+            ),
+        ]
+        memory = process_memory()
+        if memory is not None:
+            parts.append(
+                render_family(
+                    "sigma_process_memory_bytes",
+                    "gauge",
+                    "Memory of the worker process serving the scrape (pss counts shared pages once across workers)",
+                    [({"pid": str(os.getpid()), "kind": kind}, value) for kind, value in memory.items()],
+                )
+            )
+        if self.semantic_cache is not None:
+            cache = self.semantic_cache.stats()
+            parts.append(
+                render_family(
+                    "sigma_semantic_cache_requests_total",
+                    "counter",
+                    "Semantic cache lookups by result",
+                    [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])],
+                )
+            )
+            parts.append(
+                render_family("sigma_semantic_cache_entries", "gauge", "Cached answers", [({}, cache["entries"])])
+            )
+        return "".join(parts)
+
     def _setup_routes(self) -> None:
         """Setup FastAPI routes."""
 
@@ -543,11 +1100,14 @@ class SigmaServer:
                 await self._check_auth(credentials)
                 await self._check_rate_limit(http_request)
                 # Validate input
-                question = sanitize_text_input(request.question, max_length=5000)
-                user_id = validate_user_id(request.user_id) if request.user_id else None
+                with stage_timer("sanitize"):
+                    question = sanitize_text_input(request.question, max_length=5000)
+                    user_id = validate_user_id(request.user_id) if request.user_id else None
 
                 # Check blocklist
-                if await self._is_blocked(user_id, request.chat_id):
+                with stage_timer("blocklist"):
+                    blocked = await self._is_blocked(user_id, request.chat_id)
+                if blocked:
                     await self._log_request(
                         {
                             "timestamp": start_time.isoformat(),
@@ -560,45 +1120,46 @@ class SigmaServer:
                     )
                     raise HTTPException(status_code=403, detail="Access denied")
 
-                # Build prompt
-                prompt = build_prompt(self.system_prompt, request.history, question)
-
-                # Standard model call
-                payload = {"model": self.model_name, "prompt": prompt, "stream": False}
-
-                response = await self._call_ollama(payload)
-
-                # Medical enhancement if applicable and enabled
-                medical_enhancement_enabled = self.config.get("medical_enhancement_enabled", True)
-
-                if medical_enhancement_enabled and self._is_medical_query(question):
-                    medical_disclaimer = (
-                        "\n\nDISCLAIMER MEDICO:\n"
-                        "Le informazioni fornite sono solo a scopo educativo e informativo. "
-                        "Non sostituiscono il parere medico professionale. "
-                        "Per emergenze mediche contattare il 118 o recarsi al pronto soccorso."
+                # Semantic cache: only stateless questions (history changes the answer)
+                moduli = None
+                cache_vector = None
+                cached_response = None
+                if self.semantic_cache is not None and not request.history:
+                    # Embedding and FAISS searches are blocking: keep them off the event loop
+                    lookup = functools.partial(contextvars.copy_context().run, self._semantic_lookup, question)
+                    moduli, cache_vector, cached_response = await asyncio.get_event_loop().run_in_executor(None, lookup)
+
+                if cached_response is not None:
+                    processing_time = (datetime.datetime.utcnow() - start_time).total_seconds()
+                    self.requests_processed += 1
+                    await self._log_request(
+                        {
+                            "timestamp": start_time.isoformat(),
+                            "user_id": user_id,
+                            "chat_id": request.chat_id,
+                            "username": request.username,
+                            "question": question[:200],
+                            "response_length": len(cached_response),
+                            "processing_time": processing_time,
+                            "status": "cached",
+                            **client_info,
+                        }
                     )
-
-                    medical_prompt = (
-                        f"Medical question (Italian): {question}\n"
-                        f"Provide detailed, practical advice with references to "
-                        f"real disinfectants and medications used in Europe/Italy. "
-                        f"Respond in English."
+                    return SigmaResponse(
+                        response=cached_response,
+                        processing_time=processing_time,
+                        model_used=self.model_name,
+                        cached=True,
                     )
-                    medical_response = await self._call_medical_model(medical_prompt)
 
-                    if medical_response and self.translation_enabled:
-                        try:
-                            from .core.translate import translate_en_to_it
+                async def _generate() -> str:
+                    result = await self._generate_response(question, request.history, moduli)
+                    if self.semantic_cache is not None:
+                        self.semantic_cache.store(cache_vector, moduli, result)
+                    return result
 
-                            medical_it = translate_en_to_it(medical_response)
-                            response += f"\n\n[MEDICAL ENHANCEMENT:]\n{medical_it}"
-                            response += medical_disclaimer
-                        except Exception as e:
-                            logger.error(f"Translation error: {e}")
-                    elif medical_response:
-                        response += f"\n\n[MEDICAL ENHANCEMENT:]\n{medical_response}"
-                        response += medical_disclaimer
+                # Identical in-flight questions share a single generation
+                response = await self._single_flight(self._request_key(question, request.history), _generate)
 
                 # Calculate processing time
                 processing_time = (datetime.datetime.utcnow() - start_time).total_seconds()
@@ -656,6 +1217,14 @@ class SigmaServer:
                 logger.error(f"Log retrieval error: {e}")
                 raise HTTPException(status_code=500, detail="Cannot retrieve logs")
 
+        @self.app.get("/metrics")
+        async def metrics(request: Request):
+            """Prometheus metrics (restricted to metrics_allowed_hosts)."""
+            client_host = request.client.host if request.client and request.client.host else "unknown"
+            if client_host not in self.config.get("metrics_allowed_hosts", ["127.0.0.1", "::1"]):
+                raise HTTPException(status_code=403, detail="Access denied")
+            return PlainTextResponse(self.render_metrics(), media_type="text/plain; version=0.0.4")
+
         @self.app.post("/api/query", response_model=SigmaResponse)
         async def api_query_legacy(request: SigmaRequest, http_request: Request):
             """Legacy endpoint che inoltra a /ask per compatibilità test."""
@@ -669,25 +1238,60 @@ class SigmaServer:
         self._log_worker_task = asyncio.create_task(self._log_worker())  # type: ignore[assignment]
         logger.info("Async log worker started")
 
-        # Preload translation models if available
+        # Preload translation models if available (in the workers, if any)
         if self.translation_enabled:
             try:
                 from .core.translate import preload_models
 
-                await asyncio.get_event_loop().run_in_executor(None, preload_models)
+                preload = self.translation_service.start if self.translation_service is not None else preload_models
+                await asyncio.get_event_loop().run_in_executor(None, preload)
             except Exception as e:
                 logger.warning(f"Could not preload translation models: {e}")
 
+        # Load the LLMs into Ollama memory before the first request
+        if self.config.get("ollama_warmup", True):
+            await self._warm_up_models()
+
+        interval = self.config.get("ollama_keep_alive_interval", 0)
+        if interval and interval > 0:
+            self._keep_alive_task = asyncio.create_task(self._keep_alive_worker(interval))
+            logger.info(f"Model keep-alive pinger started (every {interval}s)")
+
+        # Periodic health checks only matter when routing across several backends
+        if len(self.backends) > 1 and HTTPX_AVAILABLE:
+            self._health_task = asyncio.create_task(self._backend_health_worker())
+            logger.info(f"Health checks started for {len(self.backends)} Ollama backends")
+
+        if self._config_watcher is not None and self._cfg is not None:
+            self._cfg.subscribe(self._on_config_change)
+            self._config_watcher.start()
+            logger.info(f"Config hot-reload enabled (every {self._config_watcher.interval}s)")
+
         logger.info("Server ready for requests")
 
+    def _stop_translation_pool(self) -> None:
+        """Translate in-process from now on (server and runner)."""
+        from .core.translation_service import shutdown_translation_service
+
+        self.translation_service = None
+        if getattr(self, "runner", None) is not None:
+            self.runner.translation_service = None
+        shutdown_translation_service()
+
     async def shutdown(self) -> None:
         """Server shutdown tasks."""
-        if self._log_worker_task:
-            self._log_worker_task.cancel()
-            try:
-                await self._log_worker_task
-            except asyncio.CancelledError:
-                pass
+        if self.translation_service is not None:
+            self._stop_translation_pool()
+        if self._config_watcher is not None and self._cfg is not None:
+            self._config_watcher.stop()
+            self._cfg.unsubscribe(self._on_config_change)
+        for task in (self._log_worker_task, self._health_task, self._keep_alive_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         logger.info("SIGMA-NEX API Server shutdown complete")
 
     def run(self, host: str = "127.0.0.1", port: int = 8000, **kwargs) -> None:
@@ -702,6 +1306,32 @@ class SigmaServer:
         async def shutdown_event():
             await self.shutdown()
 
+        workers = kwargs.pop("workers", None) or 1
+        if workers > 1:
+            from .prefork import PreforkSupervisor, fork_available, preload_models
+
+            if fork_available():
+                if self.translation_service is not None:
+                    # A process pool cannot be shared across fork: every worker would start its own
+                    logger.warning(
+                        f"translation_workers is ignored with {workers} server workers: Marian models "
+                        "are loaded once in the master and shared instead of one pool per worker"
+                    )
+                    self._stop_translation_pool()
+                # Models loaded once in the master are shared copy-on-write by the workers
+                preload = self.config.get("server_preload_models", True)
+                logger.info(f"Starting SIGMA-NEX API server on {host}:{port} with {workers} workers")
+                PreforkSupervisor(
+                    self.app,
+                    host=host,
+                    port=port,
+                    workers=workers,
+                    preload=(lambda: preload_models(self.config)) if preload else None,
+                    **kwargs,
+                ).run()
+                return
+            logger.warning("Multiple workers need os.fork; starting a single worker")
+
         logger.info(f"Starting SIGMA-NEX API server on {host}:{port}")
         uvicorn.run(self.app, host=host, port=port, **kwargs)
 
@@ -718,6 +1348,9 @@ def main() -> None:
 
     args = parser.parse_args()
 
+    # Lets the CPU profile split cores between the worker processes
+    os.environ.setdefault("WEB_CONCURRENCY", str(max(1, args.workers)))
+
     try:
         server = SigmaServer(config_path=args.config)
         server.run(
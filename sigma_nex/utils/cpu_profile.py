@@ -0,0 +1,162 @@
+"""
+SIGMA-NEX CPU Inference Profile
+
+Thread-pool sizing and inference settings for the torch models (MiniLM
+embeddings, Marian translation). torch sizes its intra-op pool to every core
+by default, so N server workers each running a full-size pool oversubscribe
+the CPU. The profile is applied when a model is loaded; torch thread
+settings are process-wide, so within one process the last loaded component
+wins (translation workers get their own process and their own setting).
+"""
+
+import importlib
+import os
+import sys
+from contextlib import nullcontext
+from typing import Any, Dict, Optional, Tuple
+
+COMPONENTS = ("embedding", "translation")
+
+_NOOP = nullcontext()
+
+_settings: Dict[str, Any] = {
+    "threads": "auto",  # intra-op threads for the process ("auto" or int)
+    "interop_threads": 1,
+    "components": {},  # component -> intra-op threads override
+    "inference_mode": True,
+    "compile": False,
+}
+
+
+def _torch() -> Optional[Any]:
+    """Import torch if installed (only called at model load time)."""
+    try:
+        return importlib.import_module("torch")
+    except Exception:
+        return None
+
+
+def server_workers() -> int:
+    """Number of server processes sharing this machine (``WEB_CONCURRENCY``)."""
+    try:
+        return max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+def configure_cpu_profile(
+    threads: Any = None,
+    interop_threads: Optional[int] = None,
+    components: Optional[Dict[str, int]] = None,
+    inference_mode: Optional[bool] = None,
+    compile: Optional[bool] = None,
+) -> None:
+    """Update the profile; arguments left as None keep their current value."""
+    if threads is not None:
+        _settings["threads"] = threads
+    if interop_threads is not None:
+        _settings["interop_threads"] = max(1, int(interop_threads))
+    if components is not None:
+        _settings["components"] = {k: int(v) for k, v in components.items() if k in COMPONENTS and v}
+    if inference_mode is not None:
+        _settings["inference_mode"] = bool(inference_mode)
+    if compile is not None:
+        _settings["compile"] = bool(compile)
+
+
+def _as_int(value: Any) -> Optional[int]:
+    """Positive int from a config value, None if unset or invalid."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    return number if number > 0 else None
+
+
+def _as_bool(value: Any) -> Optional[bool]:
+    return value if isinstance(value, bool) else None
+
+
+def configure_from_config(config: Any) -> None:
+    """Apply ``cpu_*`` settings (unset or invalid keys keep the defaults)."""
+    if config is None or not hasattr(config, "get"):
+        return
+    workers = _as_int(config.get("server_workers"))
+    if workers:
+        os.environ.setdefault("WEB_CONCURRENCY", str(workers))
+    threads = config.get("cpu_threads")
+    configure_cpu_profile(
+        threads="auto" if threads == "auto" else _as_int(threads),
+        interop_threads=_as_int(config.get("cpu_interop_threads")),
+        components={c: n for c in COMPONENTS if (n := _as_int(config.get(f"cpu_{c}_threads")))},
+        inference_mode=_as_bool(config.get("cpu_inference_mode")),
+        compile=_as_bool(config.get("cpu_torch_compile")),
+    )
+
+
+def resolve_threads(component: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Return ``(intra_op, inter_op)`` threads for ``component``.
+
+    ``auto`` splits the machine's cores evenly between server workers, so
+    4 workers on 8 cores get 2 threads each instead of 8.
+    """
+    intra = _settings["components"].get(component) if component else None
+    if not intra:
+        threads = _settings["threads"]
+        if threads == "auto" or not threads:
+            intra = max(1, (os.cpu_count() or 1) // server_workers())
+        else:
+            intra = max(1, int(threads))
+    return intra, _settings["interop_threads"]
+
+
+def apply_threads(component: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """
+    Size torch's thread pools for ``component`` before loading its model.
+
+    Returns:
+        The applied ``(intra_op, inter_op)``, or None if torch is missing
+    """
+    torch = _torch()
+    if torch is None:
+        return None
+    intra, inter = resolve_threads(component)
+    torch.set_num_threads(intra)
+    try:
+        # Only allowed before the first inter-op parallel work in the process
+        torch.set_num_interop_threads(inter)
+    except RuntimeError:
+        pass
+    return intra, inter
+
+
+def inference_context() -> Any:
+    """``torch.inference_mode()`` if enabled and torch is loaded, else a no-op."""
+    if not _settings["inference_mode"]:
+        return _NOOP
+    torch = sys.modules.get("torch")
+    if torch is None or not hasattr(torch, "inference_mode"):
+        return _NOOP
+    return torch.inference_mode()
+
+
+def maybe_compile(model: Any) -> Any:
+    """
+    Compile ``model.forward`` with ``torch.compile`` when enabled.
+
+    The forward is replaced in place so that ``generate``/``encode``, which
+    call it internally, use the compiled graph. Falls back to eager mode.
+    """
+    if not _settings["compile"] or not hasattr(model, "forward"):
+        return model
+    torch = _torch()
+    if torch is None or not hasattr(torch, "compile"):
+        return model
+    try:
+        model.forward = torch.compile(model.forward)
+    except Exception as e:
+        print(f"[WARNING] torch.compile unavailable, using eager model: {e}")
+    return model
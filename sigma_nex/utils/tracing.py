@@ -0,0 +1,293 @@
+"""
+SIGMA-NEX Tracing
+
+Opt-in span recording for a single query, propagated with context variables.
+When tracing is disabled every instrumentation point returns a shared no-op
+context manager. Finished traces are written locally as Chrome trace JSON
+(chrome://tracing, Perfetto) and/or OTLP-compatible JSON.
+"""
+
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+SERVICE_NAME = "sigma-nex"
+EXPORT_FORMATS = ("chrome", "otlp")
+
+_NOOP = nullcontext()
+_span_ids = itertools.count(1)
+
+_settings: Dict[str, Any] = {
+    "enabled": False,
+    "directory": Path("logs") / "traces",
+    "formats": ("chrome",),
+    "sample_rate": 1.0,
+    "min_duration_ms": 0.0,
+}
+
+
+class Span:
+    """A timed operation inside a trace."""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "thread_id")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = f"{next(_span_ids):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = self.start_ns
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans recorded for one root operation (a query or an API request)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        # Offset converting perf_counter_ns readings to Unix epoch nanoseconds
+        self._epoch_offset = time.time_ns() - time.perf_counter_ns()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def duration_ms(self) -> float:
+        if not self.spans:
+            return 0.0
+        start = min(s.start_ns for s in self.spans)
+        end = max(s.end_ns for s in self.spans)
+        return (end - start) / 1e6
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace event format (complete ``X`` events, microseconds)."""
+        origin = min((s.start_ns for s in self.spans), default=0)
+        pid = os.getpid()
+        events = [
+            {
+                "name": s.name,
+                "cat": "sigma",
+                "ph": "X",
+                "ts": (s.start_ns - origin) / 1000,
+                "dur": (s.end_ns - s.start_ns) / 1000,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": {**s.attributes, "span_id": s.span_id, "parent_id": s.parent_id},
+            }
+            for s in sorted(self.spans, key=lambda s: s.start_ns)
+        ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.trace_id, "name": self.name},
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON ``ExportTraceServiceRequest`` payload."""
+        spans = []
+        for s in sorted(self.spans, key=lambda s: s.start_ns):
+            item = {
+                "traceId": self.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns + self._epoch_offset),
+                "endTimeUnixNano": str(s.end_ns + self._epoch_offset),
+                "attributes": [_otlp_attribute(k, v) for k, v in s.attributes.items()],
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            spans.append(item)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                    "scopeSpans": [{"scope": {"name": "sigma_nex"}, "spans": spans}],
+                }
+            ]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("sigma_trace", default=None)
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("sigma_span", default=None)
+
+
+def configure_tracing(
+    enabled: bool = True,
+    directory: Optional[Any] = None,
+    formats: Optional[Sequence[str]] = None,
+    sample_rate: Optional[float] = None,
+    min_duration_ms: Optional[float] = None,
+) -> None:
+    """Enable or disable tracing and set export options."""
+    _settings["enabled"] = bool(enabled)
+    if directory is not None:
+        _settings["directory"] = Path(directory)
+    if formats is not None:
+        if isinstance(formats, str):
+            formats = [formats]
+        unknown = [f for f in formats if f not in EXPORT_FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown trace format(s): {', '.join(unknown)}")
+        _settings["formats"] = tuple(formats)
+    if sample_rate is not None:
+        _settings["sample_rate"] = min(1.0, max(0.0, float(sample_rate)))
+    if min_duration_ms is not None:
+        _settings["min_duration_ms"] = max(0.0, float(min_duration_ms))
+
+
+def configure_from_config(config: Any, default_dir: Optional[Any] = None) -> None:
+    """Apply ``tracing_*`` settings; tracing stays off unless explicitly enabled."""
+    if config is None or config.get("tracing_enabled") is not True:
+        return
+    configure_tracing(
+        True,
+        directory=config.get("tracing_dir") or default_dir,
+        formats=config.get("tracing_formats"),
+        sample_rate=config.get("tracing_sample_rate"),
+        min_duration_ms=config.get("tracing_min_duration_ms"),
+    )
+
+
+def is_enabled() -> bool:
+    return _settings["enabled"]
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def _record(trace: Trace, name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+    parent = _current_span.get()
+    span_obj = Span(name, parent.span_id if parent else None, attributes)
+    token = _current_span.set(span_obj)
+    try:
+        yield span_obj
+    except BaseException as e:
+        span_obj.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        span_obj.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+        trace.add(span_obj)
+
+
+def span(name: str, **attributes: Any):
+    """Record a child span of the active trace; no-op outside a trace."""
+    active = _current_trace.get()
+    if active is None:
+        return _NOOP
+    return _record(active, name, attributes)
+
+
+@contextmanager
+def _root(name: str, attributes: Dict[str, Any]) -> Iterator[Optional[Trace]]:
+    if _settings["sample_rate"] < 1.0 and random.random() >= _settings["sample_rate"]:
+        yield None
+        return
+
+    active = Trace(name)
+    token = _current_trace.set(active)
+    try:
+        with _record(active, name, attributes):
+            yield active
+    finally:
+        _current_trace.reset(token)
+        if active.duration_ms >= _settings["min_duration_ms"]:
+            try:
+                export(active)
+            except Exception as e:
+                print(f"[WARNING] Trace export failed: {e}")
+
+
+def trace(name: str, **attributes: Any):
+    """Start a root trace, or a child span when one is already active.
+
+    Returns a no-op context manager when tracing is disabled.
+    """
+    if not _settings["enabled"]:
+        return _NOOP
+    if _current_trace.get() is not None:
+        return span(name, **attributes)
+    return _root(name, attributes)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator tracing every call of a sync or async function as ``name``."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with trace(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def export(
+    active: Trace,
+    directory: Optional[Any] = None,
+    formats: Optional[Sequence[str]] = None,
+) -> List[Path]:
+    """Write a finished trace to ``directory`` in each requested format."""
+    target = Path(directory) if directory is not None else _settings["directory"]
+    target.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+
+    written = []
+    for fmt in formats or _settings["formats"]:
+        if fmt == "chrome":
+            path = target / f"{stamp}-{active.trace_id}.trace.json"
+            data = active.to_chrome()
+        elif fmt == "otlp":
+            path = target / f"{stamp}-{active.trace_id}.otlp.json"
+            data = active.to_otlp()
+        else:
+            raise ValueError(f"Unknown trace format: {fmt}")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        written.append(path)
+    return written
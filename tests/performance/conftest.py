@@ -0,0 +1,200 @@
+"""
+Harness per i benchmark di SIGMA-NEX
+
+- FakeOllama: server HTTP locale che imita /api/generate con latenza e
+  velocità di generazione configurabili
+- bench: fixture di pytest-benchmark se installato, altrimenti un timer minimo
+- check_baseline: confronto con tests/performance/baselines.json
+
+Variabili d'ambiente:
+    SIGMA_BENCH_COMPARE=1    fallisce se un risultato peggiora oltre la tolleranza
+    SIGMA_BENCH_TOLERANCE    tolleranza relativa (default 0.5 = 50%)
+    SIGMA_BENCH_SAVE=1       aggiorna le baseline con i risultati correnti
+"""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from sigma_nex.utils.metrics import StreamingStats
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+
+
+class FakeOllama:
+    """Stand-in locale di Ollama.
+
+    Ogni generate attende ``latency`` secondi più ``response_tokens /
+    tokens_per_second`` (se > 0), poi risponde con un testo di
+    ``response_tokens`` parole.
+    """
+
+    def __init__(self, latency=0.02, tokens_per_second=0.0, response_tokens=40, models=("mistral", "medllama2")):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.models = list(models)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def generation_time(self):
+        stream = self.response_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return self.latency + stream
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, data, status=200):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path in ("/api/tags", "/api/ps"):
+                    self._send_json({"models": [{"name": f"{m}:latest"} for m in fake.models]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, 404)
+                    return
+                with fake._lock:
+                    fake.requests += 1
+                time.sleep(fake.generation_time())
+                words = " ".join("token" for _ in range(fake.response_tokens))
+                self._send_json({"model": payload.get("model"), "response": words, "done": True})
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _SimpleBenchmark:
+    """Sottoinsieme dell'API di pytest-benchmark usato dai benchmark."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stats = StreamingStats()
+        self.extra_info = {}
+
+    def pedantic(self, target, args=(), kwargs=None, rounds=10, iterations=1, warmup_rounds=0):
+        kwargs = kwargs or {}
+        for _ in range(warmup_rounds):
+            target(*args, **kwargs)
+        result = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = target(*args, **kwargs)
+            self.stats.append((time.perf_counter() - start) / iterations)
+        return result
+
+    @property
+    def median(self):
+        return self.stats.percentile(50)
+
+
+class _PluginBenchmark:
+    """Adatta la fixture di pytest-benchmark alla stessa interfaccia."""
+
+    def __init__(self, benchmark):
+        self._benchmark = benchmark
+        self.extra_info = benchmark.extra_info
+
+    def pedantic(self, target, args=(), kwargs=None, rounds=10, iterations=1, warmup_rounds=0):
+        return self._benchmark.pedantic(
+            target, args=args, kwargs=kwargs or {}, rounds=rounds, iterations=iterations, warmup_rounds=warmup_rounds
+        )
+
+    @property
+    def median(self):
+        return self._benchmark.stats.stats.median
+
+
+@pytest.fixture
+def fake_ollama():
+    with FakeOllama() as server:
+        yield server
+
+
+@pytest.fixture
+def bench(request):
+    """pytest-benchmark se disponibile (CI), altrimenti timer interno."""
+    if request.config.pluginmanager.hasplugin("benchmark"):
+        return _PluginBenchmark(request.getfixturevalue("benchmark"))
+    return _SimpleBenchmark(request.node.name)
+
+
+def _load_baselines():
+    if BASELINES_PATH.exists():
+        return json.loads(BASELINES_PATH.read_text(encoding="utf-8"))
+    return {}
+
+
+@pytest.fixture
+def check_baseline():
+    """Confronta una metrica con la baseline salvata.
+
+    ``higher_is_better`` distingue throughput (QPS) da latenze (secondi).
+    """
+
+    def check(name, value, higher_is_better=False):
+        baselines = _load_baselines()
+        if os.environ.get("SIGMA_BENCH_SAVE") == "1":
+            baselines[name] = round(float(value), 6)
+            BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            return
+
+        reference = baselines.get(name)
+        print(f"\n[BENCH] {name}: {value:.6g} (baseline {reference})")
+        if reference is None or os.environ.get("SIGMA_BENCH_COMPARE") != "1":
+            return
+
+        tolerance = float(os.environ.get("SIGMA_BENCH_TOLERANCE", "0.5"))
+        if higher_is_better:
+            assert value >= reference * (1 - tolerance), f"{name} regressed: {value:.6g} < baseline {reference}"
+        else:
+            assert value <= reference * (1 + tolerance), f"{name} regressed: {value:.6g} > baseline {reference}"
+
+    return check
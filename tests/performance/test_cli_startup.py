@@ -0,0 +1,63 @@
+"""
+Benchmark dell'avvio del CLI
+Budget sul tempo di import (python -X importtime) e sui comandi leggeri
+
+Variabili d'ambiente:
+    SIGMA_CLI_IMPORT_BUDGET_MS   budget per ``import sigma_nex.cli`` (default 150)
+    SIGMA_CLI_COMMAND_BUDGET_MS  budget per ``sigma logout`` completo (default 1000)
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+
+def _import_time_us(module):
+    """Tempo cumulativo di import di ``module`` (microsecondi) da -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    for line in result.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise AssertionError(f"{module} non trovato nell'output di importtime")
+
+
+class TestCliStartup:
+    """Tempo di avvio del CLI"""
+
+    def test_cli_import_budget(self, check_baseline):
+        budget_ms = float(os.environ.get("SIGMA_CLI_IMPORT_BUDGET_MS", "150"))
+        # Minimo su più esecuzioni per ridurre il rumore
+        import_ms = min(_import_time_us("sigma_nex.cli") for _ in range(5)) / 1000
+        print(f"\n[BENCH] import sigma_nex.cli: {import_ms:.1f}ms (budget {budget_ms:.0f}ms)")
+        check_baseline("cli_import_ms", import_ms)
+        assert import_ms < budget_ms
+
+    def test_logout_command_budget(self, check_baseline):
+        budget_ms = float(os.environ.get("SIGMA_CLI_COMMAND_BUDGET_MS", "1000"))
+        env = {k: v for k, v in os.environ.items() if k != "SIGMA_SESSION_TOKEN"}
+        code = "from sigma_nex.cli import main; main(['logout'])"
+
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=60)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert result.returncode == 0, result.stderr
+            assert "No active session" in result.stdout
+
+        command_ms = min(timings)
+        print(f"\n[BENCH] sigma logout: {command_ms:.0f}ms (budget {budget_ms:.0f}ms)")
+        check_baseline("cli_logout_ms", command_ms)
+        assert command_ms < budget_ms
@@ -0,0 +1,68 @@
+"""
+Benchmark del profilo CPU
+N processi (come N worker uvicorn) eseguono inferenza torch in parallelo:
+pool di thread di default (tutti i core per processo) contro profilo "auto"
+(core divisi tra i worker)
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+# Carico simile a un encoder piccolo: stack di Linear in inference_mode
+WORKLOAD = """
+import sys, torch
+threads = int(sys.argv[1])
+if threads > 0:
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+model = torch.nn.Sequential(*[torch.nn.Linear(384, 384) for _ in range(6)]).eval()
+batch = torch.randn(64, 384)
+with torch.inference_mode():
+    for _ in range(5):
+        model(batch)
+    for _ in range(int(sys.argv[2])):
+        model(batch)
+"""
+
+
+def _run_workers(workers, threads, iterations):
+    """Avvia ``workers`` processi in parallelo e restituisce il tempo totale."""
+    start = time.perf_counter()
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WORKLOAD, str(threads), str(iterations)], stderr=subprocess.PIPE)
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        _, err = proc.communicate(timeout=300)
+        assert proc.returncode == 0, err.decode(errors="replace")
+    return time.perf_counter() - start
+
+
+class TestCpuProfileOversubscription:
+    """Throughput con e senza profilo CPU al variare dei worker"""
+
+    @pytest.mark.parametrize("workers", [2, 4])
+    def test_auto_profile_vs_default_threads(self, check_baseline, monkeypatch, workers):
+        pytest.importorskip("torch")
+        from sigma_nex.utils import cpu_profile
+
+        monkeypatch.setenv("WEB_CONCURRENCY", str(workers))
+        profile_threads, _ = cpu_profile.resolve_threads("embedding")
+        iterations = int(os.environ.get("SIGMA_BENCH_CPU_ITERATIONS", "300"))
+
+        default_time = _run_workers(workers, 0, iterations)
+        profile_time = _run_workers(workers, profile_threads, iterations)
+
+        total = workers * iterations
+        print(
+            f"\n[BENCH] {workers} worker su {os.cpu_count()} core: "
+            f"default {total / default_time:.0f} batch/s, "
+            f"profilo ({profile_threads} thread) {total / profile_time:.0f} batch/s"
+        )
+        check_baseline(f"cpu_profile_speedup_w{workers}", default_time / profile_time, higher_is_better=True)
@@ -0,0 +1,48 @@
+"""
+Benchmark dei backend di embedding
+Latenza di encode di una domanda con sentence-transformers (torch) e con il
+modello esportato in ONNX int8, e similarità coseno tra i due
+
+Richiede torch, transformers, sentence-transformers, onnxruntime, tokenizers
+e il modello locale in sigma_nex/core/models/paraphrase-MiniLM-L6-v2.
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from sigma_nex.core import embeddings, retriever
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    for module in ("torch", "transformers", "sentence_transformers", "onnxruntime", "tokenizers"):
+        pytest.importorskip(module)
+    if not os.path.isdir(retriever.MODEL_PATH):
+        pytest.skip("modello locale di embedding assente")
+    output = str(tmp_path_factory.mktemp("onnx"))
+    with patch.dict(embeddings._settings, {"onnx_path": output}):
+        embeddings.export_onnx(retriever.MODEL_PATH, quantize=True)
+        yield output
+
+
+@pytest.mark.parametrize("quantized", [False, True])
+def test_onnx_query_encoding(exported, check_baseline, quantized):
+    """L'export ONNX riproduce gli embedding torch ed è più veloce per query"""
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(retriever.MODEL_PATH)
+    with patch.dict(embeddings._settings, {"onnx_path": exported}):
+        report = embeddings.verify_onnx(retriever.MODEL_PATH, reference=reference, quantized=quantized, repeat=20)
+
+    assert report["ok"], report
+    assert report["onnx_ms"] < report["torch_ms"]
+    print(
+        f"\n[bench] {os.path.basename(report['file'])}: {report['onnx_ms']:.2f} ms/query "
+        f"(torch {report['torch_ms']:.2f}), coseno min {report['min_cosine']:.4f}"
+    )
+    name = "int8" if quantized else "fp32"
+    check_baseline(f"embedding_onnx_{name}_query_ms", report["onnx_ms"], higher_is_better=False)
@@ -0,0 +1,57 @@
+"""
+Benchmark della mappatura id -> testo
+Avvio a freddo (apertura + una ricerca) dello store binario mappato in
+memoria rispetto al JSON legacy
+
+Variabili d'ambiente:
+    SIGMA_BENCH_MAPPING_SIZE   testi nella mappatura (default 100000)
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+from sigma_nex.core.mapping_store import MappingStore, write_mapping
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture(scope="module")
+def mapping_files(tmp_path_factory):
+    size = int(os.environ.get("SIGMA_BENCH_MAPPING_SIZE", "100000"))
+    texts = [f"modulo {i} :: passo {i % 17} del manuale, controlla l'attrezzatura e procedi" for i in range(size)]
+    root = tmp_path_factory.mktemp("mapping")
+    legacy, store = root / "moduli.mapping.json", root / "moduli.mapping.bin"
+    legacy.write_text(json.dumps(texts, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_mapping(str(store), texts)
+    return texts, str(legacy), str(store)
+
+
+def _cold_lookup(load, ids):
+    start = time.perf_counter()
+    texts = load()
+    found = [texts[i] for i in ids]
+    return time.perf_counter() - start, found
+
+
+def test_mapping_store_cold_start(mapping_files, check_baseline):
+    """Lo store non decodifica l'intera mappatura per restituire k testi"""
+    texts, legacy, store = mapping_files
+    ids = [0, len(texts) // 2, len(texts) - 1]
+
+    def load_json():
+        with open(legacy, encoding="utf-8") as f:
+            return json.load(f)
+
+    json_time, json_found = _cold_lookup(load_json, ids)
+    store_time, store_found = _cold_lookup(lambda: MappingStore(store), ids)
+
+    assert store_found == json_found == [texts[i] for i in ids]
+    assert store_time < json_time
+    print(
+        f"\n[bench] mapping {len(texts)} testi: JSON {json_time * 1000:.1f} ms, "
+        f"store {store_time * 1000:.3f} ms, file {os.path.getsize(store) / os.path.getsize(legacy):.0%} del JSON"
+    )
+    check_baseline("mapping_store_cold_start_ms", store_time * 1000, higher_is_better=False)
@@ -0,0 +1,174 @@
+"""
+Benchmark della pipeline di query SIGMA-NEX
+/ask sotto concorrenza, costo per fase del Runner, QPS di search_moduli e
+throughput di traduzione, contro un Ollama locale simulato
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sigma_nex.utils.metrics import StreamingStats
+
+pytestmark = pytest.mark.benchmark
+
+QUESTIONS = [
+    "Come posso filtrare l'acqua piovana?",
+    "Come si costruisce un rifugio d'emergenza?",
+    "Come accendo un fuoco senza fiammiferi?",
+    "Come si medica una ferita profonda?",
+    "Quali piante selvatiche sono commestibili?",
+]
+
+
+def _server_for(fake, **overrides):
+    from sigma_nex.server import SigmaServer
+
+    with patch("sigma_nex.server.get_config") as mock_get_config:
+        mock_config = Mock()
+        mock_config.config = {
+            "auth_enabled": True,
+            "api_keys": ["bench_key"],
+            "model_name": "mistral",
+            "ollama_urls": [fake.url],
+            "debug": False,
+        }
+        mock_config.config.update(overrides)
+        mock_config.get.side_effect = lambda key, default=None: mock_config.config.get(key, default)
+        mock_config.get_path.return_value = Path("/tmp/logs")
+        mock_get_config.return_value = mock_config
+        return SigmaServer()
+
+
+async def _load_test(app, total, concurrency):
+    """Invia ``total`` domande distinte con ``concurrency`` client paralleli."""
+    import httpx
+
+    latencies = StreamingStats()
+    statuses = {}
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def worker():
+            for i in counter:
+                question = f"{QUESTIONS[i % len(QUESTIONS)]} (#{i})"  # niente coalescing
+                start = time.perf_counter()
+                response = await client.post(
+                    "/ask", json={"question": question}, headers={"Authorization": "Bearer bench_key"}
+                )
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, statuses, total / elapsed
+
+
+class TestAskThroughput:
+    """Throughput e latenza di /ask sotto concorrenza"""
+
+    @pytest.mark.parametrize("concurrency", [1, 8])
+    def test_ask_under_concurrency(self, fake_ollama, check_baseline, concurrency):
+        pytest.importorskip("httpx")
+        server = _server_for(fake_ollama, ollama_max_concurrent=4, ollama_max_queue=64)
+        total = 40
+
+        with patch("sigma_nex.core.retriever.search_moduli", return_value=[]):
+            latencies, statuses, qps = asyncio.run(_load_test(server.app, total, concurrency))
+
+        assert statuses == {200: total}
+        assert fake_ollama.requests >= total  # + chiamate al modello medico
+        summary = latencies.summary()
+        print(
+            f"\n[BENCH] /ask c={concurrency}: {qps:.1f} req/s, "
+            f"p50={summary['p50'] * 1000:.1f}ms p95={summary['p95'] * 1000:.1f}ms p99={summary['p99'] * 1000:.1f}ms"
+        )
+        check_baseline(f"ask_qps_c{concurrency}", qps, higher_is_better=True)
+        check_baseline(f"ask_p95_c{concurrency}", summary["p95"])
+
+
+class TestRunnerStages:
+    """Costo per fase di Runner.process_query"""
+
+    def test_process_query_stage_cost(self, fake_ollama, bench, check_baseline):
+        from sigma_nex.core.runner import Runner
+
+        fake_ollama.latency = 0.005
+        runner = Runner({"model_name": "mistral", "ollama_urls": [fake_ollama.url], "retrieval_enabled": False})
+        questions = iter(range(10_000))
+
+        def query():
+            result = runner.process_query(f"{QUESTIONS[next(questions) % len(QUESTIONS)]}")
+            assert "response" in result, result
+
+        bench.pedantic(query, rounds=30, warmup_rounds=2)
+
+        stages = runner.get_performance_stats()["stages"]
+        for name, stage in stages.items():
+            print(f"\n[BENCH] runner stage {name}: p50={stage['p50'] * 1000:.2f}ms p95={stage['p95'] * 1000:.2f}ms")
+        overhead = bench.median - stages["llm"]["p50"]
+        check_baseline("runner_process_query_p50", bench.median)
+        check_baseline("runner_overhead_p50", max(overhead, 0.0))
+
+
+class _RandomEncoder:
+    """Encoder deterministico al posto di MiniLM (dimensione 384)"""
+
+    def __init__(self, dim=384):
+        import numpy as np
+
+        self._rng = np.random.default_rng(0)
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy=True):
+        return self._rng.standard_normal((len(texts), self.dim)).astype("float32")
+
+
+class TestRetrieverQPS:
+    """QPS di search_moduli al crescere dell'indice"""
+
+    @pytest.mark.parametrize("size", [1_000, 10_000, pytest.param(50_000, marks=pytest.mark.slow)])
+    def test_search_moduli_qps(self, bench, check_baseline, size):
+        np = pytest.importorskip("numpy")
+        faiss = pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        encoder = _RandomEncoder()
+        index = faiss.IndexFlatL2(encoder.dim)
+        index.add(np.random.default_rng(1).standard_normal((size, encoder.dim)).astype("float32"))
+        texts = [f"modulo_{i} :: descrizione operativa {i}" for i in range(size)]
+
+        with (
+            patch.object(retriever, "_default", retriever.Retriever(refresh_interval=float("inf"))),
+            patch.object(retriever, "model", encoder),
+        ):
+            retriever.get_retriever().replace(index, texts)
+            results = bench.pedantic(retriever.search_moduli, args=("come filtro l'acqua",), rounds=50, warmup_rounds=3)
+
+        assert len(results) == 3
+        qps = 1.0 / bench.median
+        print(f"\n[BENCH] search_moduli n={size}: {qps:.0f} QPS")
+        check_baseline(f"search_moduli_qps_{size}", qps, higher_is_better=True)
+
+
+class TestTranslationThroughput:
+    """Throughput dei modelli Marian (solo se installati)"""
+
+    def test_translate_it_en_throughput(self, bench, check_baseline):
+        pytest.importorskip("transformers")
+        from sigma_nex.core.translate import _load_model, translate_it_to_en
+
+        if _load_model("it-en") is None:
+            pytest.skip("Modelli di traduzione non disponibili")
+
+        text = " ".join(QUESTIONS)
+        bench.pedantic(translate_it_to_en, args=(text,), rounds=10, warmup_rounds=1)
+        chars_per_second = len(text) / bench.median
+        print(f"\n[BENCH] translate it->en: {chars_per_second:.0f} chars/s")
+        check_baseline("translate_it_en_chars_per_s", chars_per_second, higher_is_better=True)
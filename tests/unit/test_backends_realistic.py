@@ -0,0 +1,128 @@
+"""
+Test realistici per sigma_nex.core.backends - pool di backend Ollama
+Routing, failover e health check senza istanze Ollama reali
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from sigma_nex.core.backends import DEFAULT_OLLAMA_URL, OllamaBackendPool
+from sigma_nex.core.runner import Runner
+
+NODES = ["http://node-a:11434", "http://node-b:11434", "http://node-c:11434"]
+
+
+def _ok_response(text="ok"):
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {"response": text}
+    return response
+
+
+class TestBackendPoolRealistic:
+    """Test della logica di routing del pool"""
+
+    def test_default_single_backend(self):
+        pool = OllamaBackendPool.from_config({})
+        assert [b.url for b in pool.backends] == [DEFAULT_OLLAMA_URL]
+        assert pool.backends[0].generate_url == f"{DEFAULT_OLLAMA_URL}/api/generate"
+
+    def test_from_config_list_and_single_url(self):
+        pool = OllamaBackendPool.from_config({"ollama_urls": NODES + [NODES[0]]})
+        assert [b.url for b in pool.backends] == NODES  # duplicati rimossi
+
+        single = OllamaBackendPool.from_config({"ollama_url": "http://gpu-box:11434/"})
+        assert [b.url for b in single.backends] == ["http://gpu-box:11434"]
+
+    def test_least_outstanding_routing(self):
+        pool = OllamaBackendPool(NODES)
+        a, b, c = pool.backends
+        a.outstanding, b.outstanding, c.outstanding = 3, 1, 2
+
+        assert [x.url for x in pool.candidates("mistral")] == [b.url, c.url, a.url]
+
+        with pool.track(b), pool.track(b):
+            assert pool.candidates("mistral")[0] is c
+        assert b.outstanding == 1
+
+    def test_model_aware_routing_prefers_loaded_model(self):
+        pool = OllamaBackendPool(NODES)
+        a, b, c = pool.backends
+        pool.update_health(c, True, loaded=["medllama2:latest"], available=["medllama2:latest", "mistral:latest"])
+        pool.update_health(b, True, loaded=[], available=["medllama2:latest"])
+        c.outstanding = 5
+
+        assert pool.candidates("medllama2")[0] is c
+        assert pool.candidates("medllama2")[1] is b
+        # Per un modello non caricato conta solo il carico
+        assert pool.candidates("mistral")[0] in (a, c)
+        assert pool.candidates("mistral")[-1] is b
+
+    def test_unhealthy_backends_go_last(self):
+        pool = OllamaBackendPool(NODES)
+        a, b, c = pool.backends
+        pool.mark_failure(a)
+
+        assert pool.candidates("mistral")[-1] is a
+        pool.mark_success(a, "mistral")
+        assert a.healthy and a.failures == 0
+        assert pool.candidates("mistral")[0] is a  # modello ora caricato
+
+
+class TestRunnerFailover:
+    """Il Runner deve passare al backend successivo in caso di errore"""
+
+    def test_call_model_fails_over_to_next_backend(self):
+        runner = Runner({"model_name": "mistral", "ollama_urls": NODES[:2]})
+
+        def fake_post(url, json, timeout):
+            if url.startswith(NODES[0]):
+                raise requests.exceptions.ConnectionError("node-a down")
+            return _ok_response("da node-b")
+
+        with patch("sigma_nex.core.runner.requests.post", side_effect=fake_post) as mock_post:
+            assert runner._call_model("prompt") == "da node-b"
+
+        assert mock_post.call_count == 2
+        a, b = runner.backends.backends
+        assert not a.healthy
+        assert "mistral" in b.loaded_models
+
+    def test_call_model_all_backends_down(self):
+        runner = Runner({"model_name": "mistral", "ollama_urls": NODES[:2]})
+
+        with patch("sigma_nex.core.runner.requests.post", side_effect=requests.exceptions.ConnectionError("down")):
+            with pytest.raises(RuntimeError, match="down"):
+                runner._call_model("prompt")
+
+
+class TestServerFailover:
+    """Il server deve distribuire e fare failover tra i backend"""
+
+    def test_server_fails_over_between_backends(self):
+        import asyncio
+        from pathlib import Path
+        from unittest.mock import AsyncMock
+
+        from sigma_nex.server import SigmaServer
+
+        with patch("sigma_nex.server.get_config") as mock_get_config:
+            mock_config = Mock()
+            mock_config.config = {"api_keys": ["test_key"], "model_name": "mistral", "ollama_urls": NODES[:2]}
+            mock_config.get.side_effect = lambda key, default=None: mock_config.config.get(key, default)
+            mock_config.get_path.return_value = Path("/tmp/logs")
+            mock_get_config.return_value = mock_config
+            server = SigmaServer()
+        unavailable = Mock(status_code=503)
+
+        with patch.object(
+            server, "_post_generate", new=AsyncMock(side_effect=[unavailable, _ok_response("risposta")])
+        ) as mock_post:
+            result = asyncio.run(server._call_ollama({"model": "mistral", "prompt": "p", "stream": False}))
+
+        assert result == "risposta"
+        urls = [call.args[0] for call in mock_post.await_args_list]
+        assert urls == [f"{NODES[0]}/api/generate", f"{NODES[1]}/api/generate"]
+        assert not server.backends.backends[0].healthy
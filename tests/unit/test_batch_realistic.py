@@ -0,0 +1,243 @@
+"""
+Test realistici per sigma_nex.core.batch - elaborazione batch offline
+Ollama, traduzione e retrieval sono simulati; checkpoint e ripresa sono reali
+"""
+
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from sigma_nex.cli import main
+from sigma_nex.core.batch import BatchProcessor, iter_questions, load_checkpoint
+from sigma_nex.core.runner import Runner
+
+
+def _runner(**overrides):
+    config = {"model_name": "mistral", "system_prompt": "sys", "retrieval_enabled": False}
+    config.update(overrides)
+    return Runner(config)
+
+
+def _write_questions(path, questions):
+    path.write_text(
+        "".join(json.dumps({"id": f"q{i}", "question": q}) + "\n" for i, q in enumerate(questions)), encoding="utf-8"
+    )
+
+
+def _read_output(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class _FakeTokenizer:
+    def __call__(self, texts, return_tensors=None, padding=False):
+        if isinstance(texts, str):
+            return {"input_ids": texts.split()}
+        return {"texts": list(texts)}
+
+    def batch_decode(self, gen, skip_special_tokens=True):
+        return gen
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, texts):
+        self.calls += 1
+        return [f"<{t}>" for t in texts]
+
+
+class TestBatchInputAndCheckpoint:
+    """Lettura degli input e checkpoint"""
+
+    def test_iter_questions_ids(self, tmp_path):
+        jsonl = tmp_path / "in.jsonl"
+        jsonl.write_text('{"id": 7, "question": "a?"}\n\n{"domanda": "b?"}\nnon json\n{"x": 1}\n', encoding="utf-8")
+        assert list(iter_questions(str(jsonl))) == [("7", "a?"), ("3", "b?")]
+
+        txt = tmp_path / "in.txt"
+        txt.write_text("prima\n\nseconda\n", encoding="utf-8")
+        assert list(iter_questions(str(txt))) == [("1", "prima"), ("3", "seconda")]
+
+    def test_checkpoint_truncates_partial_line(self, tmp_path):
+        out = tmp_path / "out.jsonl"
+        out.write_text(
+            '{"id": "q0", "answer": "x"}\n{"id": "q1", "error": "boom"}\n{"id": "q2", "ans', encoding="utf-8"
+        )
+
+        assert load_checkpoint(str(out)) == {"q0"}
+        # Riga parziale troncata, record di errore rimosso (la domanda verrà ritentata)
+        assert out.read_text(encoding="utf-8") == '{"id": "q0", "answer": "x"}\n'
+
+
+class TestBatchProcessor:
+    """Pipeline batch con Ollama simulato"""
+
+    def test_answers_in_input_order(self, tmp_path):
+        inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        _write_questions(inp, [f"domanda {i}" for i in range(7)])
+        runner = _runner()
+
+        with patch.object(runner, "_call_model", side_effect=lambda prompt: "risposta: " + prompt.splitlines()[-2]):
+            counts = BatchProcessor(runner, batch_size=3, translate=False).run(str(inp), str(out))
+
+        assert counts == {"answered": 7, "failed": 0, "skipped": 0}
+        records = _read_output(out)
+        assert [r["id"] for r in records] == [f"q{i}" for i in range(7)]
+        assert records[4]["answer"] == "risposta: Utente: domanda 4"
+        assert runner.get_performance_stats()["stages"]["llm"]["count"] == 3  # un blocco ogni 3
+
+    def test_resume_after_interruption(self, tmp_path):
+        inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        _write_questions(inp, ["a", "b", "c", "d"])
+        out.write_text('{"id": "q0", "answer": "A"}\n{"id": "q1", "answer": "B"}\n{"id": "q2", "ans', encoding="utf-8")
+        runner = _runner()
+
+        with patch.object(runner, "_call_model", return_value="nuova") as mock_call:
+            counts = BatchProcessor(runner, translate=False).run(str(inp), str(out))
+
+        assert counts == {"answered": 2, "failed": 0, "skipped": 2}
+        assert mock_call.call_count == 2
+        assert [r["id"] for r in _read_output(out)] == ["q0", "q1", "q2", "q3"]
+
+    def test_failures_recorded_and_retried(self, tmp_path):
+        inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        _write_questions(inp, ["ok", "rotta"])
+        runner = _runner()
+
+        def flaky(prompt):
+            if "rotta" in prompt:
+                raise RuntimeError("Ollama HTTP 500")
+            return "bene"
+
+        with patch.object(runner, "_call_model", side_effect=flaky):
+            first = BatchProcessor(runner, translate=False).run(str(inp), str(out))
+        assert first == {"answered": 1, "failed": 1, "skipped": 0}
+        assert _read_output(out)[1]["error"] == "Ollama HTTP 500"
+
+        with patch.object(runner, "_call_model", return_value="ora va") as mock_call:
+            second = BatchProcessor(runner, translate=False).run(str(inp), str(out))
+        assert second == {"answered": 1, "failed": 0, "skipped": 1}
+        mock_call.assert_called_once()
+        # Un solo record per id: la risposta sostituisce l'errore
+        records = _read_output(out)
+        assert [r["id"] for r in records] == ["q0", "q1"]
+        assert records[1]["answer"] == "ora va" and "error" not in records[1]
+
+    def test_parallelism_bounded_by_ollama_capacity(self, tmp_path):
+        inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        _write_questions(inp, [f"q{i}" for i in range(12)])
+        runner = _runner(ollama_max_concurrent=2)
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow(prompt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "r"
+
+        processor = BatchProcessor(runner, parallelism=10, batch_size=12, translate=False)
+        assert processor.parallelism == 2
+        with patch.object(runner, "_call_model", side_effect=slow):
+            processor.run(str(inp), str(out))
+        assert peak[0] == 2
+
+    def test_capacity_is_total_across_backends(self):
+        """ollama_max_concurrent è il totale, non moltiplicato per il numero di backend"""
+        runner = _runner(ollama_max_concurrent=3, ollama_urls=["http://node-a:11434", "http://node-b:11434"])
+        assert len(runner.backends) == 2
+        assert BatchProcessor(runner).parallelism == 3
+
+    def test_translation_and_retrieval_are_batched(self, tmp_path):
+        inp, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        _write_questions(inp, ["uno", "due", "tre", "quattro"])
+        runner = _runner(retrieval_enabled=True)
+        model = _FakeModel()
+
+        with (
+            patch("sigma_nex.core.translate._load_model", return_value=(_FakeTokenizer(), model)),
+            patch(
+                "sigma_nex.core.retriever.search_moduli_batch",
+                side_effect=lambda qs, k: [["acqua :: filtra"]] * len(qs),
+            ) as mock_search,
+            patch.object(runner, "_call_model", side_effect=lambda prompt: "ANSWER"),
+        ):
+            BatchProcessor(runner, batch_size=4).run(str(inp), str(out))
+
+        mock_search.assert_called_once_with(["<uno>", "<due>", "<tre>", "<quattro>"], k=3)
+        assert model.calls == 2  # una traduzione IT->EN e una EN->IT per blocco
+        record = _read_output(out)[0]
+        assert record["answer"] == "<ANSWER>" and record["answer_en"] == "ANSWER"
+
+
+class TestBatchHelpers:
+    """translate_batch e search_moduli_batch"""
+
+    def test_translate_batch_splits_and_preserves_order(self):
+        from sigma_nex.core.translate import translate_batch
+
+        model = _FakeModel()
+        with patch("sigma_nex.core.translate._load_model", return_value=(_FakeTokenizer(), model)):
+            result = translate_batch(["a", "", "b", "c"], "it-en", batch_size=2)
+
+        assert result == ["<a>", "", "<b>", "<c>"]
+        assert model.calls == 2
+
+    def test_translate_batch_unavailable_returns_input(self):
+        from sigma_nex.core.translate import translate_batch
+
+        with patch("sigma_nex.core.translate._load_model", return_value=None):
+            assert translate_batch(["ciao"], "it-en") == ["ciao"]
+
+    def test_search_moduli_batch_single_search(self):
+        np = pytest.importorskip("numpy")
+        faiss = pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        class Encoder:
+            calls = 0
+
+            def encode(self, texts, convert_to_numpy=True):
+                Encoder.calls += 1
+                return np.array([[1.0, 0.0] if "acqua" in t else [0.0, 1.0] for t in texts], dtype=np.float32)
+
+        index = faiss.IndexFlatL2(2)
+        index.add(np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32))
+        with (
+            patch.object(retriever, "_default", retriever.Retriever(refresh_interval=float("inf"))),
+            patch.object(retriever, "model", Encoder()),
+        ):
+            retriever.get_retriever().replace(index, ["acqua :: filtra", "fuoco :: accendi"])
+            results = retriever.search_moduli_batch(["acqua sporca", "fuoco"], k=1)
+
+        assert results == [["acqua :: filtra"], ["fuoco :: accendi"]]
+        assert Encoder.calls == 1
+
+
+class TestBatchCommand:
+    """Comando CLI sigma batch"""
+
+    def test_batch_command(self, tmp_path):
+        inp, out = tmp_path / "in.txt", tmp_path / "out.jsonl"
+        inp.write_text("come filtro l'acqua?\n", encoding="utf-8")
+
+        with (
+            patch("sigma_nex.cli.get_config", return_value={"model_name": "mistral", "retrieval_enabled": False}),
+            patch("sigma_nex.core.runner.Runner._call_model", return_value="answer"),
+        ):
+            result = CliRunner().invoke(
+                main,
+                ["batch", "-i", str(inp), "-o", str(out), "--no-translate"],
+                env={"SIGMA_SESSION_TOKEN": "fake_token"},
+            )
+
+        assert result.exit_code == 0, result.output
+        assert "Completato: 1 risposte" in result.output
+        assert _read_output(out)[0]["answer"] == "answer"
@@ -709,3 +709,38 @@ class TestCLIRealWorldUsage:
         assert "Aggiorna SIGMA-NEX dal repository GitHub" in result.output
         assert "--check-only" in result.output
         assert "--force" in result.output
+
+
+class TestCliLazyImports:
+    """Le dipendenze pesanti del CLI devono essere importate solo quando servono"""
+
+    HEAVY = ("requests", "yaml", "asyncio", "sigma_nex.config", "sigma_nex.core.runner", "sigma_nex.data_loader")
+
+    def _loaded_after(self, code):
+        import subprocess
+        import sys
+
+        script = f"import sys\n{code}\nprint('LOADED=' + ','.join(m for m in {self.HEAVY!r} if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        loaded = result.stdout.strip().splitlines()[-1].split("=", 1)[1]
+        return [m for m in loaded.split(",") if m]
+
+    def test_import_does_not_load_heavy_modules(self):
+        assert self._loaded_after("import sigma_nex.cli") == []
+
+    def test_logout_does_not_load_heavy_modules(self):
+        code = "from sigma_nex.cli import main\nmain(['logout'], standalone_mode=False)"
+        assert self._loaded_after(code) == []
+
+    def test_lazy_attributes_resolve_and_patch(self):
+        import sigma_nex.cli as cli
+        from sigma_nex.core.runner import Runner
+
+        assert cli.Runner is Runner
+        with patch("sigma_nex.cli.Runner") as mock_runner:
+            assert cli._lazy("Runner") is mock_runner
+        assert cli._lazy("Runner") is Runner
+
+        with pytest.raises(AttributeError):
+            cli.not_a_dependency
@@ -661,3 +661,243 @@ class TestConfigErrorHandling:
 
         finally:
             os.unlink(temp_path)
+
+
+class TestConfigCachingRealistic:
+    """Test cache del project root e ricaricamento basato su mtime"""
+
+    def _write(self, path, data):
+        path.write_text(yaml.safe_dump(data), encoding="utf-8")
+
+    def test_project_root_resolved_once_per_cwd(self, tmp_path, monkeypatch):
+        """La ricerca del project root avviene una sola volta per cwd/ambiente"""
+        from sigma_nex import config as config_module
+
+        (tmp_path / "config.yaml").write_text("debug: true")
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("SIGMA_NEX_ROOT", raising=False)
+        config_module.clear_root_cache()
+
+        with patch.object(config_module, "_resolve_project_root", wraps=config_module._resolve_project_root) as resolve:
+            assert SigmaConfig().project_root == tmp_path
+            assert SigmaConfig().project_root == tmp_path
+            assert resolve.call_count == 1
+
+            # Un cambio di SIGMA_NEX_ROOT invalida la chiave di cache
+            other = tmp_path / "other"
+            other.mkdir()
+            (other / "config.yaml").write_text("debug: false")
+            monkeypatch.setenv("SIGMA_NEX_ROOT", str(other))
+            assert SigmaConfig().project_root == other
+            assert resolve.call_count == 2
+
+    def test_cached_root_revalidated_when_config_removed(self, tmp_path, monkeypatch):
+        """Una root in cache senza più config.yaml viene ricalcolata"""
+        from sigma_nex import config as config_module
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("debug: true")
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("SIGMA_NEX_ROOT", raising=False)
+        config_module.clear_root_cache()
+
+        assert SigmaConfig().project_root == tmp_path
+        config_file.unlink()
+        assert SigmaConfig().project_root != tmp_path
+
+    def test_get_uses_module_defaults(self):
+        """I default sono una costante di modulo"""
+        from sigma_nex.config import DEFAULTS
+
+        config = SigmaConfig(config_path="nonexistent_config.yaml")
+        for key, value in DEFAULTS.items():
+            assert config.get(key) == value
+
+    def test_reload_on_file_change(self, tmp_path):
+        """Il file viene ricaricato quando cambiano mtime/dimensione"""
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"model_name": "llama2"})
+        config = SigmaConfig(config_path=str(config_file))
+        assert config.get("model_name") == "llama2"
+        generation = config.generation
+
+        self._write(config_file, {"model_name": "mistral-large"})
+        os.utime(config_file, ns=(0, 10**18))
+
+        # Entro l'intervallo di controllo il valore resta quello in memoria
+        assert config.get("model_name") == "llama2"
+        assert config.reload_if_changed(force=True)
+        assert config.get("model_name") == "mistral-large"
+        assert config.generation == generation + 1
+
+        # Nessuna modifica: nessun ricaricamento
+        assert not config.reload_if_changed(force=True)
+
+    def test_reload_after_check_interval(self, tmp_path, monkeypatch):
+        """Scaduto l'intervallo, l'accesso a config controlla il file"""
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"debug": False})
+        config = SigmaConfig(config_path=str(config_file))
+        assert config.get("debug") is False
+
+        self._write(config_file, {"debug": True, "extra": 1})
+        monkeypatch.setattr(config, "_next_check", 0.0)
+        assert config.get("debug") is True
+
+    def test_save_does_not_trigger_reload(self, tmp_path):
+        """Il salvataggio aggiorna la firma e non provoca ricaricamenti"""
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"debug": False})
+        config = SigmaConfig(config_path=str(config_file))
+        config.set("debug", True)
+        config.save()
+        generation = config.generation
+
+        assert not config.reload_if_changed(force=True)
+        assert config.generation == generation
+
+    def test_get_config_same_path_reuses_instance(self, tmp_path, monkeypatch):
+        """get_config con lo stesso percorso riusa l'istanza e ricarica se cambiato"""
+        from sigma_nex import config as config_module
+
+        monkeypatch.setattr(config_module, "_config_instance", None)
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"model_name": "a"})
+
+        first = get_config(str(config_file))
+        assert first.get("model_name") == "a"
+        assert get_config(str(config_file)) is first
+
+        self._write(config_file, {"model_name": "bb"})
+        os.utime(config_file, ns=(0, 10**18))
+        assert get_config(str(config_file)) is first
+        assert first.get("model_name") == "bb"
+
+        other_file = tmp_path / "other.yaml"
+        self._write(other_file, {"model_name": "c"})
+        assert get_config(str(other_file)) is not first
+
+
+class TestConfigHotReloadRealistic:
+    """Test ricaricamento a caldo: sottoscrittori, framework e ConfigWatcher"""
+
+    def _write(self, path, data):
+        path.write_text(yaml.safe_dump(data), encoding="utf-8")
+        # mtime sempre diverso anche su filesystem a bassa risoluzione
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_subscribers_receive_changed_keys(self, tmp_path):
+        """I sottoscrittori ricevono solo le chiavi modificate"""
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"model_name": "a", "rate_limit_requests": 60})
+        config = SigmaConfig(config_path=str(config_file))
+        assert config.get("model_name") == "a"
+
+        events = []
+        config.subscribe(events.append)
+        config.subscribe(events.append)  # duplicati ignorati
+
+        self._write(config_file, {"model_name": "b", "rate_limit_requests": 60, "api_keys": ["k"]})
+        assert config.reload_if_changed(force=True, notify=True)
+        assert events == [{"model_name", "api_keys"}]
+
+        config.unsubscribe(events.append)
+        self._write(config_file, {"model_name": "c"})
+        assert config.reload_if_changed(force=True, notify=True)
+        assert len(events) == 1
+
+    def test_lazy_reload_does_not_notify(self, tmp_path):
+        """Una lettura di config ricarica il file ma i sottoscrittori girano solo nel watcher"""
+        from sigma_nex.config import ConfigWatcher
+
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"model_name": "a"})
+        config = SigmaConfig(config_path=str(config_file))
+        assert config.get("model_name") == "a"
+        events = []
+        config.subscribe(events.append)
+
+        self._write(config_file, {"model_name": "b"})
+        config._next_check = 0.0  # intervallo di controllo scaduto
+        assert config.get("model_name") == "b"
+        assert events == []
+
+        # Il watcher consegna le chiavi cambiate anche se il file è già ricaricato
+        assert ConfigWatcher(config).check()
+        assert events == [{"model_name"}]
+        assert not ConfigWatcher(config).check()
+
+    def test_invalid_yaml_keeps_previous_config(self, tmp_path):
+        """Un file scritto a metà non sostituisce la configurazione attiva"""
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"model_name": "stable"})
+        config = SigmaConfig(config_path=str(config_file))
+        assert config.get("model_name") == "stable"
+        generation = config.generation
+
+        config_file.write_text("model_name: [unclosed", encoding="utf-8")
+        os.utime(config_file, ns=(0, 10**18))
+        with patch("builtins.print"):
+            assert not config.reload_if_changed(force=True)
+        assert config.get("model_name") == "stable"
+        assert config.generation == generation
+
+    def test_subscriber_errors_are_isolated(self, tmp_path):
+        """Un sottoscrittore che fallisce non blocca gli altri"""
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"debug": False})
+        config = SigmaConfig(config_path=str(config_file))
+        _ = config.config
+
+        events = []
+        config.subscribe(lambda changed: 1 / 0)
+        config.subscribe(events.append)
+        self._write(config_file, {"debug": True})
+        with patch("builtins.print"):
+            config.reload_if_changed(force=True, notify=True)
+        assert events == [{"debug"}]
+
+    def test_framework_change_notifies(self, tmp_path):
+        """La modifica del framework invalida la cache e notifica {"framework"}"""
+        config_file = tmp_path / "config.yaml"
+        framework_file = tmp_path / "framework.json"
+        self._write(config_file, {"framework_path": str(framework_file)})
+        framework_file.write_text(json.dumps({"modules": [{"nome": "a"}]}), encoding="utf-8")
+
+        config = SigmaConfig(config_path=str(config_file))
+        with patch.object(config, "get_path", return_value=framework_file):
+            assert config.framework["modules"] == [{"nome": "a"}]
+            events = []
+            config.subscribe(events.append)
+
+            assert not config.reload_framework_if_changed()  # prima osservazione
+            framework_file.write_text(json.dumps({"modules": [{"nome": "a"}, {"nome": "b"}]}), encoding="utf-8")
+            os.utime(framework_file, ns=(0, 10**18))
+
+            assert config.reload_framework_if_changed()
+            assert events == [{"framework"}]
+            assert len(config.framework["modules"]) == 2
+            assert not config.reload_framework_if_changed()
+
+    def test_config_watcher_thread(self, tmp_path):
+        """ConfigWatcher applica le modifiche dal thread di polling"""
+        import threading
+
+        from sigma_nex.config import ConfigWatcher
+
+        config_file = tmp_path / "config.yaml"
+        self._write(config_file, {"model_name": "a"})
+        config = SigmaConfig(config_path=str(config_file))
+
+        changed = threading.Event()
+        config.subscribe(lambda keys: changed.set())
+        watcher = ConfigWatcher(config, interval=0.05)
+        watcher.start()
+        try:
+            self._write(config_file, {"model_name": "b"})
+            assert changed.wait(5)
+            assert config.get("model_name") == "b"
+        finally:
+            watcher.stop()
+        assert watcher._thread is None
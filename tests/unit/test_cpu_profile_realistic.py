@@ -0,0 +1,135 @@
+"""
+Test realistici per sigma_nex.utils.cpu_profile
+Dimensionamento dei thread torch, inference_mode e torch.compile opzionale
+"""
+
+import sys
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sigma_nex.utils import cpu_profile
+
+
+@pytest.fixture(autouse=True)
+def restore_settings(monkeypatch):
+    saved = {k: (dict(v) if isinstance(v, dict) else v) for k, v in cpu_profile._settings.items()}
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    yield
+    cpu_profile._settings.clear()
+    cpu_profile._settings.update(saved)
+
+
+def _fake_torch():
+    return SimpleNamespace(
+        set_num_threads=Mock(),
+        set_num_interop_threads=Mock(),
+        inference_mode=Mock(return_value="inference"),
+        compile=Mock(side_effect=lambda fn: ("compiled", fn)),
+    )
+
+
+class TestResolveThreads:
+    """Calcolo dei thread per componente"""
+
+    def test_auto_splits_cores_between_workers(self, monkeypatch):
+        monkeypatch.setattr(cpu_profile.os, "cpu_count", lambda: 8)
+        monkeypatch.setenv("WEB_CONCURRENCY", "4")
+        assert cpu_profile.resolve_threads() == (2, 1)
+
+        monkeypatch.setenv("WEB_CONCURRENCY", "16")
+        assert cpu_profile.resolve_threads("embedding") == (1, 1)
+
+    def test_explicit_and_component_values(self):
+        cpu_profile.configure_cpu_profile(threads=3, interop_threads=2, components={"translation": 5})
+        assert cpu_profile.resolve_threads("embedding") == (3, 2)
+        assert cpu_profile.resolve_threads("translation") == (5, 2)
+
+    def test_configure_from_config(self, monkeypatch):
+        monkeypatch.setattr(cpu_profile.os, "cpu_count", lambda: 8)
+        cpu_profile.configure_from_config(
+            {"server_workers": 2, "cpu_embedding_threads": 1, "cpu_inference_mode": False, "cpu_torch_compile": True}
+        )
+        assert cpu_profile.resolve_threads("translation") == (4, 1)
+        assert cpu_profile.resolve_threads("embedding") == (1, 1)
+        assert cpu_profile._settings["inference_mode"] is False
+        assert cpu_profile._settings["compile"] is True
+
+    def test_configure_ignores_invalid_values(self):
+        before = dict(cpu_profile._settings)
+        cpu_profile.configure_from_config(Mock())
+        cpu_profile.configure_from_config(
+            {"cpu_threads": "molti", "cpu_interop_threads": -1, "cpu_inference_mode": "yes"}
+        )
+        assert cpu_profile._settings["interop_threads"] == before["interop_threads"]
+        assert cpu_profile._settings["inference_mode"] == before["inference_mode"]
+
+
+class TestTorchHooks:
+    """Applicazione del profilo a torch (modulo finto)"""
+
+    def test_apply_threads(self):
+        torch = _fake_torch()
+        torch.set_num_interop_threads.side_effect = RuntimeError("già avviato")
+        cpu_profile.configure_cpu_profile(threads=2)
+
+        with patch.object(cpu_profile, "_torch", return_value=torch):
+            assert cpu_profile.apply_threads("embedding") == (2, 1)
+        torch.set_num_threads.assert_called_once_with(2)
+
+    def test_apply_threads_without_torch(self):
+        with patch.object(cpu_profile, "_torch", return_value=None):
+            assert cpu_profile.apply_threads("translation") is None
+
+    def test_inference_context(self):
+        with patch.dict(sys.modules, {"torch": None}):
+            assert cpu_profile.inference_context() is cpu_profile._NOOP
+
+        torch = _fake_torch()
+        with patch.dict(sys.modules, {"torch": torch}):
+            assert cpu_profile.inference_context() == "inference"
+            cpu_profile.configure_cpu_profile(inference_mode=False)
+            assert cpu_profile.inference_context() is cpu_profile._NOOP
+
+    def test_maybe_compile_replaces_forward(self):
+        torch = _fake_torch()
+        model = SimpleNamespace(forward=lambda x: x)
+        original = model.forward
+
+        with patch.object(cpu_profile, "_torch", return_value=torch):
+            assert cpu_profile.maybe_compile(model) is model
+            assert model.forward is original  # disabilitato di default
+
+            cpu_profile.configure_cpu_profile(compile=True)
+            cpu_profile.maybe_compile(model)
+        assert model.forward == ("compiled", original)
+
+    def test_maybe_compile_falls_back_to_eager(self, capsys):
+        torch = _fake_torch()
+        torch.compile.side_effect = RuntimeError("backend mancante")
+        model = SimpleNamespace(forward=lambda x: x)
+        original = model.forward
+        cpu_profile.configure_cpu_profile(compile=True)
+
+        with patch.object(cpu_profile, "_torch", return_value=torch):
+            assert cpu_profile.maybe_compile(model).forward is original
+        assert "eager" in capsys.readouterr().out
+
+    def test_translation_load_applies_profile(self, monkeypatch):
+        from sigma_nex.core import translate
+
+        monkeypatch.setattr(translate, "_path_cache_enabled", False)
+
+        model_path = Mock()
+        model_path.exists.return_value = True
+        with (
+            patch.object(translate, "_check_transformers", return_value=True),
+            patch.object(translate, "_get_model_paths", return_value={"it-en": model_path}),
+            patch.object(translate, "MarianTokenizer"),
+            patch.object(translate, "MarianMTModel"),
+            patch.object(translate, "_models", {}),
+            patch.object(cpu_profile, "apply_threads") as apply_threads,
+        ):
+            assert translate._load_model("it-en") is not None
+        apply_threads.assert_called_once_with("translation")
@@ -0,0 +1,298 @@
+"""
+Test realistici per sigma_nex.core.embeddings
+Encoder ONNX (pooling, batch, int8, fork), scelta del backend in _get_model,
+modalità offline senza download e comando sigma export-onnx
+"""
+
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from sigma_nex.core import embeddings, retriever
+from sigma_nex.core.embeddings import (
+    METADATA_FILE,
+    ONNX_FILE,
+    QUANTIZED_FILE,
+    OnnxEncoder,
+    configure_embeddings,
+)
+
+
+class FakeTokenizer:
+    """Un token per parola (id = lunghezza della parola), padding a destra"""
+
+    def encode_batch(self, texts):
+        words = [t.split() for t in texts]
+        width = max(len(w) for w in words)
+        return [
+            SimpleNamespace(
+                ids=[len(x) for x in w] + [0] * (width - len(w)),
+                attention_mask=[1] * len(w) + [0] * (width - len(w)),
+            )
+            for w in words
+        ]
+
+
+class FakeSession:
+    """Stato nascosto del token = [id, 1]; i token di padding valgono [100, 100]"""
+
+    def __init__(self, inputs=("input_ids", "attention_mask", "token_type_ids")):
+        self.inputs = inputs
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=n) for n in self.inputs]
+
+    def run(self, outputs, feeds):
+        self.feeds.append(feeds)
+        ids, mask = feeds["input_ids"], feeds["attention_mask"]
+        hidden = np.stack([ids, np.ones_like(ids)], axis=-1).astype(np.float32)
+        hidden[mask == 0] = 100.0
+        return [hidden]
+
+
+@pytest.fixture
+def settings():
+    saved = dict(embeddings._settings)
+    yield embeddings._settings
+    embeddings._settings.clear()
+    embeddings._settings.update(saved)
+
+
+@pytest.fixture
+def onnx_model(tmp_path):
+    """Cartella onnx/ di un modello esportato, con sessione e tokenizer finti"""
+    directory = tmp_path / "modello" / "onnx"
+    directory.mkdir(parents=True)
+    (directory / ONNX_FILE).write_bytes(b"onnx")
+    (directory / METADATA_FILE).write_text(json.dumps({"max_length": 64}), encoding="utf-8")
+    sessions = []
+
+    def load_session(path, threads):
+        sessions.append((os.path.basename(path), threads))
+        return FakeSession()
+
+    with (
+        patch.object(embeddings, "_load_session", side_effect=load_session),
+        patch.object(embeddings, "_load_tokenizer", return_value=FakeTokenizer()) as tokenizer,
+    ):
+        yield SimpleNamespace(
+            model_path=str(tmp_path / "modello"), directory=directory, sessions=sessions, tokenizer=tokenizer
+        )
+
+
+class TestOnnxEncoder:
+    """Stessa interfaccia encode di SentenceTransformer"""
+
+    def test_mean_pooling_ignores_padding(self, onnx_model):
+        encoder = OnnxEncoder(str(onnx_model.directory))
+        vectors = encoder.encode(["ab abcd", "abc"], convert_to_numpy=True)
+        assert vectors.dtype == np.float32
+        np.testing.assert_allclose(vectors, [[3.0, 1.0], [3.0, 1.0]])
+        onnx_model.tokenizer.assert_called_once_with(str(onnx_model.directory / "tokenizer.json"), 64)
+
+    def test_single_text_batches_and_normalization(self, onnx_model):
+        encoder = OnnxEncoder(str(onnx_model.directory))
+        assert encoder.encode("abc").shape == (2,)
+        vectors = encoder.encode(["a", "ab", "abc"], batch_size=2, normalize_embeddings=True)
+        assert len(encoder._session.feeds) == 3  # 1 + 2 batch
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-6)
+        assert encoder.get_sentence_embedding_dimension() == 2
+
+    def test_token_type_ids_only_if_the_graph_wants_them(self, onnx_model):
+        encoder = OnnxEncoder(str(onnx_model.directory))
+        encoder.encode(["abc"])
+        assert "token_type_ids" in encoder._session.feeds[-1]
+        encoder._inputs = {"input_ids", "attention_mask"}
+        encoder.encode(["abc"])
+        assert "token_type_ids" not in encoder._session.feeds[-1]
+
+    def test_prefers_int8_model(self, onnx_model, settings):
+        (onnx_model.directory / QUANTIZED_FILE).write_bytes(b"int8")
+        assert OnnxEncoder(str(onnx_model.directory), threads=2).file == QUANTIZED_FILE
+        assert onnx_model.sessions[-1] == (QUANTIZED_FILE, 2)
+        settings["quantized"] = False
+        assert OnnxEncoder(str(onnx_model.directory)).file == ONNX_FILE
+
+    def test_missing_export(self, tmp_path):
+        with pytest.raises(FileNotFoundError, match="export-onnx"):
+            OnnxEncoder(str(tmp_path))
+
+    def test_forked_worker_opens_its_own_session(self, onnx_model):
+        encoder = OnnxEncoder(str(onnx_model.directory))
+        parent_session = encoder._session
+        encoder._pid = -1  # come dopo os.fork()
+        encoder.encode(["abc"])
+        assert encoder._session is not parent_session
+        assert len(onnx_model.sessions) == 2
+
+    def test_missing_onnxruntime_has_install_hint(self):
+        with patch("importlib.import_module", side_effect=ImportError("no")):
+            with pytest.raises(ImportError, match="pip install onnxruntime"):
+                embeddings._load_session("model.onnx", 1)
+
+
+class TestConfiguration:
+    """Impostazioni embedding_* e modalità offline"""
+
+    def test_configure_embeddings(self, settings):
+        configure_embeddings(
+            {
+                "embedding_backend": "onnx",
+                "embedding_quantized": False,
+                "embedding_offline": "no",
+                "embedding_onnx_path": "~/m",
+            }
+        )
+        assert settings["backend"] == "onnx"
+        assert settings["quantized"] is False
+        assert settings["offline"] is True  # valore non booleano ignorato
+        assert settings["onnx_path"] == os.path.expanduser("~/m")
+        assert embeddings.onnx_dir("/modello") == os.path.expanduser("~/m")
+        configure_embeddings({"embedding_backend": "gpu"})
+        assert settings["backend"] == "onnx"
+        configure_embeddings(Mock())
+        assert settings["backend"] == "onnx"
+
+    def test_enforce_offline_sets_hub_variables(self, settings, monkeypatch):
+        for name in embeddings.OFFLINE_ENV:
+            monkeypatch.delenv(name, raising=False)
+        settings["offline"] = False
+        embeddings.enforce_offline()
+        assert "HF_HUB_OFFLINE" not in os.environ
+        settings["offline"] = True
+        embeddings.enforce_offline()
+        assert all(os.environ[name] == "1" for name in embeddings.OFFLINE_ENV)
+
+
+class TestModelLoading:
+    """Scelta del backend in retriever._get_model"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_model(self, settings, monkeypatch):
+        monkeypatch.setattr(retriever, "_model", None)
+        for name in embeddings.OFFLINE_ENV:
+            monkeypatch.setenv(name, "0")
+
+    def test_auto_uses_onnx_export(self, onnx_model):
+        with (
+            patch.object(retriever, "MODEL_PATH", onnx_model.model_path),
+            patch.object(retriever, "SentenceTransformer") as st,
+        ):
+            model = retriever._get_model()
+        assert isinstance(model, OnnxEncoder)
+        st.assert_not_called()
+
+    def test_auto_falls_back_to_torch(self, tmp_path):
+        with (
+            patch.object(retriever, "MODEL_PATH", str(tmp_path)),
+            patch.object(retriever, "SentenceTransformer") as st,
+        ):
+            assert retriever._get_model() is st.return_value
+        st.assert_called_once_with(str(tmp_path))
+
+    def test_torch_backend_skips_onnx(self, onnx_model, settings):
+        settings["backend"] = "torch"
+        with (
+            patch.object(retriever, "MODEL_PATH", onnx_model.model_path),
+            patch.object(retriever, "SentenceTransformer") as st,
+        ):
+            assert retriever._get_model() is st.return_value
+        assert onnx_model.sessions == []
+
+    def test_offline_never_downloads(self, tmp_path, capsys):
+        with (
+            patch.object(retriever, "MODEL_PATH", str(tmp_path)),
+            patch.object(retriever, "SentenceTransformer", side_effect=OSError("modello assente")) as st,
+        ):
+            model = retriever._get_model()
+        assert isinstance(model, retriever._StubEncoder)
+        st.assert_called_once_with(str(tmp_path))  # nessun tentativo con "all-MiniLM-L6-v2"
+        assert os.environ["HF_HUB_OFFLINE"] == "1"
+        assert "offline mode" in capsys.readouterr().out
+
+    def test_download_only_when_allowed(self, tmp_path, settings):
+        settings["offline"] = False
+        downloaded = Mock()
+        with (
+            patch.object(retriever, "MODEL_PATH", str(tmp_path)),
+            patch.object(retriever, "SentenceTransformer", side_effect=[OSError("assente"), downloaded]) as st,
+        ):
+            assert retriever._get_model() is downloaded
+        assert st.call_args.args == ("all-MiniLM-L6-v2",)
+        assert os.environ["HF_HUB_OFFLINE"] == "0"
+
+    def test_sentence_transformers_imported_lazily(self, monkeypatch):
+        monkeypatch.setattr(retriever, "SentenceTransformer", retriever._NOT_IMPORTED)
+        with patch.dict("sys.modules", {"sentence_transformers": None}):
+            assert retriever._sentence_transformer() is None
+        assert retriever.SentenceTransformer is None
+
+
+class TestVerify:
+    """Confronto dell'export ONNX con il modello torch"""
+
+    def test_matching_reference_passes(self, onnx_model):
+        reference = Mock()
+        reference.encode.side_effect = lambda texts, **kw: OnnxEncoder(str(onnx_model.directory)).encode(texts)
+        report = embeddings.verify_onnx(onnx_model.model_path, reference=reference, texts=["ab", "abc d"], repeat=1)
+        assert report["ok"] is True
+        assert report["dimension"] == 2
+        assert report["min_cosine"] == pytest.approx(1.0)
+        assert report["torch_ms"] is not None
+
+    def test_different_vectors_fail(self, onnx_model):
+        reference = Mock()
+        reference.encode.side_effect = lambda texts, **kw: np.tile([[-1.0, 1.0]], (len(texts), 1))
+        report = embeddings.verify_onnx(onnx_model.model_path, reference=reference, texts=["ab"], repeat=1)
+        assert report["ok"] is False
+        assert report["min_cosine"] < 0.98
+
+    def test_without_reference_checks_the_export_only(self, onnx_model):
+        report = embeddings.verify_onnx(onnx_model.model_path, texts=["ab"], repeat=1)
+        assert report["ok"] is True and report["min_cosine"] is None
+
+
+class TestExportCommand:
+    """Comando CLI sigma export-onnx"""
+
+    def _invoke(self, args, report, st=None):
+        from sigma_nex.cli import main
+
+        with (
+            patch("sigma_nex.cli.validate_cli_session", return_value=True),
+            patch("sigma_nex.cli.check_cli_permission", return_value=True),
+            patch("sigma_nex.cli.get_config", return_value={}),
+            patch.object(
+                embeddings, "export_onnx", return_value={"output_dir": "/m/onnx", "files": [ONNX_FILE]}
+            ) as export,
+            patch.object(embeddings, "verify_onnx", return_value=report) as verify,
+            patch.object(retriever, "SentenceTransformer", st),
+        ):
+            result = CliRunner().invoke(main, ["export-onnx", *args], env={"SIGMA_SESSION_TOKEN": "token"})
+        return result, export, verify
+
+    def test_export_and_verify(self, settings):
+        report = {
+            "ok": True, "file": "/m/onnx/model.int8.onnx", "dimension": 384, "onnx_ms": 2.0,
+            "torch_ms": 6.0, "min_cosine": 0.991, "mean_cosine": 0.995,
+        }  # fmt: skip
+        st = Mock()
+        result, export, verify = self._invoke(["--no-quantize"], report, st)
+        assert result.exit_code == 0, result.output
+        export.assert_called_once_with(retriever.MODEL_PATH, quantize=False)
+        assert verify.call_args.kwargs["reference"] is st.return_value
+        assert "min 0.9910" in result.output and "Verifica superata" in result.output
+
+    def test_check_only_without_torch(self, settings):
+        report = {"ok": False, "file": "m.onnx", "dimension": 8, "onnx_ms": 1.0, "torch_ms": None, "min_cosine": None}
+        result, export, verify = self._invoke(["--check-only"], report)
+        assert result.exit_code == 1
+        export.assert_not_called()
+        assert verify.call_args.kwargs["reference"] is None
+        assert "confronto con torch saltato" in result.output and "Verifica fallita" in result.output
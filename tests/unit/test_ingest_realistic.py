@@ -0,0 +1,220 @@
+"""
+Test realistici per sigma_nex.core.ingest
+Chunking di moduli e manuali, encode a blocchi e indice incrementale
+"""
+
+import json
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from click.testing import CliRunner
+
+from sigma_nex.core import ingest
+
+FRAMEWORK_PATH = Path(__file__).parents[2] / "data" / "Framework_SIGMA.json"
+
+
+@pytest.fixture(autouse=True)
+def restore_settings():
+    saved = dict(ingest._settings)
+    yield
+    ingest._settings.clear()
+    ingest._settings.update(saved)
+
+
+class _Encoder:
+    """Encoder deterministico che registra i testi e le chiamate"""
+
+    def __init__(self):
+        self.encoded = []
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True):
+        import numpy as np
+
+        self.calls += 1
+        self.encoded.extend(texts)
+        return np.array([[float(len(t)), float(sum(map(ord, t)) % 97), 1.0, 0.0] for t in texts], dtype="float32")
+
+
+class TestSplitText:
+    """Suddivisione in chunk sovrapposti"""
+
+    def test_chunks_respect_size_and_sentence_boundaries(self):
+        text = " ".join(f"Frase numero {i} sul riparo." for i in range(40))
+        chunks = ingest.split_text(text, size=120, overlap=40)
+
+        assert len(chunks) > 1
+        assert all(len(c) <= 120 for c in chunks)
+        assert all(c.endswith(".") for c in chunks)
+        # L'ultima frase di un chunk apre il successivo
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.startswith(previous.rsplit(". ", 1)[-1].rstrip("."))
+
+    def test_numbered_steps_are_units(self):
+        chunks = ingest.split_text(
+            "1. Accendi il fuoco 2. Fai bollire l'acqua 3. Lascia raffreddare", size=45, overlap=0
+        )
+        assert chunks == ["1. Accendi il fuoco 2. Fai bollire l'acqua", "3. Lascia raffreddare"]
+
+    def test_long_sentence_is_cut_at_words(self):
+        chunks = ingest.split_text("parola " * 100, size=50, overlap=0)
+        assert all(len(c) <= 50 for c in chunks)
+        assert " ".join(chunks).split() == ["parola"] * 100
+
+
+class TestModuleChunks:
+    """Chunk dei moduli di Framework_SIGMA.json"""
+
+    def test_real_module_includes_commands_and_fallback(self):
+        modulo = json.loads(FRAMEWORK_PATH.read_text(encoding="utf-8"))["modules"][0]
+        chunks = list(ingest.module_chunks(modulo))
+
+        assert chunks[0] == (modulo["nome"], f"{modulo['nome']} :: {modulo['descrizione']}")
+        assert all(source == modulo["nome"] for source, _ in chunks)
+        entries = " ".join(entry for _, entry in chunks)
+        assert modulo["comandi"][0] in entries
+        assert any(entry.startswith(f"{modulo['nome']} :: Fallback:") for _, entry in chunks)
+
+    def test_chunking_disabled_keeps_one_entry_per_module(self):
+        ingest.configure_ingest({"retrieval_chunking": False})
+        chunks = list(ingest.module_chunks({"nome": "fuoco", "descrizione": "accendere", "comandi": ["1. legna"]}))
+        assert chunks == [("fuoco", "fuoco :: accendere")]
+
+    def test_configure_ignores_invalid_values(self):
+        ingest.configure_ingest({"chunk_size": 200, "chunk_overlap": 500, "knowledge_paths": ["manuali"]})
+        ingest.configure_ingest(Mock())
+        ingest.configure_ingest({"chunk_size": "grande", "retrieval_chunking": "no"})
+
+        assert ingest._settings["chunk_size"] == 200
+        assert ingest._settings["overlap"] == 100  # limitato a metà chunk
+        assert ingest._settings["paths"] == ["manuali"]
+        assert ingest._settings["enabled"] is True
+
+
+class TestDocumentChunks:
+    """Manuali Markdown/testo letti in streaming"""
+
+    def test_markdown_sections_label_chunks(self, tmp_path):
+        manuale = tmp_path / "radio.md"
+        manuale.write_text(
+            "# Radio\nIntroduzione.\n\n## Antenne\nUn dipolo si taglia a mezza lunghezza d'onda.\n",
+            encoding="utf-8",
+        )
+        chunks = list(ingest.document_chunks(manuale))
+        assert chunks == [
+            ("radio > Radio", "radio > Radio :: Introduzione."),
+            ("radio > Radio > Antenne", "radio > Radio > Antenne :: Un dipolo si taglia a mezza lunghezza d'onda."),
+        ]
+
+    def test_long_section_streams_without_losing_text(self, tmp_path):
+        ingest.configure_ingest({"chunk_size": 100, "chunk_overlap": 0})
+        righe = [f"Riga {i} del manuale di sopravvivenza." for i in range(500)]
+        manuale = tmp_path / "lungo.txt"
+        manuale.write_text("\n".join(righe), encoding="utf-8")
+
+        chunks = [entry.split(" :: ", 1)[1] for _, entry in ingest.document_chunks(manuale)]
+        assert all(len(c) <= 100 for c in chunks)
+        assert " ".join(chunks) == " ".join(righe)
+
+    def test_directories_are_scanned_for_supported_files(self, tmp_path, capsys):
+        (tmp_path / "a.md").write_text("testo", encoding="utf-8")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "b.txt").write_text("testo", encoding="utf-8")
+        (tmp_path / "c.pdf").write_bytes(b"%PDF")
+
+        found = list(ingest.iter_document_paths([str(tmp_path), "mancante"], root=str(tmp_path)))
+        assert [p.name for p in found] == ["a.md", "b.txt"]
+        assert "non trovato" in capsys.readouterr().out
+
+
+class TestEncodeBatches:
+    """Encode a blocchi con memoria limitata"""
+
+    def test_batches_fill_one_matrix(self):
+        np = pytest.importorskip("numpy")
+        encoder = _Encoder()
+        texts = [f"testo {i}" for i in range(10)]
+
+        matrix = ingest.encode_batches(encoder, texts, batch_size=4)
+
+        assert encoder.calls == 3
+        assert matrix.dtype == np.float32
+        assert np.array_equal(matrix, _Encoder().encode(texts))
+
+    def test_single_batch_passes_through(self):
+        encoder = Mock()
+        ingest.encode_batches(encoder, ["a", "b"], batch_size=4)
+        encoder.encode.assert_called_once_with(["a", "b"], convert_to_numpy=True)
+
+
+class TestIncrementalIngestion:
+    """Indice FAISS di chunk aggiornato in modo incrementale"""
+
+    @pytest.fixture
+    def index_files(self, tmp_path):
+        pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        with (
+            patch.object(retriever, "INDEX_PATH", str(tmp_path / "moduli.index")),
+            patch.object(retriever, "MAPPING_PATH", str(tmp_path / "moduli.mapping.json")),
+            patch.object(retriever, "SOURCES_PATH", str(tmp_path / "moduli.sources.json")),
+            patch.object(retriever, "model", _Encoder()),
+            patch.object(retriever, "_default", retriever.Retriever()),
+        ):
+            yield retriever
+
+    def test_modules_and_manuals_indexed_with_sources(self, index_files, tmp_path):
+        retriever = index_files
+        manuale = tmp_path / "nodi.md"
+        manuale.write_text("# Nodi\nIl nodo bulino crea un'asola fissa.\n", encoding="utf-8")
+        ingest.configure_ingest({"knowledge_paths": [str(manuale)]})
+        moduli = json.loads(FRAMEWORK_PATH.read_text(encoding="utf-8"))["modules"][:2]
+
+        stats = retriever.update_index(moduli)
+
+        sources = retriever.get_chunk_sources()
+        assert stats["added"] == len(retriever.get_retriever().snapshot()[1]) == len(sources)
+        assert sources[0] == moduli[0]["nome"] and sources[-1] == "nodi > Nodi"
+        data = json.loads((tmp_path / retriever._read_manifest()["sources"]).read_text(encoding="utf-8"))
+        assert data["sources"] == [moduli[0]["nome"], moduli[1]["nome"], "nodi > Nodi"]
+
+    def test_changed_manual_reencodes_only_its_chunks(self, index_files, tmp_path):
+        retriever = index_files
+        manuale = tmp_path / "fuoco.txt"
+        manuale.write_text("Usa legna secca.\n", encoding="utf-8")
+        moduli = [{"nome": "fuoco", "descrizione": "accendere un fuoco", "comandi": ["1. Raccogli legna."]}]
+
+        retriever.update_index(moduli, extra_paths=[str(manuale)])
+        manuale.write_text("Usa legna secca e resina.\n", encoding="utf-8")
+        retriever.model.encoded.clear()
+        stats = retriever.update_index(moduli, extra_paths=[str(manuale)])
+
+        assert retriever.model.encoded == ["fuoco :: Usa legna secca e resina."]
+        assert stats == {"added": 1, "removed": 1, "reused": 2}
+
+
+class TestIngestCommand:
+    """Comando CLI sigma ingest"""
+
+    def test_ingest_command_reports_chunks(self):
+        from sigma_nex.cli import main
+
+        cfg = Mock()
+        cfg.framework = {"modules": [{"nome": "a", "descrizione": "b"}]}
+        with (
+            patch("sigma_nex.cli.validate_cli_session", return_value=True),
+            patch("sigma_nex.cli.check_cli_permission", return_value=True),
+            patch("sigma_nex.cli.get_config", return_value=cfg),
+            patch(
+                "sigma_nex.core.retriever.update_index", return_value={"added": 2, "reused": 1, "removed": 0}
+            ) as update,
+            patch("sigma_nex.core.retriever.get_chunk_sources", return_value=["a", "a", "b"]),
+        ):
+            result = CliRunner().invoke(main, ["ingest", "--full"], env={"SIGMA_SESSION_TOKEN": "token"})
+
+        assert result.exit_code == 0, result.output
+        assert "3 chunk da 2 sorgenti" in result.output
+        update.assert_called_once_with([{"nome": "a", "descrizione": "b"}], reuse=False, extra_paths=[])
@@ -0,0 +1,148 @@
+"""
+Test realistici per sigma_nex.core.lexical e la ricerca ibrida
+BM25 sui chunk, fusione RRF con la ricerca vettoriale, BM25 senza modello
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sigma_nex.core import lexical, retriever
+from sigma_nex.core.lexical import (
+    BM25Index,
+    configure_lexical,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+TEXTS = [
+    "medicina :: Disinfetta la ferita con povidone iodato o clorexidina diluita.",
+    "fuoco :: Raccogli esca secca e accendi il fuoco al riparo dal vento.",
+    "acqua :: Filtra l'acqua con un panno e falla bollire per un minuto.",
+    "medicina :: Immobilizza la frattura con una stecca e benda.",
+]
+
+
+@pytest.fixture
+def settings():
+    saved = dict(lexical._settings)
+    yield lexical._settings
+    lexical._settings.clear()
+    lexical._settings.update(saved)
+
+
+class TestTokenize:
+    """Normalizzazione dei termini italiani"""
+
+    def test_accents_case_and_stopwords(self):
+        assert tokenize("Perché la FERITA è già infetta?") == ["perch", "ferit", "gia", "infett"]
+
+    def test_plural_and_singular_match(self):
+        assert tokenize("ferite") == tokenize("ferita")
+        assert tokenize("dell'acqua") == ["dell", "acqu"]
+
+
+class TestBM25Index:
+    """Ranking lessicale e persistenza"""
+
+    def test_exact_term_ranks_first(self):
+        index = BM25Index.build(TEXTS)
+        assert index.search("clorexidina", k=3) == [0]
+        assert index.search("ferita infetta da disinfettare", k=3)[0] == 0
+        assert index.search("parola assente", k=3) == []
+
+    def test_rare_terms_weigh_more(self):
+        index = BM25Index.build(TEXTS)
+        # "medicina" compare in due testi, "stecca" in uno solo
+        assert index.search("medicina stecca", k=2) == [3, 0]
+
+    def test_k_limits_results(self):
+        index = BM25Index.build(TEXTS)
+        assert len(index.search("medicina fuoco acqua", k=2)) == 2
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / "moduli.bm25.npz")
+        BM25Index.build(TEXTS).save(path)
+        loaded = BM25Index.load(path)
+        assert len(loaded) == len(TEXTS)
+        assert loaded.search("povidone", k=3) == [0]
+
+    def test_empty_index(self):
+        assert BM25Index.build([]).search("acqua", k=3) == []
+
+
+class TestFusion:
+    """Reciprocal-rank fusion"""
+
+    def test_documents_in_both_rankings_win(self, settings):
+        assert reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=2)[0][0] == 3
+
+    def test_single_ranking_unchanged(self):
+        assert [i for i, _ in reciprocal_rank_fusion([[5, 1, 7], []], k=3)] == [5, 1, 7]
+
+    def test_configure_lexical(self, settings):
+        configure_lexical({"retrieval_hybrid": False, "bm25_k1": 1.5, "bm25_b": 3, "retrieval_rrf_k": "x"})
+        assert settings["enabled"] is False
+        assert settings["k1"] == 1.5
+        assert settings["b"] == 1.0  # limitato a 1
+        assert settings["rrf_k"] == 60
+        configure_lexical(Mock())  # valori Mock ignorati
+        assert settings["k1"] == 1.5
+
+
+class TestHybridSearch:
+    """search_moduli con l'indice BM25 accanto a FAISS"""
+
+    @pytest.fixture
+    def cached(self):
+        index = Mock()
+        # La ricerca vettoriale mette il testo sul fuoco in testa
+        index.search.return_value = ([[0.1, 0.2, 0.3, 0.4]], [[1, 2, 3, 0]])
+        with (
+            patch.object(retriever, "_default", retriever.Retriever(refresh_interval=float("inf"))),
+            patch.object(retriever, "faiss", Mock()),
+            patch.dict(retriever._relevance_settings, {"dynamic_k": False}),
+        ):
+            retriever.get_retriever().replace(index, TEXTS, BM25Index.build(TEXTS))
+            yield index
+
+    def test_fusion_promotes_exact_term(self, cached, settings):
+        encoder = Mock()
+        with patch.object(retriever, "model", encoder):
+            results = retriever.search_moduli("povidone", k=2)
+        assert results[0] == TEXTS[0]
+        # FAISS interrogato con più candidati di k per la fusione
+        assert cached.search.call_args.args[1] == settings["candidates"]
+
+    def test_stub_model_uses_bm25_only(self, cached):
+        with patch.object(retriever, "model", retriever._StubEncoder()):
+            results = retriever.search_moduli_batch(["clorexidina", "bollire acqua"], k=3)
+        assert results == [[TEXTS[0]], [TEXTS[2]]]
+        cached.search.assert_not_called()
+
+    def test_hybrid_disabled_is_vector_only(self, cached, settings):
+        settings["enabled"] = False
+        with patch.object(retriever, "model", Mock()):
+            assert retriever.search_moduli("povidone", k=2) == [TEXTS[1], TEXTS[2]]
+        assert cached.search.call_args.args[1] == 2
+
+    def test_stale_lexical_index_ignored(self, cached):
+        retriever.get_retriever().replace(cached, TEXTS, BM25Index.build(TEXTS[:2]))
+        with patch.object(retriever, "model", Mock()):
+            assert retriever.search_moduli("povidone", k=2) == [TEXTS[1], TEXTS[2]]
+
+    def test_build_writes_lexical_index(self, tmp_path):
+        pytest.importorskip("faiss")
+        moduli = [{"nome": "medicina", "descrizione": "Disinfetta con clorexidina"}]
+        with (
+            patch.object(retriever, "INDEX_PATH", str(tmp_path / "moduli.index")),
+            patch.object(retriever, "MAPPING_PATH", str(tmp_path / "moduli.mapping.json")),
+            patch.object(retriever, "SOURCES_PATH", str(tmp_path / "moduli.sources.json")),
+            patch.object(retriever, "model", retriever._StubEncoder()),
+            patch.object(retriever, "_default", retriever.Retriever()),
+        ):
+            retriever.update_index(moduli)
+            assert retriever.lexical_index_path() == str(tmp_path / "moduli.bm25.npz")
+            path = retriever.lexical_index_path(manifest=retriever._read_manifest())
+            assert len(BM25Index.load(path)) == 1
+            assert retriever.search_moduli("clorexidina") == ["medicina :: Disinfetta con clorexidina"]
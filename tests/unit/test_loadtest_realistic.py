@@ -0,0 +1,153 @@
+"""
+Test realistici per sigma_nex.loadtest - load test di /ask
+Usa httpx.MockTransport al posto di un server reale
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+httpx = pytest.importorskip("httpx")
+
+from sigma_nex.cli import main  # noqa: E402
+from sigma_nex.loadtest import (  # noqa: E402
+    LoadTestResult,
+    format_report,
+    load_corpus,
+    run_load_test,
+)
+
+
+def _transport(statuses, delay=0.0):
+    """Risponde ciclicamente con gli status indicati"""
+    calls = []
+
+    async def handler(request):
+        calls.append(json.loads(request.content))
+        if delay:
+            await asyncio.sleep(delay)
+        status = statuses[(len(calls) - 1) % len(statuses)]
+        if status == "timeout":
+            raise httpx.ReadTimeout("timeout", request=request)
+        return httpx.Response(status, json={"response": "ok"})
+
+    return httpx.MockTransport(handler), calls
+
+
+class TestLoadCorpus:
+    """Formati di corpus supportati"""
+
+    def test_jsonl_with_mixed_keys(self, tmp_path):
+        path = tmp_path / "corpus.jsonl"
+        path.write_text(
+            '{"question": "Come filtro l\'acqua?"}\n"Come accendo un fuoco?"\n\n{"title": "Rifugio", "body": "x"}\n{"id": 1}\n',
+            encoding="utf-8",
+        )
+        assert load_corpus(str(path)) == ["Come filtro l'acqua?", "Come accendo un fuoco?", "Rifugio"]
+
+    def test_json_faq_and_limit(self, tmp_path):
+        path = tmp_path / "faq.json"
+        path.write_text(
+            json.dumps({"faq": [{"domanda": "a?"}, {"domanda": "b?"}, {"domanda": "c?"}]}), encoding="utf-8"
+        )
+        assert load_corpus(str(path), limit=2) == ["a?", "b?"]
+
+    def test_empty_corpus_rejected(self, tmp_path):
+        path = tmp_path / "empty.json"
+        path.write_text("[]", encoding="utf-8")
+        with pytest.raises(ValueError):
+            load_corpus(str(path))
+
+
+class TestRunLoadTest:
+    """Esecuzione del load test e classificazione degli esiti"""
+
+    def test_error_breakdown(self):
+        transport, calls = _transport([200, 200, 401, 429, 503, 504, 500, "timeout"])
+        result = asyncio.run(
+            run_load_test("http://sigma", ["q1", "q2", "q3"], api_key="k", concurrency=4, total=16, transport=transport)
+        )
+
+        assert result.total == 16
+        assert result.outcomes == {
+            "ok": 4,
+            "http_401": 2,
+            "http_429": 2,
+            "http_503": 2,
+            "http_504": 2,
+            "http_500": 2,
+            "timeout": 2,
+        }
+        assert len(result.latencies) == 4
+        assert {c["question"] for c in calls} == {"q1", "q2", "q3"}
+
+        report = format_report(result)
+        assert "503: 2" in report and "timeout: 2" in report
+
+    def test_concurrency_bounds_throughput(self):
+        transport, _ = _transport([200], delay=0.05)
+        result = asyncio.run(run_load_test("http://sigma", ["q"], concurrency=5, total=20, transport=transport))
+
+        assert result.succeeded == 20
+        # 20 richieste da 50ms con 5 in parallelo: ~0.2s
+        assert 0.15 <= result.elapsed < 1.0
+        assert result.latencies.percentile(50) >= 0.05
+
+    def test_open_loop_rate(self):
+        transport, _ = _transport([200])
+        start = time.perf_counter()
+        result = asyncio.run(run_load_test("http://sigma", ["q"], rate=50, total=10, transport=transport))
+
+        assert result.succeeded == 10
+        # L'ultima richiesta parte a 9/50 = 0.18s
+        assert time.perf_counter() - start >= 0.17
+
+    def test_result_serialization(self):
+        result = LoadTestResult()
+        result.record("ok", 0.1)
+        result.record("http_503")
+        result.elapsed = 1.0
+        data = result.to_dict()
+        assert data["requests"] == 2 and data["succeeded"] == 1
+        assert data["throughput"] == 1.0
+
+
+class TestBenchCommand:
+    """Comando CLI sigma bench"""
+
+    def test_bench_reports_results(self, tmp_path):
+        corpus = tmp_path / "corpus.txt"
+        corpus.write_text("Come filtro l'acqua?\nCome accendo un fuoco?\n", encoding="utf-8")
+        result = LoadTestResult()
+        result.record("ok", 0.2)
+        result.record("http_429")
+        result.elapsed = 0.5
+
+        with patch("sigma_nex.loadtest.run_load_test") as mock_run:
+
+            async def fake_run(*args, **kwargs):
+                return result
+
+            mock_run.side_effect = fake_run
+            output = CliRunner().invoke(
+                main,
+                ["bench", "-c", str(corpus), "-n", "4", "--requests", "10", "--api-key", "k"],
+                env={"SIGMA_SESSION_TOKEN": "fake_token"},
+            )
+
+        assert output.exit_code == 0, output.output
+        assert "429: 1" in output.output
+        args, kwargs = mock_run.call_args
+        assert args[1] == ["Come filtro l'acqua?", "Come accendo un fuoco?"]
+        assert kwargs["concurrency"] == 4 and kwargs["total"] == 10 and kwargs["api_key"] == "k"
+
+    def test_bench_requires_admin(self, tmp_path):
+        corpus = tmp_path / "corpus.txt"
+        corpus.write_text("domanda\n", encoding="utf-8")
+        output = CliRunner().invoke(main, ["bench", "-c", str(corpus)], env={"SIGMA_SESSION_TOKEN": ""})
+        assert output.exit_code == 1
+        assert "Authentication required" in output.output
@@ -0,0 +1,115 @@
+"""
+Test realistici per sigma_nex.core.mapping_store
+Formato binario della mappatura id -> testo e migrazione dal JSON legacy
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from sigma_nex.core import retriever
+from sigma_nex.core.mapping_store import MAGIC, MappingStore, write_mapping
+
+TEXTS = ["acqua :: filtra e bolli", "fuoco :: accendi con pietra focaia", "", "nodo :: è già fatto ✓"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "moduli.mapping.bin")
+    assert write_mapping(path, TEXTS) == len(TEXTS)
+    mapping = MappingStore(path)
+    yield mapping
+    mapping.close()
+
+
+class TestMappingStore:
+    """Lettura dello store mappato in memoria"""
+
+    def test_behaves_like_the_list(self, store):
+        assert len(store) == len(TEXTS)
+        assert list(store) == TEXTS
+        assert store == TEXTS
+        assert [store[i] for i in range(len(TEXTS))] == TEXTS
+
+    def test_negative_index_and_slices(self, store):
+        assert store[-1] == TEXTS[-1]
+        assert store[1:3] == TEXTS[1:3]
+        assert store[::-2] == TEXTS[::-2]
+        with pytest.raises(IndexError):
+            store[len(TEXTS)]
+
+    def test_file_layout(self, tmp_path):
+        path = tmp_path / "m.bin"
+        write_mapping(str(path), ["ab", "c"])
+        data = path.read_bytes()
+        assert data.startswith(MAGIC)
+        # header 16 byte + 3 offset da 8 byte + "abc"
+        assert len(data) == 16 + 24 + 3 and data.endswith(b"abc")
+
+    def test_empty_mapping(self, tmp_path):
+        path = str(tmp_path / "vuoto.bin")
+        write_mapping(path, [])
+        assert len(MappingStore(path)) == 0
+
+    def test_rejects_other_formats(self, tmp_path):
+        path = tmp_path / "moduli.mapping.json"
+        path.write_text(json.dumps(TEXTS), encoding="utf-8")
+        with pytest.raises(ValueError):
+            MappingStore(str(path))
+
+    def test_replaced_file_keeps_open_mapping_valid(self, tmp_path, store):
+        # Come update_index: il nuovo file sostituisce quello mappato
+        tmp = str(tmp_path / "nuovo.tmp")
+        write_mapping(tmp, ["nuovo :: testo"])
+        os.replace(tmp, store.path)
+        assert store == TEXTS
+        assert MappingStore(store.path) == ["nuovo :: testo"]
+
+
+class TestRetrieverMapping:
+    """Il retriever scrive lo store binario e legge ancora il JSON legacy"""
+
+    def test_legacy_json_is_still_read(self, tmp_path):
+        legacy = tmp_path / "moduli.mapping.json"
+        legacy.write_text(json.dumps(TEXTS), encoding="utf-8")
+        with patch.object(retriever, "MAPPING_PATH", str(legacy)):
+            assert retriever._load_mapping() == TEXTS
+
+    def test_store_replaces_legacy_json(self, tmp_path):
+        legacy = tmp_path / "moduli.mapping.json"
+        legacy.write_text(json.dumps(["vecchio"]), encoding="utf-8")
+        with patch.object(retriever, "MAPPING_PATH", str(legacy)):
+            entry = retriever._write_mapping(TEXTS)
+            assert not legacy.exists()
+            assert retriever.mapping_store_path() == str(tmp_path / "moduli.mapping.bin")
+            assert retriever.mapping_store_path(manifest=entry) == str(tmp_path / entry["mapping"])
+            loaded = retriever._load_mapping(manifest=entry)
+            assert isinstance(loaded, MappingStore)
+            assert loaded == TEXTS
+
+    def test_rebuild_never_replaces_a_mapped_store(self, tmp_path):
+        """Ogni ricostruzione scrive un nuovo file: lo store mappato non viene sovrascritto (Windows)"""
+        with (
+            patch.object(retriever, "INDEX_PATH", str(tmp_path / "moduli.index")),
+            patch.object(retriever, "MAPPING_PATH", str(tmp_path / "moduli.mapping.json")),
+        ):
+            retriever._publish_manifest(retriever._write_mapping(TEXTS))
+            live = retriever._load_mapping(manifest=retriever._read_manifest())
+            first = live.path
+
+            retriever._publish_manifest(retriever._write_mapping(["nuovo"]))
+            second = retriever.mapping_store_path(manifest=retriever._read_manifest())
+            assert second != first and os.path.exists(first)  # generazione precedente conservata
+            assert retriever._load_mapping(manifest=retriever._read_manifest()) == ["nuovo"]
+            assert live == TEXTS
+
+            # Su Windows un file ancora mappato non si può rimuovere: riprovato al prossimo publish
+            with patch.object(retriever.os, "remove", side_effect=PermissionError("in uso")):
+                retriever._publish_manifest(retriever._write_mapping(["terzo"]))
+            assert os.path.exists(first)
+            live.close()
+            retriever._publish_manifest(retriever._write_mapping(["quarto"]))
+            assert not os.path.exists(first) and not os.path.exists(second)
+            assert len(list(tmp_path.glob("moduli.mapping.*.bin"))) == 2  # corrente e precedente
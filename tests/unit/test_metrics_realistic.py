@@ -0,0 +1,89 @@
+"""
+Test realistici per sigma_nex.utils.metrics - metriche in formato Prometheus
+"""
+
+from sigma_nex.utils.metrics import (
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    StreamingStats,
+    render_family,
+)
+
+
+class TestMetricsRealistic:
+    """Test del formato di esposizione e dell'aggregazione"""
+
+    def test_counter_with_labels(self):
+        counter = Counter("sigma_test_total", "Test counter", ["kind"])
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        counter.inc(kind="b")
+
+        text = counter.render()
+        assert "# TYPE sigma_test_total counter" in text
+        assert 'sigma_test_total{kind="a"} 3' in text
+        assert 'sigma_test_total{kind="b"} 1' in text
+        assert counter.value(kind="a") == 3
+
+    def test_histogram_cumulative_buckets(self):
+        hist = Histogram("sigma_latency_seconds", "Test", ["stage"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            hist.observe(value, stage="llm")
+
+        text = hist.render()
+        assert 'sigma_latency_seconds_bucket{stage="llm",le="0.1"} 1' in text
+        assert 'sigma_latency_seconds_bucket{stage="llm",le="1"} 3' in text
+        assert 'sigma_latency_seconds_bucket{stage="llm",le="+Inf"} 4' in text
+        assert 'sigma_latency_seconds_count{stage="llm"} 4' in text
+        assert 'sigma_latency_seconds_sum{stage="llm"} 4.25' in text
+
+    def test_histogram_timer(self):
+        hist = Histogram("sigma_timer_seconds", "Test", ["stage"])
+        with hist.time(stage="sanitize"):
+            pass
+        assert hist.count(stage="sanitize") == 1
+
+    def test_registry_get_or_create_and_render(self):
+        registry = MetricsRegistry()
+        first = registry.counter("sigma_x_total", "X")
+        assert registry.counter("sigma_x_total", "X") is first
+        first.inc()
+        assert "sigma_x_total 1" in registry.render()
+
+    def test_render_family_escapes_labels(self):
+        text = render_family("sigma_backend_healthy", "gauge", "Health", [({"backend": 'http://a"b'}, 1)])
+        assert 'sigma_backend_healthy{backend="http://a\\"b"} 1' in text
+
+
+class TestStreamingStatsRealistic:
+    """Test dello stimatore di percentili a memoria fissa"""
+
+    def test_empty(self):
+        stats = StreamingStats()
+        assert len(stats) == 0
+        assert stats.percentile(99) == 0.0
+        assert stats.summary()["max"] == 0.0
+
+    def test_percentiles_within_relative_error(self):
+        stats = StreamingStats(precision=0.01)
+        values = [i / 1000 for i in range(1, 10001)]  # 1ms..10s
+        stats.extend(values)
+
+        for q in (50, 95, 99):
+            exact = values[int(q / 100 * len(values)) - 1]
+            assert abs(stats.percentile(q) - exact) / exact <= 0.011
+        assert stats.min == 0.001 and stats.max == 10.0
+        assert stats.total == sum(values)
+
+    def test_zero_and_tiny_values(self):
+        stats = StreamingStats()
+        stats.extend([0.0, 0.0, 2.0])
+        assert stats.percentile(50) == 0.0
+        assert stats.percentile(100) == 2.0
+
+    def test_reset(self):
+        stats = StreamingStats()
+        stats.extend([1.0, 2.0])
+        stats.reset()
+        assert len(stats) == 0 and stats.min is None
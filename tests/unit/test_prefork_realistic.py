@@ -0,0 +1,142 @@
+"""
+Test realistici per sigma_nex.prefork
+Precaricamento dei modelli nel master e worker uvicorn creati con fork
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+from unittest.mock import patch
+
+import pytest
+
+from sigma_nex import prefork
+from sigma_nex.utils.metrics import process_memory
+
+pytestmark = pytest.mark.skipif(not prefork.fork_available(), reason="richiede os.fork")
+
+# App minima servita dal supervisor: il master "precarica" 64 MB che i worker leggono
+APP_SCRIPT = textwrap.dedent("""
+    import os, sys
+    from fastapi import FastAPI
+    from sigma_nex.prefork import PreforkSupervisor
+    from sigma_nex.utils.metrics import process_memory
+
+    app = FastAPI()
+    MODEL = {}
+
+    def preload():
+        MODEL["weights"] = b"x" * (64 * 1024 * 1024)
+        return ["weights"]
+
+    @app.get("/")
+    def info():
+        return {"pid": os.getpid(), "ppid": os.getppid(), "size": len(MODEL["weights"]), "memory": process_memory()}
+
+    PreforkSupervisor(app, port=int(sys.argv[1]), workers=2, preload=preload, log_level="warning").run()
+    """)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port, timeout=15.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return httpx.get(f"http://127.0.0.1:{port}/", timeout=2.0).json()
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+class TestPreloadModels:
+    """Caricamento dei modelli condivisi nel master"""
+
+    def test_loads_embedding_index_and_translation(self):
+        with (
+            patch("sigma_nex.core.retriever._get_model") as get_model,
+            patch("sigma_nex.core.retriever.Retriever.snapshot") as load_index,
+            patch("sigma_nex.core.translate.is_translation_available", return_value=True),
+            patch("sigma_nex.core.translate.preload_models") as preload_translation,
+        ):
+            loaded = prefork.preload_models({"retrieval_enabled": True})
+
+        assert loaded == ["embedding", "faiss_index", "translation"]
+        get_model.assert_called_once()
+        load_index.assert_called_once()
+        preload_translation.assert_called_once()
+
+    def test_skips_what_workers_do_not_use(self):
+        with (
+            patch("sigma_nex.core.retriever._get_model") as get_model,
+            patch("sigma_nex.core.translate.preload_models") as preload_translation,
+            patch("sigma_nex.core.translate.is_translation_available", return_value=False),
+        ):
+            loaded = prefork.preload_models({"retrieval_enabled": False})
+
+        assert loaded == []
+        get_model.assert_not_called()
+        preload_translation.assert_not_called()
+
+    def test_failures_are_not_fatal(self):
+        with (
+            patch("sigma_nex.core.retriever._get_model"),
+            patch("sigma_nex.core.retriever.Retriever.snapshot", side_effect=RuntimeError("indice mancante")),
+            patch("sigma_nex.core.translate.is_translation_available", return_value=False),
+        ):
+            assert prefork.preload_models({}) == ["embedding"]
+
+
+class TestProcessMemory:
+    """Lettura di /proc/<pid>/smaps_rollup"""
+
+    def test_own_process(self):
+        if not os.path.exists("/proc/self/smaps_rollup"):
+            pytest.skip("smaps_rollup non disponibile")
+        memory = process_memory()
+        assert memory["rss"] > 0
+        assert memory["shared"] + memory["private"] == pytest.approx(memory["rss"], rel=0.05)
+
+    def test_missing_process(self):
+        assert process_memory(2**22 + 12345) is None
+
+
+class TestPreforkSupervisor:
+    """Supervisor reale in un sottoprocesso"""
+
+    def test_workers_share_preloaded_memory_and_restart(self):
+        pytest.importorskip("httpx")
+        port = _free_port()
+        master = subprocess.Popen([sys.executable, "-c", APP_SCRIPT, str(port)])
+        try:
+            info = _get(port)
+            assert info["ppid"] == master.pid
+            assert info["size"] == 64 * 1024 * 1024
+            if info["memory"] is not None:
+                # I 64 MB del master restano condivisi nel worker
+                assert info["memory"]["shared"] > 48 * 1024 * 1024
+                assert info["memory"]["private"] < 48 * 1024 * 1024
+
+            # Un worker terminato viene sostituito
+            os.kill(info["pid"], signal.SIGKILL)
+            time.sleep(0.5)
+            for _ in range(5):
+                assert _get(port)["ppid"] == master.pid
+
+            master.send_signal(signal.SIGTERM)
+            assert master.wait(timeout=30) == 0
+        finally:
+            if master.poll() is None:
+                master.kill()
+                master.wait()
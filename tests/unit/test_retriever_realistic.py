@@ -5,10 +5,12 @@ Elimina dipendenze pesanti ma testa comportamento effettivo del retriever
 
 import json
 import os
+from contextlib import ExitStack
 from unittest.mock import Mock, patch
 
 import pytest
 
+from sigma_nex.core.mapping_store import MappingStore
 from sigma_nex.core.retriever import (
     DATA_PATH,
     INDEX_PATH,
@@ -137,10 +139,13 @@ class TestRetrieverRealistic:
         except Exception as e:
             assert "Impossibile caricare" in str(e) or isinstance(e, FileNotFoundError)
 
-    def test_faiss_operations_real(self):
+    def test_faiss_operations_real(self, tmp_path):
         """Test operazioni FAISS REALI con handling degli errori"""
-        # Test build_index con FAISS simulato realisticamente
+        from sigma_nex.core import retriever
+
+        # Test build_index con FAISS simulato realisticamente (file in tmp_path, non in data/)
         with (
+            _index_files_in(tmp_path),
             patch("sigma_nex.core.retriever.faiss") as mock_faiss,
             patch("sigma_nex.core.retriever.get_moduli") as mock_get_moduli,
             patch("sigma_nex.core.retriever._get_model") as mock_get_model,
@@ -171,7 +176,8 @@ class TestRetrieverRealistic:
             # Verifica operazioni FAISS chiamate correttamente
             mock_faiss.IndexFlatL2.assert_called_once_with(384)
             mock_index.add.assert_called_once_with(mock_embeddings)
-            mock_faiss.write_index.assert_called_once_with(mock_index, INDEX_PATH)
+            index_file = str(tmp_path / retriever._read_manifest()["index"])
+            mock_faiss.write_index.assert_called_once_with(mock_index, index_file)
 
             # Verifica che i testi siano formattati correttamente
             expected_texts = [
@@ -259,13 +265,13 @@ class TestRetrieverRealistic:
         assert hasattr(retriever.model, "encode")  # Dovrebbe avere modello
 
         # Test search method delegation
-        with patch("sigma_nex.core.retriever.search_moduli") as mock_search:
-            mock_search.return_value = ["result1", "result2"]
+        with patch.object(Retriever, "_search") as mock_search:
+            mock_search.return_value = [[{"text": "result1"}, {"text": "result2"}]]
 
             results = retriever.search("test query", k=5)
 
-            # Verifica che chiami search_moduli correttamente
-            mock_search.assert_called_once_with("test query", 5)
+            # Verifica che cerchi nel proprio indice con i parametri corretti
+            mock_search.assert_called_once_with(["test query"], 5, max_distance=None, dynamic=None, query_vectors=None)
             assert results == ["result1", "result2"]
 
     def test_ml_model_operations_real(self):
@@ -411,6 +417,27 @@ def mock_open_empty_mapping(*args, **kwargs):
                 pass  # Errori per edge cases sono accettabili
 
 
+def _serving(index, texts, lexical=None):
+    """Retriever che serve l'indice dato invece dei file"""
+    from sigma_nex.core import retriever
+
+    searcher = retriever.Retriever(refresh_interval=float("inf"))
+    searcher.replace(index, texts, lexical)
+    return searcher
+
+
+def _index_files_in(directory):
+    """Indice, mappature e manifest scritti in ``directory`` invece che in data/"""
+    stack = ExitStack()
+    for name, filename in (
+        ("INDEX_PATH", "moduli.index"),
+        ("MAPPING_PATH", "moduli.mapping.json"),
+        ("SOURCES_PATH", "moduli.sources.json"),
+    ):
+        stack.enter_context(patch(f"sigma_nex.core.retriever.{name}", str(directory / filename)))
+    return stack
+
+
 class TestRetrieverErrorHandling:
     """Test gestione errori del retriever"""
 
@@ -503,7 +530,7 @@ class TestRetrieverClassReal:
 class TestRetrieverIntegration:
     """Test integrazione del retriever"""
 
-    def test_retriever_end_to_end_real(self):
+    def test_retriever_end_to_end_real(self, tmp_path):
         """Test end-to-end del retriever - flusso completo reale"""
         # Test flusso completo: caricamento dati -> build index -> search
 
@@ -515,9 +542,10 @@ class TestRetrieverIntegration:
             print(f"Caricamento moduli fallito: {e}")
             moduli = []
 
-        # 2. Test build index (potrebbe fallire per dipendenze)
+        # 2. Test build index (potrebbe fallire per dipendenze), senza toccare i file di data/
         try:
-            build_index()
+            with _index_files_in(tmp_path):
+                build_index()
             print("Build index completato")
         except Exception as e:
             print(f"Build index fallito: {e}")
@@ -572,10 +600,10 @@ class TestRetrieverIntegration:
                 end_time = time.time()
                 assert (end_time - start_time) < 5.0  # Timeout ragionevole
 
-    def test_retriever_faiss_operations_coverage(self):
+    def test_retriever_faiss_operations_coverage(self, tmp_path):
         """Test operazioni FAISS per aumentare coverage"""
 
-        with patch("sigma_nex.core.retriever.faiss") as mock_faiss:
+        with _index_files_in(tmp_path), patch("sigma_nex.core.retriever.faiss") as mock_faiss:
             # Mock FAISS index
             mock_index = Mock()
             mock_index.ntotal = 10
@@ -661,3 +689,312 @@ class TestRetrieverIntegration:
                     except Exception as e:
                         # Error handling dovrebbe essere graceful
                         assert isinstance(e, Exception)
+
+
+class TestRetrieverIncrementalUpdate:
+    """Test aggiornamento incrementale dell'indice dopo modifica del framework"""
+
+    class _CountingEncoder:
+        def __init__(self):
+            self.encoded = []
+
+        def encode(self, texts, convert_to_numpy=True):
+            import numpy as np
+
+            self.encoded.extend(texts)
+            return np.array([[float(len(t)), float(sum(map(ord, t)) % 97), 1.0, 0.0] for t in texts], dtype="float32")
+
+    def test_update_index_reencodes_only_changed_modules(self, tmp_path):
+        """Solo i moduli nuovi passano dal modello, la cache viene sostituita"""
+        pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        encoder = self._CountingEncoder()
+        moduli = [{"nome": f"m{i}", "descrizione": f"descrizione {i}"} for i in range(3)]
+        index_path = str(tmp_path / "moduli.index")
+        mapping_path = str(tmp_path / "moduli.mapping.json")
+
+        with (
+            patch.object(retriever, "INDEX_PATH", index_path),
+            patch.object(retriever, "MAPPING_PATH", mapping_path),
+            patch.object(retriever, "SOURCES_PATH", str(tmp_path / "moduli.sources.json")),
+            patch.object(retriever, "model", encoder),
+            patch.object(retriever, "_default", retriever.Retriever()),
+        ):
+            first = retriever.update_index(moduli)
+            assert first == {"added": 3, "removed": 0, "reused": 0}
+
+            changed = moduli[:2] + [{"nome": "nuovo", "descrizione": "rifugio"}]
+            encoder.encoded.clear()
+            stats = retriever.update_index(changed)
+
+            assert stats == {"added": 1, "removed": 1, "reused": 2}
+            assert encoder.encoded == ["nuovo :: rifugio"]
+            index, texts, _ = retriever.get_retriever().snapshot()
+            assert texts[-1] == "nuovo :: rifugio"
+            assert index.ntotal == 3
+            assert MappingStore(retriever.mapping_store_path(manifest=retriever._read_manifest())) == texts
+            assert retriever.search_moduli("x", k=3)
+
+    def test_update_index_dimension_change_reencodes_all(self, tmp_path):
+        """Con un modello di dimensione diversa tutti i moduli vengono ricalcolati"""
+        np = pytest.importorskip("numpy")
+        faiss = pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        old = faiss.IndexFlatL2(8)
+        old.add(np.zeros((1, 8), dtype="float32"))
+        encoder = self._CountingEncoder()
+        moduli = [{"nome": "a", "descrizione": "b"}, {"nome": "c", "descrizione": "d"}]
+
+        with (
+            patch.object(retriever, "INDEX_PATH", str(tmp_path / "moduli.index")),
+            patch.object(retriever, "MAPPING_PATH", str(tmp_path / "moduli.mapping.json")),
+            patch.object(retriever, "SOURCES_PATH", str(tmp_path / "moduli.sources.json")),
+            patch.object(retriever, "model", encoder),
+            patch.object(retriever, "_default", retriever.Retriever()),
+        ):
+            retriever.get_retriever().replace(old, ["a :: b"])
+            stats = retriever.update_index(moduli)
+
+            assert stats["added"] == 2
+            assert retriever.get_retriever().snapshot()[0].d == 4
+
+    def test_update_index_metric_change_reencodes_all(self, tmp_path):
+        """I vettori normalizzati di un indice coseno non vengono riusati in un indice L2"""
+        np = pytest.importorskip("numpy")
+        pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        encoder = self._CountingEncoder()
+        moduli = [{"nome": "a", "descrizione": "bb"}, {"nome": "c", "descrizione": "dddd"}]
+
+        with (
+            _index_files_in(tmp_path),
+            patch.dict(retriever._index_settings, {"metric": "cosine"}),
+            patch.object(retriever, "model", encoder),
+            patch.object(retriever, "_default", retriever.Retriever()),
+        ):
+            retriever.update_index(moduli)
+            retriever.configure_index({"index_metric": "l2"})
+            encoder.encoded.clear()
+            stats = retriever.update_index(moduli)
+
+            assert stats == {"added": 2, "removed": 0, "reused": 0}
+            assert sorted(encoder.encoded) == ["a :: bb", "c :: dddd"]
+            index, texts, _ = retriever.get_retriever().snapshot()
+            expected = encoder.encode(list(texts))
+            np.testing.assert_allclose(index.reconstruct_n(0, index.ntotal), expected)
+
+            # Stessa metrica: i vettori vengono riusati
+            encoder.encoded.clear()
+            stats = retriever.update_index(moduli + [{"nome": "e", "descrizione": "f"}])
+            assert stats["reused"] == 2 and encoder.encoded == ["e :: f"]
+
+
+class TestRetrieverIndexTypes:
+    """Tipi di indice FAISS selezionabili da configurazione (index_*)"""
+
+    @pytest.fixture
+    def settings(self):
+        from sigma_nex.core import retriever
+
+        saved = dict(retriever._index_settings)
+        yield retriever._index_settings
+        retriever._index_settings.clear()
+        retriever._index_settings.update(saved)
+
+    @staticmethod
+    def _clustered(n, dim=16, seed=0):
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(seed)
+        centers = rng.normal(size=(20, dim))
+        return (centers[rng.integers(0, 20, n)] + 0.1 * rng.normal(size=(n, dim))).astype("float32")
+
+    def test_configure_index(self, settings):
+        from sigma_nex.core.retriever import configure_index
+
+        configure_index({"index_type": "hnsw", "index_metric": "cosine", "index_nprobe": 4, "index_hnsw_m": 16})
+        assert (settings["type"], settings["metric"], settings["nprobe"], settings["hnsw_m"]) == (
+            "hnsw",
+            "cosine",
+            4,
+            16,
+        )
+
+        configure_index({"index_type": "annoy", "index_metric": "manhattan", "index_nprobe": 0, "index_pq_m": True})
+        configure_index(Mock())
+        assert (settings["type"], settings["metric"], settings["nprobe"], settings["pq_m"]) == ("hnsw", "cosine", 4, 16)
+
+    @pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq", "hnsw"])
+    def test_index_types_find_nearest_neighbour(self, settings, index_type):
+        faiss = pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        vectors = self._clustered(2000)
+        settings.update(type=index_type, nprobe=4)
+        index = retriever._make_index(vectors)
+
+        assert index.ntotal == 2000
+        assert (
+            type(index).__name__
+            == {"ivf_flat": "IndexIVFFlat", "ivf_pq": "IndexIVFPQ", "hnsw": "IndexHNSWFlat"}[index_type]
+        )
+        if index_type != "hnsw":
+            assert faiss.extract_index_ivf(index).nprobe == 4
+        _D, indices = index.search(vectors[:50], 1)
+        hits = sum(int(row[0]) == i for i, row in enumerate(indices))
+        assert hits >= (30 if index_type == "ivf_pq" else 48)
+
+    def test_small_corpus_falls_back_to_flat(self, settings):
+        pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        settings.update(type="ivf_pq", metric="cosine")
+        index = retriever._make_index(self._clustered(10))
+        assert type(index).__name__ == "IndexFlatIP"
+
+    def test_cosine_index_normalizes_queries(self, settings):
+        np = pytest.importorskip("numpy")
+        pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        settings.update(type="hnsw", metric="cosine")
+        vectors = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0]], dtype="float32")
+        index = retriever._make_index(vectors)
+
+        # Query molto lunga ma nella direzione del secondo vettore
+        distances, indices = index.search(retriever._query_vectors(index, np.array([[0.0, 50.0, 1.0]])), 1)
+        assert indices[0][0] == 1
+        assert distances[0][0] == pytest.approx(1.0, abs=0.01)
+
+    def test_update_index_with_pq_reencodes_instead_of_reconstructing(self, settings, tmp_path):
+        pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        encoder = TestRetrieverIncrementalUpdate._CountingEncoder()
+        moduli = [{"nome": f"modulo {i}", "descrizione": f"testo {i * 7}"} for i in range(300)]
+        settings.update(type="ivf_pq", pq_m=2)
+
+        with (
+            patch.object(retriever, "INDEX_PATH", str(tmp_path / "moduli.index")),
+            patch.object(retriever, "MAPPING_PATH", str(tmp_path / "moduli.mapping.json")),
+            patch.object(retriever, "SOURCES_PATH", str(tmp_path / "moduli.sources.json")),
+            patch.object(retriever, "model", encoder),
+            patch.object(retriever, "_default", retriever.Retriever()),
+        ):
+            retriever.update_index(moduli)
+            assert type(retriever.get_retriever().snapshot()[0]).__name__ == "IndexIVFPQ"
+
+            encoder.encoded.clear()
+            stats = retriever.update_index(moduli[:-1])
+            # I vettori PQ sono approssimati: tutto passa di nuovo dal modello
+            assert stats["reused"] == 0
+            assert len(encoder.encoded) == 299
+
+    def test_search_skips_missing_results(self):
+        from sigma_nex.core import retriever
+
+        index = Mock()
+        index.search.return_value = ([[0.1, 0.2, 0.0]], [[1, -1, -1]])
+        mdl = Mock()
+        with (
+            patch.object(retriever, "_default", _serving(index, ["a", "b"])),
+            patch.object(retriever, "model", mdl),
+        ):
+            assert retriever.search_moduli("query", k=3) == ["b"]
+
+
+class TestRetrieverRelevance:
+    """Punteggi, soglia di distanza e k dinamico"""
+
+    TEXTS = ["acqua :: filtra", "acqua :: bolli", "fuoco :: accendi"]
+
+    @pytest.fixture
+    def relevance(self):
+        from sigma_nex.core import retriever
+
+        saved = dict(retriever._relevance_settings)
+        yield retriever._relevance_settings
+        retriever._relevance_settings.update(saved)
+
+    @pytest.fixture
+    def vector_only(self, relevance):
+        from sigma_nex.core import retriever
+
+        index = Mock()
+        index.search.return_value = ([[1.0, 1.5, 5.0]], [[0, 1, 2]])
+        with (
+            patch.object(retriever, "_default", _serving(index, self.TEXTS)),
+            patch.object(retriever, "model", Mock()),
+        ):
+            yield retriever
+
+    def test_dynamic_k_drops_distant_hits(self, vector_only, relevance):
+        # Disattivato di default: sempre k risultati
+        assert vector_only.search_moduli("acqua", k=3) == self.TEXTS
+        # 5.0 è oltre il doppio della distanza migliore
+        relevance["dynamic_k"] = True
+        assert vector_only.search_moduli("acqua", k=3) == self.TEXTS[:2]
+        assert len(vector_only.search_moduli_scored("acqua", k=3, dynamic=False)) == 3
+
+    def test_max_distance_cutoff(self, vector_only, relevance):
+        relevance["max_distance"] = 1.2
+        assert vector_only.search_moduli("acqua", k=3) == self.TEXTS[:1]
+        # Nessun risultato abbastanza vicino: prompt senza moduli
+        assert vector_only.search_moduli_scored("acqua", k=3, max_distance=0.5) == []
+
+    def test_scored_results(self, vector_only):
+        results = vector_only.search_moduli_scored("acqua", k=3, dynamic=False)
+        assert [r["text"] for r in results] == self.TEXTS
+        assert [r["distance"] for r in results] == [1.0, 1.5, 5.0]
+        assert results[0]["id"] == 0 and results[0]["bm25"] is None
+        assert results[0]["score"] == pytest.approx(0.5)
+        assert results[0]["score"] > results[1]["score"] > results[2]["score"]
+
+    def test_retriever_search_exposes_scores(self, vector_only):
+        searcher = vector_only.get_retriever()
+        assert searcher.search("acqua", k=3, with_scores=True)[0]["distance"] == 1.0
+        assert searcher.search("acqua", k=3, dynamic=False) == self.TEXTS
+        assert searcher.search("acqua", k=3, max_distance=1.2) == self.TEXTS[:1]
+
+    def test_cosine_distance_reported_as_one_minus_similarity(self, relevance):
+        np = pytest.importorskip("numpy")
+        faiss = pytest.importorskip("faiss")
+        from sigma_nex.core import retriever
+
+        index = faiss.IndexFlatIP(2)
+        index.add(np.array([[1.0, 0.0], [0.6, 0.8]], dtype="float32"))
+        mdl = Mock()
+        mdl.encode.return_value = np.array([[2.0, 0.0]], dtype="float32")
+        with (
+            patch.object(retriever, "_default", _serving(index, self.TEXTS[:2])),
+            patch.object(retriever, "model", mdl),
+        ):
+            results = retriever.search_moduli_scored("acqua", k=2, dynamic=False)
+        assert [r["distance"] for r in results] == [pytest.approx(0.0, abs=1e-6), pytest.approx(0.4)]
+
+    def test_dynamic_k_on_bm25_scores(self, relevance):
+        from sigma_nex.core import retriever
+        from sigma_nex.core.lexical import BM25Index
+
+        texts = ["medicina :: povidone povidone clorexidina", "medicina :: clorexidina", "fuoco :: esca"]
+        with (
+            patch.object(retriever, "_default", _serving(Mock(), texts, BM25Index.build(texts))),
+            patch.object(retriever, "model", retriever._StubEncoder()),
+        ):
+            assert retriever.search_moduli("povidone clorexidina", k=3) == texts[:2]
+            relevance["dynamic_k"] = True
+            assert retriever.search_moduli("povidone clorexidina", k=3) == texts[:1]
+
+    def test_configure_search(self, relevance):
+        from sigma_nex.core import retriever
+
+        retriever.configure_search(
+            {"retrieval_max_distance": 0.8, "retrieval_dynamic_k": True, "retrieval_dynamic_ratio": 0.5}
+        )
+        assert relevance["max_distance"] == 0.8
+        assert relevance["dynamic_k"] is True
+        assert relevance["dynamic_ratio"] == 2.0  # rapporto < 1 ignorato
+        retriever.configure_search(Mock())
+        assert relevance["max_distance"] == 0.8
@@ -0,0 +1,248 @@
+"""
+Test realistici per la cache dell'indice del Retriever
+Read-write lock, primo caricamento unico, ricaricamento in background
+quando i file cambiano, senza bloccare le query
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from sigma_nex.core import retriever
+from sigma_nex.core.lexical import BM25Index
+from sigma_nex.core.mapping_store import write_mapping
+from sigma_nex.utils.rwlock import ReadWriteLock
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+
+def _write_files(index_path, texts):
+    """Scrive indice, mappatura e BM25 come farebbe un altro processo (sigma ingest)"""
+    index = faiss.IndexFlatL2(2)
+    index.add(np.array([[float(i), 0.0] for i in range(len(texts))], dtype="float32"))
+    faiss.write_index(index, str(index_path))
+    write_mapping(str(index_path.with_name("moduli.mapping.bin")), texts)
+    BM25Index.build(texts).save(str(index_path.with_name("moduli.bm25.npz")))
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condizione non raggiunta"
+        time.sleep(0.01)
+
+
+class TestReadWriteLock:
+    """Lettori concorrenti, scrittore esclusivo"""
+
+    def test_readers_share_the_lock(self):
+        lock = ReadWriteLock()
+        inside = threading.Barrier(3, timeout=2)
+
+        def reader():
+            with lock.read():
+                inside.wait()  # tutti e tre dentro insieme
+
+        threads = [threading.Thread(target=reader) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(2)
+        assert not inside.broken
+
+    def test_writer_waits_for_readers_and_blocks_new_ones(self):
+        lock = ReadWriteLock()
+        events = []
+        reading = threading.Event()
+        release = threading.Event()
+
+        def first_reader():
+            with lock.read():
+                reading.set()
+                release.wait(2)
+                events.append("reader1")
+
+        def writer():
+            with lock.write():
+                events.append("writer")
+
+        def late_reader():
+            with lock.read():
+                events.append("reader2")
+
+        threads = [threading.Thread(target=first_reader)]
+        threads[0].start()
+        reading.wait(2)
+        threads.append(threading.Thread(target=writer))
+        threads[1].start()
+        _wait_for(lambda: lock._waiting_writers == 1)
+        threads.append(threading.Thread(target=late_reader))
+        threads[2].start()
+        time.sleep(0.05)
+        assert events == []  # lo scrittore in attesa ferma i nuovi lettori
+        release.set()
+        for t in threads:
+            t.join(2)
+        assert events == ["reader1", "writer", "reader2"]
+
+
+class TestRetrieverSnapshot:
+    """Caricamento e ricaricamento dell'indice"""
+
+    def test_concurrent_first_load_reads_files_once(self, tmp_path):
+        index_path = tmp_path / "moduli.index"
+        _write_files(index_path, ["acqua :: filtra", "fuoco :: accendi"])
+        searcher = retriever.Retriever(str(index_path))
+        real_read = faiss.read_index
+
+        with patch.object(retriever.faiss, "read_index", side_effect=real_read) as read_index:
+            threads = [threading.Thread(target=searcher.snapshot) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+
+        assert read_index.call_count == 1
+        index, texts, lexical = searcher.snapshot()
+        assert index.ntotal == 2 and list(texts) == ["acqua :: filtra", "fuoco :: accendi"]
+        assert len(lexical) == 2
+
+    def test_changed_files_reload_in_background(self, tmp_path):
+        index_path = tmp_path / "moduli.index"
+        _write_files(index_path, ["acqua :: filtra"])
+        searcher = retriever.Retriever(str(index_path), refresh_interval=0)
+        assert list(searcher.snapshot()[1]) == ["acqua :: filtra"]
+
+        time.sleep(0.01)  # mtime diverso anche su filesystem a bassa risoluzione
+        _write_files(index_path, ["acqua :: filtra", "rifugio :: costruisci"])
+        _wait_for(lambda: len(searcher.snapshot()[1]) == 2)
+        assert searcher.snapshot()[0].ntotal == 2
+
+    def test_queries_do_not_wait_for_reload(self, tmp_path):
+        index_path = tmp_path / "moduli.index"
+        _write_files(index_path, ["acqua :: filtra"])
+        searcher = retriever.Retriever(str(index_path), refresh_interval=0)
+        first = searcher.snapshot()
+
+        loading = threading.Event()
+        release = threading.Event()
+        real_read = searcher._read
+
+        def slow_read():
+            loading.set()
+            release.wait(5)
+            return real_read()
+
+        time.sleep(0.01)
+        _write_files(index_path, ["acqua :: filtra", "fuoco :: accendi"])
+        with patch.object(searcher, "_read", side_effect=slow_read):
+            searcher.snapshot()  # avvia il ricaricamento
+            assert loading.wait(2)
+            start = time.monotonic()
+            for _ in range(20):
+                assert searcher.snapshot()[0] is first[0]  # vecchio indice servito subito
+            assert time.monotonic() - start < 1.0
+            release.set()
+            _wait_for(lambda: searcher.snapshot()[0] is not first[0])
+        assert len(searcher.snapshot()[1]) == 2
+
+    def test_half_written_files_are_not_served(self, tmp_path):
+        index_path = tmp_path / "moduli.index"
+        _write_files(index_path, ["acqua :: filtra", "fuoco :: accendi"])
+        searcher = retriever.Retriever(str(index_path))
+        write_mapping(str(tmp_path / "moduli.mapping.bin"), ["solo un testo"])
+
+        with pytest.raises(RuntimeError, match="non allineati"):
+            searcher.load()
+        assert searcher.search("acqua") == []
+
+    def test_update_index_replaces_without_reload(self, tmp_path):
+        moduli = [{"nome": "acqua", "descrizione": "filtra"}]
+        searcher = retriever.Retriever(refresh_interval=0)
+        with (
+            patch.object(retriever, "INDEX_PATH", str(tmp_path / "moduli.index")),
+            patch.object(retriever, "MAPPING_PATH", str(tmp_path / "moduli.mapping.json")),
+            patch.object(retriever, "SOURCES_PATH", str(tmp_path / "moduli.sources.json")),
+            patch.object(retriever, "model", retriever._StubEncoder()),
+            patch.object(retriever, "_default", searcher),
+        ):
+            retriever.update_index(moduli)
+            with patch.object(searcher, "_read") as read:
+                assert retriever.search_moduli("acqua") == ["acqua :: filtra"]
+            read.assert_not_called()
+
+    def test_configure_refresh_interval(self):
+        searcher = retriever.Retriever()
+        with patch.object(retriever, "_default", searcher):
+            retriever.configure_search({"retrieval_refresh_interval": 30})
+        assert searcher.refresh_interval == 30.0
+
+
+class TestIndexPublication:
+    """File di una ricostruzione pubblicati insieme, una sola ricostruzione per volta"""
+
+    MODULI = [{"nome": "acqua", "descrizione": "filtra"}, {"nome": "fuoco", "descrizione": "accendi"}]
+
+    @pytest.fixture
+    def files(self, tmp_path):
+        with (
+            patch.object(retriever, "INDEX_PATH", str(tmp_path / "moduli.index")),
+            patch.object(retriever, "MAPPING_PATH", str(tmp_path / "moduli.mapping.json")),
+            patch.object(retriever, "SOURCES_PATH", str(tmp_path / "moduli.sources.json")),
+            patch.object(retriever, "model", retriever._StubEncoder()),
+            patch.object(retriever, "_default", retriever.Retriever(refresh_interval=0)),
+        ):
+            yield tmp_path
+
+    def test_one_manifest_names_one_generation(self, files):
+        retriever.update_index(self.MODULI)
+
+        manifest = retriever._read_manifest()
+        generation = manifest["index"].split(".")[1]
+        assert manifest["mapping"] == f"moduli.mapping.{generation}.bin"
+        assert manifest["bm25"] == f"moduli.bm25.{generation}.npz"
+        assert manifest["sources"] == f"moduli.sources.{generation}.json"
+        # Nessun file con nome fisso sovrascritto, nessun temporaneo rimasto
+        assert not any((files / name).exists() for name in ("moduli.index", "moduli.mapping.bin", "moduli.bm25.npz"))
+        assert not list(files.glob("*.tmp"))
+
+        index, texts, lexical = retriever.Retriever(str(files / "moduli.index")).snapshot()
+        assert index.ntotal == len(texts) == len(lexical) == 2
+
+    def test_other_worker_loads_instead_of_rebuilding(self, files):
+        retriever.update_index(self.MODULI)
+        worker = retriever.Retriever(refresh_interval=float("inf"))  # snapshot di un altro processo
+        encoder = retriever._StubEncoder()
+
+        with (
+            patch.object(retriever, "_default", worker),
+            patch.object(retriever, "model", encoder),
+            patch.object(encoder, "encode", side_effect=AssertionError("ricalcolo inatteso")),
+            patch.object(retriever.faiss, "write_index") as write_index,
+        ):
+            stats = retriever.update_index(self.MODULI)
+
+        assert stats == {"added": 0, "removed": 0, "reused": 2}
+        write_index.assert_not_called()
+        assert list(worker.snapshot()[1]) == ["acqua :: filtra", "fuoco :: accendi"]
+
+    def test_concurrent_updates_rebuild_once(self, files):
+        real_write = faiss.write_index
+        start = threading.Barrier(4, timeout=5)
+
+        def update():
+            start.wait()
+            retriever.update_index(self.MODULI)
+
+        with patch.object(retriever.faiss, "write_index", side_effect=real_write) as write_index:
+            threads = [threading.Thread(target=update) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(10)
+
+        assert write_index.call_count == 1
+        assert len(retriever.get_retriever().snapshot()[1]) == 2
@@ -13,6 +13,7 @@ from unittest.mock import Mock, patch
 import pytest
 
 from sigma_nex.core.runner import Runner
+from sigma_nex.utils.metrics import StreamingStats
 
 
 @pytest.fixture
@@ -401,7 +402,7 @@ class TestRunnerRealistic:
         runner = Runner(test_config)
 
         # Verifica inizializzazione
-        assert isinstance(runner.performance_stats, list)
+        assert isinstance(runner.performance_stats, StreamingStats)
         assert len(runner.performance_stats) == 0
 
         # Le stats dovrebbero essere aggiornate durante l'uso
@@ -521,6 +522,39 @@ class TestRunnerAdvancedFunctionality:
         assert stats["total_queries"] == 4
         assert stats["total_response_time"] == 4.0
         assert stats["average_response_time"] == 1.0
+        assert stats["min"] == 0.5
+        assert stats["max"] == 1.5
+        assert stats["p50"] == pytest.approx(0.8, rel=0.01)
+        assert stats["p99"] == pytest.approx(1.5, rel=0.01)
+
+    def test_performance_stats_memory_is_bounded(self, test_config):
+        """Le statistiche non devono crescere con il numero di query"""
+        runner = Runner(test_config)
+
+        runner.performance_stats.extend(0.1 + (i % 1000) / 1000 for i in range(100_000))
+
+        stats = runner.get_performance_stats()
+        assert stats["total_queries"] == 100_000
+        assert len(runner.performance_stats._buckets) < 200
+        assert stats["p50"] == pytest.approx(0.6, rel=0.02)
+        assert stats["p95"] == pytest.approx(1.05, rel=0.02)
+
+    def test_stage_timings_recorded(self, test_config):
+        """Ogni fase della pipeline deve avere i propri tempi"""
+        runner = Runner(test_config)
+
+        with (
+            patch("sigma_nex.core.runner.translate_it_to_en", side_effect=lambda t: t),
+            patch("sigma_nex.core.runner.translate_en_to_it", side_effect=lambda t: t),
+            patch("sigma_nex.core.runner.build_prompt", return_value="prompt"),
+            patch.object(runner, "_call_model", return_value="risposta"),
+        ):
+            runner.process_query("domanda")
+            runner.process_query("domanda")
+
+        stages = runner.get_performance_stats()["stages"]
+        assert set(stages) == {"translate_it_en", "prompt", "llm", "translate_en_it"}
+        assert all(stage["count"] == 2 for stage in stages.values())
 
     def test_add_to_history_and_get_context_real(self, test_config):
         """Test gestione history - metodi pubblici"""
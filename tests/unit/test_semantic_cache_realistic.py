@@ -0,0 +1,120 @@
+"""
+Test realistici per sigma_nex.core.semantic_cache - cache semantica delle risposte
+Usa un modello di embedding deterministico al posto di MiniLM
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from sigma_nex.core import retriever  # noqa: E402
+from sigma_nex.core.semantic_cache import SemanticCache  # noqa: E402
+
+
+class _BagOfWordsModel:
+    """Embedding deterministico: conteggio parole su un vocabolario fisso"""
+
+    VOCAB = ["acqua", "filtro", "filtrare", "fuoco", "ferita", "rifugio", "come", "posso"]
+
+    def encode(self, texts, convert_to_numpy=True):
+        rows = []
+        for text in texts:
+            words = text.lower().replace("?", "").split()
+            rows.append([float(words.count(w)) for w in self.VOCAB])
+        return np.array(rows, dtype=np.float32)
+
+
+class _ZeroModel:
+    def encode(self, texts, convert_to_numpy=True):
+        return np.zeros((len(texts), 8), dtype=np.float32)
+
+
+def _embed(cache, question):
+    """Chiave di cache come in SigmaServer: embedding del retriever normalizzato"""
+    return cache.normalize(retriever.encode_queries([question]))
+
+
+@pytest.fixture
+def bow_model():
+    with patch("sigma_nex.core.retriever.model", _BagOfWordsModel()):
+        yield
+
+
+class TestSemanticCacheRealistic:
+    """Test del comportamento effettivo della cache semantica"""
+
+    def test_hit_on_identical_question(self, bow_model):
+        cache = SemanticCache(threshold=0.9)
+        vec = _embed(cache, "come filtro acqua?")
+        cache.store(vec, ["idratazione :: acqua"], "Usa sabbia e carbone")
+
+        assert cache.lookup(_embed(cache, "come filtro acqua?"), ["idratazione :: acqua"]) == "Usa sabbia e carbone"
+        assert cache.stats()["hits"] == 1
+
+    def test_threshold_controls_paraphrase_matching(self, bow_model):
+        strict = SemanticCache(threshold=0.99)
+        loose = SemanticCache(threshold=0.7)
+        for cache in (strict, loose):
+            cache.store(_embed(cache, "come filtro acqua"), [], "risposta")
+
+        paraphrase = "come posso filtro acqua"
+        assert strict.lookup(_embed(strict, paraphrase), []) is None
+        assert loose.lookup(_embed(loose, paraphrase), []) == "risposta"
+
+    def test_module_set_must_match(self, bow_model):
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_embed(cache, "acqua filtro"), ["b", "a"], "risposta")
+
+        # Stesso insieme in ordine diverso: hit
+        assert cache.lookup(_embed(cache, "acqua filtro"), ["a", "b"]) == "risposta"
+        # Insieme diverso: miss
+        assert cache.lookup(_embed(cache, "acqua filtro"), ["a", "c"]) is None
+
+    def test_lru_eviction(self, bow_model):
+        cache = SemanticCache(threshold=0.99, max_entries=2)
+        cache.store(_embed(cache, "acqua"), [], "r1")
+        cache.store(_embed(cache, "fuoco"), [], "r2")
+        cache.store(_embed(cache, "rifugio"), [], "r3")
+
+        assert cache.stats()["entries"] == 2
+        assert cache.lookup(_embed(cache, "acqua"), []) is None
+        assert cache.lookup(_embed(cache, "rifugio"), []) == "r3"
+
+    def test_ttl_expiry(self, bow_model):
+        cache = SemanticCache(threshold=0.9, ttl=10)
+        with patch("sigma_nex.core.semantic_cache.time.time", return_value=1000.0):
+            cache.store(_embed(cache, "ferita"), [], "benda")
+        with patch("sigma_nex.core.semantic_cache.time.time", return_value=1011.0):
+            assert cache.lookup(_embed(cache, "ferita"), []) is None
+        assert cache.stats()["entries"] == 0
+
+    def test_stub_model_bypasses_cache(self):
+        with patch("sigma_nex.core.retriever.model", _ZeroModel()):
+            cache = SemanticCache()
+            assert _embed(cache, "qualsiasi domanda") is None
+            cache.store(None, [], "risposta")
+            assert cache.lookup(None, []) is None
+            assert cache.stats()["entries"] == 0
+
+    def test_clear(self, bow_model):
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_embed(cache, "acqua"), [], "r1")
+        cache.clear()
+        assert cache.lookup(_embed(cache, "acqua"), []) is None
+
+
+class TestBuildPromptPrecomputedModules:
+    """build_prompt deve riusare i moduli già recuperati"""
+
+    def test_build_prompt_uses_given_modules(self):
+        from sigma_nex.core.context import build_prompt
+
+        with patch("sigma_nex.core.retriever.search_moduli") as mock_search:
+            prompt = build_prompt("sys", [], "domanda", moduli=["acqua :: filtra con sabbia"])
+
+        mock_search.assert_not_called()
+        assert "[MODULO 1: ACQUA]" in prompt
+        assert "filtra con sabbia" in prompt
@@ -21,6 +21,7 @@ Test realistici per sigma_nex.server - focus     def test_server_security_enable
 Elimina mock eccessivi e testa comportamento effettivo del server
 """
 
+import os
 from contextlib import contextmanager
 from unittest.mock import Mock, patch
 
@@ -643,3 +644,575 @@ class TestSigmaServerPerformance:
         # Non dovrebbe esserci un aumento drammatico di oggetti
         objects_increase = final_objects - initial_objects
         assert objects_increase < 1000  # Threshold ragionevole
+
+
+def _server_with_config(**overrides):
+    """Crea un SigmaServer con config mockata e override specifici"""
+    from pathlib import Path
+
+    with patch("sigma_nex.server.get_config") as mock_get_config:
+        mock_config = Mock()
+        mock_config.config = {"auth_enabled": True, "api_keys": ["test_key"], "model_name": "mistral", "debug": False}
+        mock_config.config.update(overrides)
+        mock_config.get.side_effect = lambda key, default=None: mock_config.config.get(key, default)
+        mock_config.get_path.return_value = Path("/tmp/logs")
+        mock_get_config.return_value = mock_config
+        return SigmaServer()
+
+
+class TestSigmaServerSemanticCache:
+    """Test della cache semantica integrata in /ask"""
+
+    def test_semantic_cache_disabled_by_default(self):
+        server = _server_with_config()
+        assert server.semantic_cache is None
+
+    def test_paraphrase_served_from_cache(self):
+        np = pytest.importorskip("numpy")
+        pytest.importorskip("faiss")
+        from unittest.mock import AsyncMock
+
+        class _Model:
+            """Bag of words con sinonimi: le parafrasi restano vicine ma non identiche"""
+
+            VOCAB = ["acqua", "filtro", "fuoco", "come", "posso"]
+            SYNONYMS = {"filtrare": "filtro", "depurare": "filtro"}
+
+            def encode(self, texts, convert_to_numpy=True):
+                rows = []
+                for text in texts:
+                    words = [self.SYNONYMS.get(w, w) for w in text.lower().replace("'", " ").split()]
+                    rows.append([float(words.count(w)) for w in self.VOCAB])
+                return np.array(rows, dtype=np.float32)
+
+        # "come filtro acqua" vs "come posso filtrare l'acqua": similarità ~0.87
+        server = _server_with_config(semantic_cache_enabled=True, semantic_cache_threshold=0.85)
+        client = TestClient(server.app)
+        headers = {"Authorization": "Bearer test_key"}
+        moduli = ["idratazione :: acqua potabile"]
+
+        def ask(question, **extra):
+            return client.post("/ask", json={"question": question, **extra}, headers=headers)
+
+        with (
+            patch("sigma_nex.core.retriever.model", _Model()),
+            patch("sigma_nex.core.retriever.search_moduli", return_value=moduli),
+            patch.object(server, "_call_ollama", new=AsyncMock(return_value="Filtra con sabbia")) as mock_call,
+        ):
+            first = ask("come filtro acqua")
+            paraphrase = ask("come posso filtrare l'acqua")
+            unrelated = ask("come accendo il fuoco")
+            with_history = ask("come filtro acqua", history=["Utente: ciao"])
+
+        assert first.status_code == 200 and first.json()["cached"] is False
+        assert paraphrase.status_code == 200 and paraphrase.json()["cached"] is True
+        assert paraphrase.json()["response"] == "Filtra con sabbia"
+        # Sotto la soglia di similarità la domanda va al modello
+        assert unrelated.json()["cached"] is False
+        # Le domande con cronologia non usano la cache
+        assert with_history.json()["cached"] is False
+        assert mock_call.await_count == 3
+
+    def test_question_encoded_once_off_the_event_loop(self):
+        np = pytest.importorskip("numpy")
+        pytest.importorskip("faiss")
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        encoded = []
+        searches = []
+
+        class _Model:
+            def encode(self, texts, convert_to_numpy=True):
+                encoded.extend(texts)
+                return np.array([[1.0, 0.5, 0.0] for _ in texts], dtype=np.float32)
+
+        def fake_search(question, k=3, query_vector=None):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()  # thread dell'executor, non l'event loop
+            searches.append(query_vector)
+            return ["idratazione :: acqua potabile"]
+
+        server = _server_with_config(semantic_cache_enabled=True)
+        client = TestClient(server.app)
+        with (
+            patch("sigma_nex.core.retriever.model", _Model()),
+            patch("sigma_nex.core.retriever.search_moduli", side_effect=fake_search),
+            patch.object(server, "_call_ollama", new=AsyncMock(return_value="Filtra con sabbia")),
+        ):
+            response = client.post(
+                "/ask", json={"question": "come filtro acqua"}, headers={"Authorization": "Bearer test_key"}
+            )
+
+        assert response.status_code == 200
+        # Un solo embedding, condiviso da retriever e cache
+        assert encoded == ["come filtro acqua"]
+        assert searches[0].shape == (1, 3)
+
+
+class TestSigmaServerSingleFlight:
+    """Test della deduplicazione delle richieste identiche in corso"""
+
+    def test_request_key_depends_on_question_and_history(self):
+        server = _server_with_config()
+        key = server._request_key("come filtro acqua", [])
+        assert key == server._request_key("come filtro acqua", [])
+        assert key != server._request_key("come filtro acqua", ["Utente: ciao"])
+        assert key != server._request_key("come accendo fuoco", [])
+
+    def test_concurrent_identical_requests_share_generation(self):
+        import asyncio
+
+        server = _server_with_config()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "risposta condivisa"
+
+        async def run():
+            key = server._request_key("domanda", [])
+            return await asyncio.gather(*[server._single_flight(key, generate) for _ in range(5)])
+
+        results = asyncio.run(run())
+
+        assert results == ["risposta condivisa"] * 5
+        assert len(calls) == 1
+        assert server.coalesced_requests == 4
+        assert server._inflight == {}
+
+    def test_errors_propagate_to_all_waiters(self):
+        import asyncio
+
+        server = _server_with_config()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise HTTPException(status_code=504, detail="Model response timeout")
+
+        async def run():
+            return await asyncio.gather(
+                *[server._single_flight("k", failing) for _ in range(3)], return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, HTTPException) and r.status_code == 504 for r in results)
+        assert server._inflight == {}
+
+    def test_completed_generation_is_not_reused(self):
+        import asyncio
+
+        server = _server_with_config()
+        counter = iter(range(10))
+
+        async def generate():
+            return f"risposta {next(counter)}"
+
+        async def run():
+            first = await server._single_flight("k", generate)
+            await asyncio.sleep(0)
+            second = await server._single_flight("k", generate)
+            return first, second
+
+        assert asyncio.run(run()) == ("risposta 0", "risposta 1")
+
+
+class TestAdmissionController:
+    """Test del controllo di ammissione davanti a Ollama"""
+
+    def test_concurrency_is_bounded(self):
+        import asyncio
+
+        from sigma_nex.server import AdmissionController
+
+        admission = AdmissionController(max_concurrent=2, max_queue=10)
+        running = []
+        peak = []
+
+        async def job():
+            async with admission.slot():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+
+        async def run():
+            await asyncio.gather(*[job() for _ in range(6)])
+
+        asyncio.run(run())
+        assert max(peak) == 2
+        assert admission.stats()["admitted"] == 6
+        assert admission.active == 0 and admission.queued == 0
+
+    def test_priority_lane_served_first(self):
+        import asyncio
+
+        from sigma_nex.server import AdmissionController
+
+        admission = AdmissionController(max_concurrent=1, max_queue=10)
+        order = []
+
+        async def job(name, priority):
+            async with admission.slot(priority):
+                order.append(name)
+
+        async def run():
+            await admission.acquire()  # occupa l'unico slot
+            tasks = [
+                asyncio.ensure_future(job("normal-1", AdmissionController.PRIORITY_NORMAL)),
+                asyncio.ensure_future(job("normal-2", AdmissionController.PRIORITY_NORMAL)),
+                asyncio.ensure_future(job("medical", AdmissionController.PRIORITY_MEDICAL)),
+            ]
+            await asyncio.sleep(0)
+            assert admission.queued == 3
+            admission.release()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == ["medical", "normal-1", "normal-2"]
+
+    def test_full_queue_rejects_immediately(self):
+        import asyncio
+
+        from sigma_nex.server import AdmissionController, OverloadedError
+
+        admission = AdmissionController(max_concurrent=1, max_queue=1, retry_after=7)
+
+        async def run():
+            await admission.acquire()
+            waiter = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(OverloadedError) as exc_info:
+                await admission.acquire()
+            admission.release()
+            await waiter
+            admission.release()
+            return exc_info.value
+
+        error = asyncio.run(run())
+        assert error.retry_after == 7
+        assert admission.stats()["rejected"] == 1
+        assert admission.active == 0
+
+    def test_queue_timeout_rejects_and_frees_queue(self):
+        import asyncio
+
+        from sigma_nex.server import AdmissionController, OverloadedError
+
+        admission = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=0.01)
+
+        async def run():
+            await admission.acquire()
+            with pytest.raises(OverloadedError):
+                await admission.acquire()
+            admission.release()
+
+        asyncio.run(run())
+        stats = admission.stats()
+        assert stats["timeouts"] == 1
+        assert stats["queued"] == 0 and stats["active"] == 0
+
+    def test_overloaded_ask_returns_503_with_retry_after(self):
+        server = _server_with_config(ollama_max_concurrent=1, ollama_max_queue=0, ollama_retry_after=3)
+        client = TestClient(server.app)
+        server.admission.active = 1  # backend saturo
+
+        response = client.post(
+            "/ask", json={"question": "come filtro acqua"}, headers={"Authorization": "Bearer test_key"}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+
+
+class TestSigmaServerWarmUp:
+    """Test del warm-up dei modelli e della gestione keep_alive"""
+
+    def test_keep_alive_added_to_generate_payloads(self):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        server = _server_with_config(ollama_keep_alive="30m")
+
+        with (
+            patch("sigma_nex.core.retriever.search_moduli", return_value=[]),
+            patch.object(server, "_call_ollama", new=AsyncMock(return_value="ok")) as mock_call,
+        ):
+            asyncio.run(server._generate_response("ho una ferita", [], None))
+
+        payloads = [call.args[0] for call in mock_call.await_args_list]
+        assert [p["model"] for p in payloads] == ["mistral", "medllama2"]
+        assert all(p["keep_alive"] == "30m" for p in payloads)
+
+    def test_keep_alive_omitted_when_not_configured(self):
+        from sigma_nex.core.backends import build_generate_payload
+
+        assert build_generate_payload("mistral", "p") == {"model": "mistral", "prompt": "p", "stream": False}
+        assert build_generate_payload("mistral", "p", -1)["keep_alive"] == -1
+
+    def test_startup_warms_main_and_medical_models(self):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        server = _server_with_config(ollama_keep_alive="1h", ollama_urls=["http://a:11434", "http://b:11434"])
+        ok = Mock(status_code=200)
+
+        async def run():
+            with patch.object(server, "_post_generate", new=AsyncMock(return_value=ok)) as mock_post:
+                await server.startup()
+                await server.shutdown()
+            return mock_post
+
+        mock_post = asyncio.run(run())
+        warmed = {(call.args[0], call.args[1]["model"]) for call in mock_post.await_args_list}
+        assert warmed == {
+            ("http://a:11434/api/generate", "mistral"),
+            ("http://b:11434/api/generate", "mistral"),
+            ("http://a:11434/api/generate", "medllama2"),
+            ("http://b:11434/api/generate", "medllama2"),
+        }
+        assert all(
+            call.args[1]["prompt"] == "" and call.args[1]["keep_alive"] == "1h" for call in mock_post.await_args_list
+        )
+        assert all("mistral" in b.loaded_models for b in server.backends.backends)
+
+    def test_warm_up_skips_medical_model_when_disabled(self):
+        server = _server_with_config(medical_enhancement_enabled=False)
+        assert server._warm_models() == ["mistral"]
+
+    def test_keep_alive_pinger_repeats_warm_up(self):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        server = _server_with_config(ollama_warmup=False)
+
+        async def run():
+            with patch.object(server, "_warm_up_models", new=AsyncMock()) as mock_warm:
+                task = asyncio.ensure_future(server._keep_alive_worker(0.01))
+                await asyncio.sleep(0.05)
+                task.cancel()
+                return mock_warm.await_count
+
+        assert asyncio.run(run()) >= 2
+
+
+class TestSigmaServerMetrics:
+    """Test dell'endpoint /metrics"""
+
+    def test_metrics_restricted_to_allowed_hosts(self):
+        server = _server_with_config()
+        client = TestClient(server.app)
+        assert client.get("/metrics").status_code == 403
+
+    def test_metrics_expose_stages_queues_and_errors(self):
+        from unittest.mock import AsyncMock
+
+        server = _server_with_config(
+            metrics_allowed_hosts=["testclient"], ollama_urls=["http://a:11434", "http://b:11434"]
+        )
+        client = TestClient(server.app)
+        unavailable = Mock(status_code=500)
+        ok = Mock(status_code=200)
+        ok.json.return_value = {"response": "risposta"}
+
+        with (
+            patch("sigma_nex.core.retriever.search_moduli", return_value=[]),
+            patch.object(server, "_post_generate", new=AsyncMock(side_effect=[unavailable, ok])),
+        ):
+            answer = client.post(
+                "/ask", json={"question": "come filtro acqua"}, headers={"Authorization": "Bearer test_key"}
+            )
+        assert answer.status_code == 200
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        for stage in ("sanitize", "blocklist", "queue", "llm", "logging"):
+            assert f'sigma_stage_duration_seconds_count{{stage="{stage}"}}' in text
+        assert 'sigma_ollama_errors_total{backend="http://a:11434",kind="http_500"}' in text
+        assert 'sigma_queue_depth{queue="admission"} 0' in text
+        assert "sigma_requests_processed_total 1" in text
+        assert 'sigma_backend_healthy{backend="http://a:11434"} 0' in text
+
+
+class TestSigmaServerTracing:
+    """Test del tracing opt-in delle richieste API"""
+
+    def test_ask_request_trace_includes_ollama_span(self, tmp_path):
+        import json
+        from unittest.mock import AsyncMock
+
+        from sigma_nex.utils import tracing
+
+        saved = dict(tracing._settings)
+        try:
+            server = _server_with_config(tracing_enabled=True, tracing_dir=str(tmp_path))
+            client = TestClient(server.app)
+            ok = Mock(status_code=200)
+            ok.json.return_value = {"response": "risposta"}
+
+            with (
+                patch("sigma_nex.core.retriever.search_moduli", return_value=[]),
+                patch.object(server, "_post_generate", new=AsyncMock(return_value=ok)),
+            ):
+                answer = client.post(
+                    "/ask", json={"question": "come filtro acqua"}, headers={"Authorization": "Bearer test_key"}
+                )
+            assert answer.status_code == 200
+
+            [trace_file] = list(tmp_path.glob("*.trace.json"))
+            names = {e["name"] for e in json.loads(trace_file.read_text(encoding="utf-8"))["traceEvents"]}
+            assert {"POST /ask", "build_prompt", "server.call_ollama"} <= names
+        finally:
+            tracing._settings.clear()
+            tracing._settings.update(saved)
+
+
+class TestSigmaServerConfigReload:
+    """Test del ricaricamento a caldo della configurazione nel server"""
+
+    def test_watcher_disabled_by_default(self):
+        server = _server_with_config()
+        assert server._config_watcher is None
+
+    def test_reload_updates_rate_limiter_auth_and_model(self):
+        import time
+
+        server = _server_with_config(config_watch_enabled=True, rate_limit_requests=60)
+        assert server._config_watcher is not None
+        server.rate_limiter.requests["client"] = [time.time()]
+
+        server._cfg.config.update({"rate_limit_requests": 2, "api_keys": ["new_key"], "model_name": "llama3"})
+        server._on_config_change({"rate_limit_requests", "api_keys", "model_name"})
+
+        assert server.rate_limiter.max_requests == 2
+        assert server.rate_limiter.requests["client"]  # storico conservato
+        assert server.auth_manager.validate_key("new_key")
+        assert not server.auth_manager.validate_key("test_key")
+        assert server.model_name == "llama3"
+        assert server.runner.model == "llama3"
+        assert server.config["model_name"] == "llama3"
+
+    def test_reload_with_empty_keys_keeps_current_keys(self):
+        server = _server_with_config(config_watch_enabled=True)
+        server._cfg.config["api_keys"] = []
+        server._on_config_change({"api_keys"})
+
+        assert server.auth_manager.validate_key("test_key")
+
+    def test_framework_change_updates_index(self):
+        server = _server_with_config(config_watch_enabled=True)
+        server._cfg.framework = {"modules": [{"nome": "a", "descrizione": "b"}]}
+
+        with patch("sigma_nex.core.retriever.update_index", return_value={"added": 1}) as update:
+            server._on_config_change({"framework"})
+
+        update.assert_called_once_with([{"nome": "a", "descrizione": "b"}])
+
+    def test_index_type_change_rebuilds_index(self):
+        from sigma_nex.core import retriever
+
+        server = _server_with_config(config_watch_enabled=True)
+        server._cfg.framework = {"modules": [{"nome": "a", "descrizione": "b"}]}
+        server._cfg.config["index_type"] = "hnsw"
+        saved = dict(retriever._index_settings)
+        try:
+            with patch("sigma_nex.core.retriever.update_index", return_value={"added": 0}) as update:
+                server._on_config_change({"index_type"})
+            assert retriever._index_settings["type"] == "hnsw"
+            update.assert_called_once()
+        finally:
+            retriever._index_settings.update(saved)
+
+    def test_bm25_change_reconfigures_without_rebuild(self):
+        from sigma_nex.core import lexical
+
+        server = _server_with_config(config_watch_enabled=True)
+        server._cfg.config["bm25_k1"] = 2.0
+        saved = dict(lexical._settings)
+        try:
+            with patch("sigma_nex.core.retriever.update_index") as update:
+                server._on_config_change({"bm25_k1"})
+            assert lexical._settings["k1"] == 2.0
+            update.assert_not_called()
+        finally:
+            lexical._settings.update(saved)
+
+    def test_startup_subscribes_and_shutdown_stops_watcher(self):
+        import asyncio
+
+        server = _server_with_config(config_watch_enabled=True, ollama_warmup=False)
+        server._config_watcher = Mock()
+
+        asyncio.run(server.startup())
+        server._cfg.subscribe.assert_called_once_with(server._on_config_change)
+        server._config_watcher.start.assert_called_once()
+
+        asyncio.run(server.shutdown())
+        server._config_watcher.stop.assert_called_once()
+        server._cfg.unsubscribe.assert_called_once_with(server._on_config_change)
+
+
+class TestSigmaServerPrefork:
+    """Avvio con più worker: pre-fork con modelli condivisi"""
+
+    def test_multiple_workers_use_prefork_supervisor(self):
+        server = _server_with_config()
+
+        with (
+            patch("sigma_nex.prefork.PreforkSupervisor") as supervisor,
+            patch("sigma_nex.server.uvicorn") as mock_uvicorn,
+        ):
+            server.run(host="127.0.0.1", port=8123, workers=3)
+
+        mock_uvicorn.run.assert_not_called()
+        kwargs = supervisor.call_args.kwargs
+        assert (kwargs["port"], kwargs["workers"]) == (8123, 3)
+        assert kwargs["preload"] is not None
+        supervisor.return_value.run.assert_called_once()
+
+    def test_preload_can_be_disabled(self):
+        server = _server_with_config(server_preload_models=False)
+
+        with patch("sigma_nex.prefork.PreforkSupervisor") as supervisor, patch("sigma_nex.server.uvicorn"):
+            server.run(workers=2)
+        assert supervisor.call_args.kwargs["preload"] is None
+
+    def test_single_worker_runs_uvicorn_directly(self):
+        server = _server_with_config()
+
+        with (
+            patch("sigma_nex.prefork.PreforkSupervisor") as supervisor,
+            patch("sigma_nex.server.uvicorn") as mock_uvicorn,
+        ):
+            server.run(port=8124, workers=None)
+
+        supervisor.assert_not_called()
+        mock_uvicorn.run.assert_called_once_with(server.app, host="127.0.0.1", port=8124)
+
+    def test_metrics_report_process_memory(self):
+        server = _server_with_config()
+        with patch(
+            "sigma_nex.server.process_memory", return_value={"rss": 100, "pss": 60, "shared": 50, "private": 50}
+        ):
+            text = server.render_metrics()
+        assert f'sigma_process_memory_bytes{{pid="{os.getpid()}",kind="pss"}} 60' in text
+
+    def test_translation_pool_is_not_forked_into_every_worker(self):
+        server = _server_with_config()
+        service = Mock()
+        server.translation_service = server.runner.translation_service = service
+
+        with (
+            patch("sigma_nex.prefork.PreforkSupervisor") as supervisor,
+            patch("sigma_nex.core.translation_service.shutdown_translation_service") as shutdown,
+            patch("sigma_nex.server.uvicorn"),
+        ):
+            server.run(workers=2)
+
+        # Traduzione nel processo, con i modelli Marian condivisi dal master
+        shutdown.assert_called_once()
+        assert server.translation_service is None and server.runner.translation_service is None
+        supervisor.return_value.run.assert_called_once()
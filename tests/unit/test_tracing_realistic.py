@@ -0,0 +1,116 @@
+"""
+Test realistici per sigma_nex.utils.tracing - span per query ed export locale
+"""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from sigma_nex.utils import tracing
+
+
+@pytest.fixture
+def trace_dir(tmp_path):
+    """Abilita il tracing in una directory temporanea e ripristina lo stato"""
+    saved = dict(tracing._settings)
+    tracing.configure_tracing(True, directory=tmp_path, formats=["chrome", "otlp"])
+    yield tmp_path
+    tracing._settings.clear()
+    tracing._settings.update(saved)
+
+
+def _load(directory, suffix):
+    files = sorted(directory.glob(f"*{suffix}"))
+    return [json.loads(f.read_text(encoding="utf-8")) for f in files]
+
+
+class TestTracingRealistic:
+    """Test del comportamento effettivo del tracing"""
+
+    def test_disabled_is_noop(self, tmp_path):
+        assert not tracing.is_enabled()
+        with tracing.trace("root") as active:
+            assert active is None
+            assert tracing.span("child") is tracing._NOOP
+        assert tracing.current_trace() is None
+
+    def test_runner_query_spans(self, trace_dir):
+        from sigma_nex.core.runner import Runner
+
+        runner = Runner({"model_name": "test-model", "retrieval_enabled": False})
+        with (
+            patch("sigma_nex.core.runner.translate_it_to_en", side_effect=lambda t: t),
+            patch("sigma_nex.core.runner.translate_en_to_it", side_effect=lambda t: t),
+            patch.object(runner, "_call_model", return_value="risposta"),
+        ):
+            assert runner._process_query("domanda") == "risposta"
+
+        [chrome] = _load(trace_dir, ".trace.json")
+        events = {e["name"]: e for e in chrome["traceEvents"]}
+        assert set(events) == {"runner.process_query", "build_prompt"}
+        root, child = events["runner.process_query"], events["build_prompt"]
+        assert root["ph"] == "X" and root["args"]["parent_id"] is None
+        assert child["args"]["parent_id"] == root["args"]["span_id"]
+        assert child["ts"] >= root["ts"] and child["dur"] <= root["dur"]
+
+        [otlp] = _load(trace_dir, ".otlp.json")
+        spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert {s["name"] for s in spans} == {"runner.process_query", "build_prompt"}
+        assert len({s["traceId"] for s in spans}) == 1
+        assert all(int(s["endTimeUnixNano"]) >= int(s["startTimeUnixNano"]) for s in spans)
+
+    def test_error_recorded_on_span(self, trace_dir):
+        @tracing.traced("boom")
+        def failing():
+            raise ValueError("x")
+
+        with pytest.raises(ValueError):
+            failing()
+
+        [chrome] = _load(trace_dir, ".trace.json")
+        assert chrome["traceEvents"][0]["args"]["error"] == "ValueError"
+
+    def test_concurrent_async_traces_are_isolated(self, trace_dir):
+        @tracing.traced("leaf")
+        async def leaf():
+            await asyncio.sleep(0.01)
+
+        @tracing.traced("request")
+        async def request():
+            await leaf()
+            await leaf()
+
+        async def main():
+            await asyncio.gather(request(), request())
+
+        asyncio.run(main())
+
+        traces = _load(trace_dir, ".trace.json")
+        assert len(traces) == 2
+        for chrome in traces:
+            names = sorted(e["name"] for e in chrome["traceEvents"])
+            assert names == ["leaf", "leaf", "request"]
+
+    def test_min_duration_filters_fast_traces(self, trace_dir):
+        tracing.configure_tracing(True, min_duration_ms=10_000)
+        with tracing.trace("fast"):
+            pass
+        assert not list(trace_dir.iterdir())
+
+    def test_unknown_format_rejected(self, trace_dir):
+        with pytest.raises(ValueError):
+            tracing.configure_tracing(True, formats=["zipkin"])
+
+    def test_configure_from_config_requires_explicit_opt_in(self, tmp_path):
+        saved = dict(tracing._settings)
+        try:
+            tracing.configure_from_config({"tracing_enabled": "yes"})
+            assert not tracing.is_enabled()
+            tracing.configure_from_config({"tracing_enabled": True, "tracing_dir": str(tmp_path)})
+            assert tracing.is_enabled()
+            assert tracing._settings["directory"] == tmp_path
+        finally:
+            tracing._settings.clear()
+            tracing._settings.update(saved)
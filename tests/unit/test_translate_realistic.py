@@ -3,6 +3,9 @@ Test realistici per sigma_nex.core.translate - focus su logica reale di traduzio
 Elimina dipendenze pesanti ma testa comportamento effettivo del traduttore
 """
 
+import pytest
+
+from sigma_nex.core import translate
 from sigma_nex.core.translate import (
     _check_transformers,
     _get_model_paths,
@@ -14,6 +17,14 @@ from sigma_nex.core.translate import (
 )
 
 
+@pytest.fixture(autouse=True)
+def no_path_cache():
+    """Disattiva la cache dei percorsi: i test patchano _get_model_paths/get_config"""
+    translate.set_path_cache(False)
+    yield
+    translate.set_path_cache(True)
+
+
 class TestTranslateRealistic:
     """Test realistici del modulo translate - logica effettiva con mock minimi"""
 
@@ -143,3 +154,105 @@ class TestTranslatePerformance:
         # Non dovrebbe esserci memory leak significativo
         objects_increase = final_objects - initial_objects
         assert objects_increase < 1000  # Threshold ragionevole
+
+
+class TestTranslatePathCache:
+    """Test cache dei percorsi dei modelli di traduzione"""
+
+    class _Config:
+        """Config minima con contatore di ricaricamento (non un Mock)"""
+
+        def __init__(self, base):
+            self.base = base
+            self.generation = 1
+
+        def get_path(self, path_type, default_relative=""):
+            return self.base
+
+    def _setup(self, monkeypatch, tmp_path):
+        (tmp_path / "it-en").mkdir()
+        (tmp_path / "en-it").mkdir()
+        config = self._Config(tmp_path)
+        calls = []
+
+        def counting_paths():
+            calls.append(1)
+            return {"it-en": config.base / "it-en", "en-it": config.base / "en-it"}
+
+        monkeypatch.setattr(translate, "get_config", lambda: config)
+        monkeypatch.setattr(translate._config_module, "_config_instance", config)
+        monkeypatch.setattr(translate, "_get_model_paths", counting_paths)
+        translate.set_path_cache(True)
+        return translate, config, calls
+
+    def test_path_resolved_once_per_direction(self, monkeypatch, tmp_path):
+        """Il percorso viene risolto una volta per direzione"""
+        translate, config, calls = self._setup(monkeypatch, tmp_path)
+
+        for _ in range(5):
+            assert translate._resolve_model_path("it-en") == tmp_path / "it-en"
+        assert translate._resolve_model_path("en-it") == tmp_path / "en-it"
+        assert len(calls) == 2
+        translate.set_path_cache(True)
+
+    def test_config_reload_invalidates_cache(self, monkeypatch, tmp_path):
+        """Un ricaricamento della config (generation) invalida la cache"""
+        translate, config, calls = self._setup(monkeypatch, tmp_path)
+
+        translate._resolve_model_path("it-en")
+        other = tmp_path / "other"
+        (other / "it-en").mkdir(parents=True)
+        config.base = other
+        assert translate._resolve_model_path("it-en") == tmp_path / "it-en"  # ancora in cache
+
+        config.generation += 1
+        assert translate._resolve_model_path("it-en") == other / "it-en"
+        assert len(calls) == 2
+        translate.set_path_cache(True)
+
+    def test_missing_path_not_cached(self, monkeypatch, tmp_path, capsys):
+        """Un modello mancante viene ricontrollato a ogni chiamata"""
+        translate, config, calls = self._setup(monkeypatch, tmp_path)
+        config.base = tmp_path / "missing"
+
+        assert translate._resolve_model_path("it-en") is None
+        (config.base / "it-en").mkdir(parents=True)
+        assert translate._resolve_model_path("it-en") == config.base / "it-en"
+        assert len(calls) == 2
+        translate.set_path_cache(True)
+
+    def test_cache_disabled_resolves_every_call(self, monkeypatch, tmp_path):
+        """Con la cache disattivata ogni traduzione risolve di nuovo il percorso"""
+        translate, config, calls = self._setup(monkeypatch, tmp_path)
+        translate.set_path_cache(False)
+        try:
+            translate._resolve_model_path("it-en")
+            translate._resolve_model_path("it-en")
+            assert len(calls) == 2
+        finally:
+            translate.set_path_cache(True)
+
+    def test_reload_from_new_path_replaces_cached_model(self, monkeypatch, tmp_path):
+        """Se il percorso cambia dopo un reload, il modello viene ricaricato"""
+        from unittest.mock import Mock
+
+        translate, config, calls = self._setup(monkeypatch, tmp_path)
+        tokenizer_cls, model_cls = Mock(), Mock()
+        monkeypatch.setattr(translate, "_check_transformers", lambda: True)
+        monkeypatch.setattr(translate, "MarianTokenizer", tokenizer_cls)
+        monkeypatch.setattr(translate, "MarianMTModel", model_cls)
+        monkeypatch.setattr(translate, "_models", {})
+        monkeypatch.setattr(translate, "_model_sources", {})
+
+        translate._load_model("it-en")
+        translate._load_model("it-en")
+        assert tokenizer_cls.from_pretrained.call_count == 1
+
+        other = tmp_path / "other"
+        (other / "it-en").mkdir(parents=True)
+        config.base = other
+        config.generation += 1
+        translate._load_model("it-en")
+        assert tokenizer_cls.from_pretrained.call_count == 2
+        tokenizer_cls.from_pretrained.assert_called_with(str(other / "it-en"))
+        translate.set_path_cache(True)
@@ -6,6 +6,9 @@ Mirati ad aumentare la copertura delle funzioni effettivamente disponibili
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+import pytest
+
+from sigma_nex.core import translate
 from sigma_nex.core.translate import (
     is_translation_available,
     preload_models,
@@ -14,6 +17,14 @@ from sigma_nex.core.translate import (
 )
 
 
+@pytest.fixture(autouse=True)
+def no_path_cache():
+    """Disattiva la cache dei percorsi: i test patchano _get_model_paths/get_config"""
+    translate.set_path_cache(False)
+    yield
+    translate.set_path_cache(True)
+
+
 class TestTranslationAvailability:
     """Test per la disponibilità della traduzione"""
 
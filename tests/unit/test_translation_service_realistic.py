@@ -0,0 +1,151 @@
+"""
+Test realistici per sigma_nex.core.translation_service
+Pool di worker per la traduzione: ordine dei risultati, errori, API async
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sigma_nex.core import translation_service
+from sigma_nex.core.translation_service import (
+    TranslationService,
+    get_translation_service,
+    translate_async,
+)
+
+
+def _fake_worker(texts, direction, batch_size):
+    """Traduzione finta: marca il testo con la direzione"""
+    return [f"[{direction}] {t}" for t in texts]
+
+
+@pytest.fixture
+def thread_service():
+    executor = ThreadPoolExecutor(max_workers=2)
+    service = TranslationService(workers=2, batch_size=2, executor=executor)
+    with patch.object(translation_service, "_worker_translate", side_effect=_fake_worker) as worker:
+        service.worker = worker
+        yield service
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def reset_shared_service():
+    yield
+    translation_service.shutdown_translation_service()
+
+
+class TestTranslationService:
+    """Test del servizio di traduzione con executor iniettato"""
+
+    def test_translate_single_text(self, thread_service):
+        assert thread_service.translate("ciao", "it-en") == "[it-en] ciao"
+        assert thread_service.translate("   ", "it-en") == "   "  # niente job per testo vuoto
+        assert thread_service.stats()["completed"] == 1
+
+    def test_translate_batch_splits_and_preserves_order(self, thread_service):
+        texts = [f"domanda {i}" for i in range(5)]
+        result = thread_service.translate_batch(texts, "en-it")
+
+        assert result == [f"[en-it] domanda {i}" for i in range(5)]
+        # batch_size=2 -> tre slice inviate ai worker
+        assert thread_service.worker.call_count == 3
+
+    def test_worker_error_returns_original_text(self, thread_service):
+        thread_service.worker.side_effect = RuntimeError("modello corrotto")
+
+        assert thread_service.translate("ciao", "it-en") == "ciao"
+        assert thread_service.translate_batch(["a", "b", "c"], "it-en") == ["a", "b", "c"]
+        assert thread_service.stats()["failed"] == 3
+        assert thread_service.stats()["pending"] == 0
+
+    def test_unknown_direction_rejected(self, thread_service):
+        with pytest.raises(ValueError):
+            thread_service.translate("ciao", "it-fr")
+
+    def test_translate_async(self, thread_service):
+        async def run():
+            return await asyncio.gather(*(thread_service.translate_async(f"t{i}", "it-en") for i in range(4)))
+
+        assert asyncio.run(run()) == [f"[it-en] t{i}" for i in range(4)]
+
+    def test_broken_pool_is_recreated(self):
+        from concurrent.futures.process import BrokenProcessPool
+
+        service = TranslationService(workers=1)
+        broken = Mock()
+        broken.result.side_effect = BrokenProcessPool("worker morto")
+        service._executor = Mock()
+        service.pending = 1
+
+        assert service._result(broken, ["testo"]) == ["testo"]
+        assert service._executor is None
+
+
+class TestSharedService:
+    """Test del servizio condiviso e della funzione async di modulo"""
+
+    def test_disabled_by_default(self, reset_shared_service):
+        assert get_translation_service({}) is None
+        assert get_translation_service({"translation_workers": 0}) is None
+        assert get_translation_service(Mock()) is None
+
+    def test_created_once_from_config(self, reset_shared_service):
+        service = get_translation_service({"translation_workers": 3, "translation_torch_threads": 2})
+        assert service is not None
+        assert (service.workers, service.torch_threads) == (3, 2)
+        assert get_translation_service({"translation_workers": 1}) is service
+        assert get_translation_service() is service
+
+    def test_translate_async_without_service_runs_off_loop(self, reset_shared_service):
+        import threading
+
+        loop_thread = threading.get_ident()
+        seen = []
+
+        def fake_translate(text):
+            seen.append(threading.get_ident())
+            return f"IT: {text}"
+
+        with patch("sigma_nex.core.translate.translate_en_to_it", side_effect=fake_translate):
+            result = asyncio.run(translate_async("hello", "en-it"))
+
+        assert result == "IT: hello"
+        assert seen and seen[0] != loop_thread
+
+
+class TestRunnerIntegration:
+    """Il Runner usa il servizio quando configurato"""
+
+    def test_runner_routes_translation_through_service(self):
+        from sigma_nex.core.runner import Runner
+
+        runner = Runner({"model_name": "mistral", "retrieval_enabled": False})
+        assert runner.translation_service is None
+
+        service = Mock()
+        service.translate.side_effect = lambda text, direction: f"{direction}:{text}"
+        runner.translation_service = service
+
+        with patch.object(runner, "_call_model", return_value="answer"):
+            response = runner._process_query("domanda")
+
+        assert response == "en-it:answer"
+        assert [c.args[1] for c in service.translate.call_args_list] == ["it-en", "en-it"]
+
+
+class TestProcessPool:
+    """Pool di processi reale (spawn): i worker rispondono anche senza modelli"""
+
+    def test_real_worker_process_roundtrip(self):
+        service = TranslationService(workers=1, preload=False)
+        try:
+            # Senza modelli Marian il worker restituisce il testo invariato
+            result = service.translate_batch(["ciao", "mondo"], "it-en")
+            assert len(result) == 2
+            assert service.stats() == {"workers": 1, "pending": 0, "completed": 1, "failed": 0}
+        finally:
+            service.shutdown()